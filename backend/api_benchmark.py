@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+API 并发压测：在同一个事件循环中以 N 个并发客户端请求 API（进程内 ASGI 调用，
+SQS / Supabase 使用带延迟的进程内替身），对比两种处理方式的吞吐与延迟：
+
+- sync：同步路由 + 同步服务（改造前的方式），每个请求在线程池中执行，等待数据库与 SQS 时占用一个线程；
+- async：async 路由 + AsyncSupabaseService / enqueue_job_async（app.main:app 中的实际路由）。
+
+python api_benchmark.py --requests 2000 --concurrency 200 --db-latency 0.02 --sqs-latency 0.02
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+from benchmark import percentile
+
+
+def configure_env(args):
+    """在导入应用模块之前设置环境变量（各模块在导入时读取配置）"""
+    os.environ["LOCAL_BACKENDS"] = "true"
+    os.environ["LOCAL_DB_LATENCY"] = str(args.db_latency)
+    os.environ["LOCAL_SQS_LATENCY"] = str(args.sqs_latency)
+    # 认证依赖在压测中被覆盖，这里只需满足 ClerkService 初始化检查
+    os.environ.setdefault("CLERK_API_KEY", "local")
+    os.environ.setdefault("CLERK_ISSUER", "local")
+    os.environ.setdefault("CLERK_JWKS_URL", "http://localhost/.well-known/jwks.json")
+
+
+def build_sync_app():
+    """改造前的处理方式：同步路由调用同步服务，由 Starlette 放到线程池中执行"""
+    import uuid
+    from datetime import datetime
+    from fastapi import Depends, FastAPI, HTTPException
+    from app.api.jobs import JobRequest, JobResponse
+    from app.dependencies.auth import get_current_user_id
+    from app.services.sqs_service import enqueue_job
+    from app.services.supabase_service import SupabaseService
+
+    app = FastAPI()
+
+    @app.post("/jobs", response_model=JobResponse)
+    def submit_job(req: JobRequest, user_id: str = Depends(get_current_user_id)):
+        job_id = str(uuid.uuid4())
+        SupabaseService.create_job({
+            "id": job_id,
+            "user_id": user_id,
+            "model_name": req.model_name,
+            "dataset_url": req.dataset_url,
+            "parameters": req.parameters,
+            "priority": req.priority,
+            "status": "pending",
+            "created_at": datetime.utcnow().isoformat(),
+            "updated_at": datetime.utcnow().isoformat()
+        })
+        msg_id = enqueue_job({
+            "job_id": job_id,
+            "user_id": user_id,
+            "model_name": req.model_name,
+            "dataset_url": req.dataset_url,
+            "parameters": req.parameters,
+            "priority": req.priority,
+            "type": "training"
+        })
+        SupabaseService.transition_job_status(job_id, "queued", {"sqs_message_id": msg_id})
+        return JobResponse(message_id=job_id)
+
+    @app.get("/jobs/{job_id}")
+    def get_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+        job = SupabaseService.get_job(job_id, user_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    return app
+
+
+async def run_phase(client, concurrency, requests, make_request):
+    """以 concurrency 个并发客户端发出 requests 个请求，返回 (耗时, 每个请求的延迟, 失败数, 结果)"""
+    latencies, results, errors = [], [None] * requests, 0
+    next_index = 0
+
+    async def run_client():
+        nonlocal next_index, errors
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            started = time.perf_counter()
+            resp = await make_request(client, i)
+            latencies.append(time.perf_counter() - started)
+            if resp.status_code != 200:
+                errors += 1
+            else:
+                results[i] = resp.json()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, errors, results
+
+
+async def run_mode(app, args):
+    import httpx
+
+    def submit(client, i):
+        return client.post("/jobs", headers={"Authorization": "bench-user-0"}, json={
+            "model_name": "bench-model",
+            "dataset_url": f"s3://bench/dataset-{i % 10}.csv",
+            "parameters": {"epochs": 1, "run": i},
+            "use_cache": False
+        })
+
+    job_ids = []
+
+    def read(client, i):
+        return client.get(f"/jobs/{job_ids[i % len(job_ids)]}", headers={"Authorization": "bench-user-0"})
+
+    phases = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            phases["POST /jobs"] = await run_phase(client, args.concurrency, args.requests, submit)
+            job_ids.extend(result["message_id"] for result in phases["POST /jobs"][3] if result)
+            if job_ids:
+                phases["GET /jobs/{id}"] = await run_phase(client, args.concurrency, args.requests, read)
+    return phases
+
+
+def report(mode, phases):
+    for name, (elapsed, latencies, errors, _) in phases.items():
+        print(
+            f"{mode:<6} {name:<16} {len(latencies) / elapsed:>9.1f} req/s   "
+            f"p50 {percentile(latencies, 50) * 1000:>7.1f}ms   p99 {percentile(latencies, 99) * 1000:>7.1f}ms   "
+            f"失败 {errors}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 并发压测（sync 与 async 路由对比）")
+    parser.add_argument("--requests", type=int, default=2000, help="每个阶段的请求数")
+    parser.add_argument("--concurrency", type=int, default=200, help="并发客户端数")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="每次数据库请求的模拟延迟（秒）")
+    parser.add_argument("--sqs-latency", type=float, default=0.02, help="每次 SQS 请求的模拟延迟（秒）")
+    parser.add_argument("--mode", choices=("sync", "async", "both"), default="both")
+    args = parser.parse_args()
+    configure_env(args)
+
+    from fastapi import Header
+    from app.main import app as async_app
+    from app.dependencies.auth import get_current_user_id
+
+    # 用 Authorization 头直接充当用户ID，跳过 Clerk 验证
+    def bench_user_id(authorization: str = Header("bench-user-0")) -> str:
+        return authorization
+
+    apps = {}
+    if args.mode in ("sync", "both"):
+        apps["sync"] = build_sync_app()
+    if args.mode in ("async", "both"):
+        apps["async"] = async_app
+
+    print(
+        f"并发 {args.concurrency}, 每阶段 {args.requests} 个请求, "
+        f"数据库延迟 {args.db_latency * 1000:.0f}ms, SQS 延迟 {args.sqs_latency * 1000:.0f}ms"
+    )
+    for mode, app in apps.items():
+        app.dependency_overrides[get_current_user_id] = bench_user_id
+        # 路由中的 print 会拖慢压测，丢弃
+        with contextlib.redirect_stdout(io.StringIO()):
+            phases = asyncio.run(run_mode(app, args))
+        report(mode, phases)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,118 @@
 # backend/app/api/jobs.py
 
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from app.services.sqs_service import enqueue_job
-from app.services.supabase_service import SupabaseService
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from app.services.sqs_service import enqueue_jobs_async
+from app.services.supabase_service import AsyncSupabaseService, METRIC_SERIES
+from app.services.outbox import dispatcher as outbox_dispatcher, outbox_fields
+from app.services.job_events import RESET, JobEvent, hub as job_event_hub
+from app.services.modal_service import clear_job_checkpoints
+from app.utils.downsample import lttb
+from app.utils.spec_hash import spec_hash
+from app.utils.cursor import encode_cursor, decode_cursor, keyset_position
+from app.utils.etag import weak_etag, etag_matches
 from app.dependencies.auth import get_current_user_id
+import asyncio
+import json
+import os
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+# 不会再产生新日志的任务状态
+TERMINAL_STATUSES = ("completed", "failed", "dead_letter")
+
+# 单次批量提交最多的任务数
+JOB_BATCH_MAX_SIZE = int(os.getenv("JOB_BATCH_MAX_SIZE", "500"))
+
+# 任务列表可以通过 fields 选择的列
+JOB_LIST_FIELDS = (
+    "id", "model_name", "dataset_url", "parameters", "status", "priority",
+    "created_at", "updated_at", "completed_at", "failed_at",
+    "retry_from", "retry_count", "error_log", "sqs_message_id", "modal_call_id",
+    "final_accuracy", "final_loss", "dataset_cache", "resume_epoch",
+    "sweep_id", "spec_hash", "cache_hits",
+)
+# 默认只返回仪表盘用到的列，不传输 parameters、error_log 等大字段
+JOB_LIST_DEFAULT_FIELDS = (
+    "id", "model_name", "dataset_url", "status", "priority",
+    "created_at", "updated_at", "completed_at", "failed_at",
+    "retry_from", "retry_count", "final_accuracy", "final_loss",
+)
+JOB_STATUSES = ("pending", "queued", "running", "completed", "failed", "dead_letter")
+
+# 增量同步时重新返回同步位置之前这么多秒内变更的任务：updated_at 由写入方生成，
+# 先生成时间戳的事务可能晚提交，回看一个窗口避免漏掉这类变更（客户端按 id 合并，重复返回无影响）
+JOB_SYNC_OVERLAP_SECONDS = float(os.getenv("JOB_SYNC_OVERLAP_SECONDS", "5"))
+
+# 带 ETag 的响应：浏览器可以缓存，但每次使用前都要带 If-None-Match 重新验证
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+# 任务事件流没有事件时发送心跳的间隔（秒），防止负载均衡器关闭空闲连接
+JOB_STREAM_HEARTBEAT = float(os.getenv("JOB_STREAM_HEARTBEAT", "15"))
+# 客户端断线后重连的等待时间（毫秒）
+JOB_STREAM_RETRY_MS = int(os.getenv("JOB_STREAM_RETRY_MS", "3000"))
+
 class JobRequest(BaseModel):
     model_name: str
     dataset_url: str
     parameters: dict
+    # 优先级通道：interactive 为交互式提交，bulk 为批量提交（独立队列，按权重调度）
+    priority: Literal["interactive", "bulk"] = "interactive"
+    # 相同训练规格已有完成的任务时直接返回该任务的结果；设为 False 强制重新训练
+    use_cache: bool = True
 
 class JobResponse(BaseModel):
     message_id: str
+    # 命中结果缓存时为 True，message_id 是之前完成的任务ID
+    cached: bool = False
+
+class BatchJobRequest(BaseModel):
+    jobs: List[JobRequest] = Field(..., min_length=1, max_length=JOB_BATCH_MAX_SIZE)
+
+class BatchJobResult(BaseModel):
+    # 在请求 jobs 中的位置
+    index: int
+    # queued 与 failed 为新建的任务ID，cached 为之前完成的任务ID
+    job_id: str
+    status: Literal["queued", "cached", "failed"]
+    error: Optional[str] = None
+
+class BatchJobResponse(BaseModel):
+    results: List[BatchJobResult]
+    queued: int
+    cached: int
+    failed: int
 
 @router.post("", response_model=JobResponse)
-def submit_job(req: JobRequest, user_id: str = Depends(get_current_user_id)):
+async def submit_job(req: JobRequest, user_id: str = Depends(get_current_user_id)):
     print(f"Job API called - Model: {req.model_name}, Dataset: {req.dataset_url}, User: {user_id}")
     
   
+    job_hash = spec_hash(req.model_name, req.dataset_url, req.parameters)
+    if req.use_cache:
+        cached_job = await AsyncSupabaseService.find_cached_job(user_id, job_hash)
+        if cached_job:
+            hits = await AsyncSupabaseService.record_cache_hit(cached_job["id"])
+            print(f"Result cache hit: reusing completed job {cached_job['id']} (hits: {hits})")
+            return JobResponse(message_id=cached_job["id"], cached=True)
+    
     job_id = str(uuid.uuid4())
     
+    # 待推送到 SQS 的消息
+    payload = {
+        "job_id": job_id,
+        "user_id": user_id,
+        "model_name": req.model_name,
+        "dataset_url": req.dataset_url,
+        "parameters": req.parameters,
+        "priority": req.priority,
+        "type": "training"
+    }
+    
     # 创建任务记录
     job_data = {
         "id": job_id,
@@ -32,74 +120,344 @@ def submit_job(req: JobRequest, user_id: str = Depends(get_current_user_id)):
         "model_name": req.model_name,
         "dataset_url": req.dataset_url,
         "parameters": req.parameters,
+        "priority": req.priority,
+        "spec_hash": job_hash,
         "status": "pending",
         "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat()
+        "updated_at": datetime.utcnow().isoformat(),
+        **outbox_fields(payload)
     }
     
     try:
-        # 保存到 Supabase
-        SupabaseService.create_job(job_data)
+        # 任务行与待推送的消息在同一次 INSERT 中写入（发件箱），由 dispatcher 批量推送到 SQS 并推进到 queued
+        await AsyncSupabaseService.create_job(job_data)
+        outbox_dispatcher.notify()
         print(f"Job created in database with ID: {job_id}")
         
-        # 添加到 SQS 队列
-        payload = {
-            "job_id": job_id,
-            "model_name": req.model_name,
-            "dataset_url": req.dataset_url,
-            "parameters": req.parameters,
-            "type": "training"
-        }
-        
-        # 添加到 SQS 队列
-        msg_id = enqueue_job(payload)
-        print(f"Job enqueued successfully with message_id: {msg_id}")
-        
-        # 更新数据库中的 SQS message ID
-        SupabaseService.update_job_status(
-            job_id, 
-            "queued", 
-            {"sqs_message_id": msg_id}
-        )
-        
         return JobResponse(message_id=job_id)
     except Exception as e:
         print(f"Error creating job: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/batch", response_model=BatchJobResponse)
+async def submit_jobs_batch(req: BatchJobRequest, user_id: str = Depends(get_current_user_id)):
+    """
+    批量提交任务：命中结果缓存的直接返回之前完成的任务，其余任务一次 INSERT 写入，
+    以 send_message_batch 每 10 条一批并行推送到 SQS，再一次请求写回各任务的 SQS message ID。
+    返回每个任务各自的结果，推送失败的任务标记为 failed。
+    任务行同时写入发件箱并由本请求预留：请求中途失败时，租约到期后由 dispatcher 补推。
+    """
+    print(f"Batch job API called - Jobs: {len(req.jobs)}, User: {user_id}")
+    try:
+        job_hashes = [spec_hash(job.model_name, job.dataset_url, job.parameters) for job in req.jobs]
+        cached_jobs = await AsyncSupabaseService.find_cached_jobs(
+            user_id, [job_hash for job, job_hash in zip(req.jobs, job_hashes) if job.use_cache]
+        )
+
+        results: List[Optional[BatchJobResult]] = [None] * len(req.jobs)
+        new_jobs = []
+        now = datetime.utcnow().isoformat()
+        for i, (job, job_hash) in enumerate(zip(req.jobs, job_hashes)):
+            cached_job = cached_jobs.get(job_hash) if job.use_cache else None
+            if cached_job:
+                results[i] = BatchJobResult(index=i, job_id=cached_job["id"], status="cached")
+                continue
+            new_job_id = str(uuid.uuid4())
+            payload = {
+                "job_id": new_job_id,
+                "user_id": user_id,
+                "model_name": job.model_name,
+                "dataset_url": job.dataset_url,
+                "parameters": job.parameters,
+                "priority": job.priority,
+                "type": "training"
+            }
+            new_jobs.append((i, {
+                "id": new_job_id,
+                "user_id": user_id,
+                "model_name": job.model_name,
+                "dataset_url": job.dataset_url,
+                "parameters": job.parameters,
+                "priority": job.priority,
+                "spec_hash": job_hash,
+                "status": "pending",
+                "created_at": now,
+                "updated_at": now,
+                **outbox_fields(payload, reserved=True)
+            }))
+
+        hits = [result.job_id for result in results if result]
+        if hits:
+            await asyncio.gather(*(AsyncSupabaseService.record_cache_hit(job_id) for job_id in hits))
+            print(f"Result cache hit for {len(hits)} of {len(req.jobs)} batch jobs")
+
+        if new_jobs:
+            await AsyncSupabaseService.create_jobs([row for _, row in new_jobs])
+            print(f"Batch created {len(new_jobs)} jobs in database")
+
+            message_ids = await enqueue_jobs_async([row["outbox_payload"] for _, row in new_jobs])
+
+            enqueued = [(row["id"], msg_id) for (_, row), msg_id in zip(new_jobs, message_ids) if msg_id]
+            not_enqueued = [row["id"] for (_, row), msg_id in zip(new_jobs, message_ids) if not msg_id]
+            if enqueued:
+                await AsyncSupabaseService.mark_jobs_queued(
+                    [job_id for job_id, _ in enqueued], [msg_id for _, msg_id in enqueued]
+                )
+            if not_enqueued:
+                print(f"Batch: {len(not_enqueued)} jobs failed to enqueue")
+                await AsyncSupabaseService.transition_jobs_status(
+                    not_enqueued, "failed", {"error_log": "Failed to enqueue job", "outbox_payload": None}
+                )
+
+            for (i, row), msg_id in zip(new_jobs, message_ids):
+                results[i] = BatchJobResult(
+                    index=i,
+                    job_id=row["id"],
+                    status="queued" if msg_id else "failed",
+                    error=None if msg_id else "Failed to enqueue job"
+                )
+
+        return BatchJobResponse(
+            results=results,
+            queued=sum(result.status == "queued" for result in results),
+            cached=sum(result.status == "cached" for result in results),
+            failed=sum(result.status == "failed" for result in results)
+        )
+    except Exception as e:
+        print(f"Error creating batch jobs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # 添加一个简单的测试端点来验证路由是否工作
 @router.get("/test")
-def test_job_endpoint():
+async def test_job_endpoint():
     print("Test endpoint called!")
     return {"message": "Job API is working"}
 
+def parse_job_fields(fields: Optional[str]) -> List[str]:
+    """解析 fields 参数（逗号分隔）；id 与 created_at 是分页游标需要的列，总是返回"""
+    if not fields:
+        return list(JOB_LIST_DEFAULT_FIELDS)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in JOB_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id", "created_at"] + selected))
+
+def encode_sync_token(updated_at: Optional[str], job_id: Optional[str], exact: bool = False) -> str:
+    """
+    增量同步位置：最后一个已返回任务的 (updated_at, id)。exact 表示分页中途，下一页从该位置之后严格继续；
+    否则下次同步回看 JOB_SYNC_OVERLAP_SECONDS 秒。updated_at 为 None 表示从头同步。
+    """
+    return encode_cursor([updated_at, job_id, 1 if exact else 0])
+
+def sync_window_start(updated_at: str) -> str:
+    return (datetime.fromisoformat(updated_at) - timedelta(seconds=JOB_SYNC_OVERLAP_SECONDS)).isoformat()
+
+def version_settled(updated_at: Optional[str]) -> bool:
+    """
+    最新变更是否早于回看窗口：窗口内可能还有时间戳更早、提交更晚的变更，提交后最新版本不变，
+    此时不返回 ETag，避免客户端之后用旧的 ETag 得到 304 而错过这些变更。
+    """
+    if not updated_at:
+        return True
+    try:
+        changed_at = datetime.fromisoformat(updated_at)
+    except ValueError:
+        return False
+    now = datetime.now(changed_at.tzinfo) if changed_at.tzinfo else datetime.utcnow()
+    return (now - changed_at).total_seconds() > JOB_SYNC_OVERLAP_SECONDS
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL})
+
+async def list_changed_jobs(user_id: str, token: str, limit: int, columns: List[str]) -> dict:
+    """
+    返回同步位置之后 updated_at 推进过的任务：jobs 为变更的任务，deleted 为已删除任务的ID（墓碑）。
+    has_more 为 True 时以 next_token 立即继续同步，否则在下次轮询时使用 next_token。
+    """
+    updated_at, job_id, exact = decode_cursor(token, 3)
+    if exact not in (0, 1) or (exact and updated_at is None):
+        raise ValueError(f"Invalid sync token: {token}")
+    if updated_at is not None or job_id is not None:
+        updated_at, job_id = keyset_position(updated_at, job_id, token)
+    after = (updated_at, job_id) if exact else None
+    updated_since = sync_window_start(updated_at) if updated_at and not exact else None
+
+    rows = await AsyncSupabaseService.list_changed_jobs(
+        user_id,
+        limit=limit + 1,
+        columns=",".join(dict.fromkeys(columns + ["updated_at", "deleted_at"])),
+        after=after,
+        updated_since=updated_since
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        next_token = encode_sync_token(rows[-1]["updated_at"], rows[-1]["id"], exact=has_more)
+    else:
+        next_token = encode_sync_token(updated_at, job_id)
+
+    jobs, deleted = [], []
+    for row in rows:
+        if row.pop("deleted_at"):
+            deleted.append(row["id"])
+        else:
+            jobs.append(row)
+    return {"jobs": jobs, "deleted": deleted, "next_token": next_token, "has_more": has_more}
+
 @router.get("")
-def list_jobs(user_id: str = Depends(get_current_user_id)):
-    """获取当前用户的任务列表"""
+async def list_jobs(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    model_name: Optional[str] = None,
+    changed_since: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    获取当前用户的任务列表，按创建时间倒序分页：下一页以返回的 next_cursor 作为 cursor
+    （keyset 分页，翻页不受新提交任务的影响）。fields 选择返回的列（逗号分隔），
+    status（可逗号分隔多个）与 model_name 过滤任务。
+
+    第一页同时返回 sync_token；之后以 changed_since=<sync_token> 轮询，只返回此后新建、变更或删除的任务
+    （见 list_changed_jobs），不再重复传输整页。
+
+    响应带弱 ETag（由用户任务的最新 (updated_at, id) 与查询参数生成），请求带 If-None-Match 且没有任何任务变更时
+    只执行一次版本查询并返回 304。
+    """
     try:
-        jobs = SupabaseService.list_jobs(user_id, limit=20)
-        return {"jobs": jobs}
+        try:
+            columns = parse_job_fields(fields)
+            if changed_since and (cursor or status or model_name):
+                raise ValueError("changed_since cannot be combined with cursor, status or model_name")
+            before = keyset_position(*decode_cursor(cursor, 2), cursor) if cursor else None
+            statuses = [s.strip() for s in status.split(",") if s.strip()] if status else None
+            if statuses and any(s not in JOB_STATUSES for s in statuses):
+                raise ValueError(f"Unknown status in: {status}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # 版本在读取列表之前获取：既用于 ETag，也是第一页的同步位置（之后的变更都会出现在下一次增量同步中）
+        version = await AsyncSupabaseService.get_jobs_version(user_id)
+        updated_at, latest_id = version or (None, None)
+        if version_settled(updated_at):
+            etag = weak_etag(user_id, updated_at, latest_id, limit, cursor, fields, status, model_name, changed_since)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+
+        if changed_since:
+            try:
+                return await list_changed_jobs(user_id, changed_since, limit, columns)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        # 多取一行判断是否还有下一页
+        jobs = await AsyncSupabaseService.list_jobs(
+            user_id,
+            limit=limit + 1,
+            columns=",".join(columns),
+            before=before,
+            statuses=statuses,
+            model_name=model_name
+        )
+        next_cursor = None
+        if len(jobs) > limit:
+            jobs = jobs[:limit]
+            next_cursor = encode_cursor([jobs[-1]["created_at"], jobs[-1]["id"]])
+        body = {"jobs": jobs, "next_cursor": next_cursor}
+        if not cursor:
+            body["sync_token"] = encode_sync_token(updated_at, latest_id)
+        return body
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error listing jobs: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_job_event(event: JobEvent) -> str:
+    return f"id: {event.id}\nevent: job\ndata: {json.dumps(event.job, default=str)}\n\n"
+
+@router.get("/stream")
+async def stream_jobs(
+    last_event_id: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    以 Server-Sent Events 推送当前用户任务的变更（新建与状态转换），代替轮询 GET /jobs：
+
+    - job 事件的 data 为变更任务的摘要字段（至少包含 id 与 status），客户端按 id 合并到列表；
+    - 断线重连时带上 Last-Event-ID，从服务端缓冲区补发错过的事件；
+      无法补发时（缓冲区已覆盖、服务重启或连接到其他副本）先发送 reset 事件，客户端应重新拉取 GET /jobs；
+    - 没有事件时每 JOB_STREAM_HEARTBEAT 秒发送一次心跳注释。
+    """
+    subscription = job_event_hub.subscribe(user_id, last_event_id)
+
+    async def events():
+        try:
+            yield f"retry: {JOB_STREAM_RETRY_MS}\n\n"
+            if subscription.reset:
+                yield "event: reset\ndata: {}\n\n"
+            for event in subscription.replay:
+                yield format_job_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), JOB_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is RESET:
+                    # 客户端读取太慢，积压的事件已丢弃
+                    yield "event: reset\ndata: {}\n\n"
+                    continue
+                yield format_job_event(event)
+        finally:
+            job_event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{job_id}")
-def get_job(job_id: str, user_id: str = Depends(get_current_user_id)):
-    """获取特定任务信息（用户隔离）"""
+async def get_job(
+    job_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id)
+):
+    """获取特定任务信息（用户隔离）；带 If-None-Match 时先只查询 updated_at，任务未变更返回 304"""
     try:
-        job = SupabaseService.get_job(job_id, user_id)
+        if if_none_match:
+            version = await AsyncSupabaseService.get_job_version(job_id, user_id)
+            if version is None:
+                raise HTTPException(status_code=404, detail="Job not found")
+            etag = weak_etag(job_id, version)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        job = await AsyncSupabaseService.get_job(job_id, user_id)
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
+        response.headers["ETag"] = weak_etag(job_id, job.get("updated_at"))
+        response.headers["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
         return job
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error getting job: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/sqs/{sqs_message_id}")
-def get_job_by_sqs_message_id(sqs_message_id: str):
+async def get_job_by_sqs_message_id(sqs_message_id: str):
     """通过 SQS message ID 获取任务信息"""
     try:
-        job = SupabaseService.get_job_by_sqs_message_id(sqs_message_id)
+        job = await AsyncSupabaseService.get_job_by_sqs_message_id(sqs_message_id)
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
         return job
@@ -108,17 +466,17 @@ def get_job_by_sqs_message_id(sqs_message_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{job_id}/retry")
-def retry_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+async def retry_job(job_id: str, user_id: str = Depends(get_current_user_id)):
     """重试已失败或已完成的任务（用户隔离）"""
     try:
         # 获取原始任务信息（用户隔离）
-        job = SupabaseService.get_job(job_id, user_id)
+        job = await AsyncSupabaseService.get_job(job_id, user_id)
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
         
         # 检查任务状态是否允许重试
-        if job["status"] not in ["failed", "completed"]:
-            raise HTTPException(status_code=400, detail="Only failed or completed jobs can be retried")
+        if job["status"] not in ["failed", "dead_letter", "completed"]:
+            raise HTTPException(status_code=400, detail="Only failed, dead-lettered or completed jobs can be retried")
         
         # 生成新的任务ID（保留原始任务信息）
         new_job_id = str(uuid.uuid4())
@@ -126,6 +484,20 @@ def retry_job(job_id: str, user_id: str = Depends(get_current_user_id)):
         # 获取原始任务的重试次数
         original_retry_count = job.get("retry_count", 0)
         
+        # 待推送到 SQS 的消息
+        payload = {
+            "job_id": new_job_id,
+            "user_id": user_id,
+            "model_name": job["model_name"],
+            "dataset_url": job["dataset_url"],
+            "parameters": job["parameters"],
+            "priority": job.get("priority", "interactive"),
+            "type": "training"
+        }
+        # 失败的任务从最近的检查点继续训练；已完成的任务重新训练
+        if job["status"] != "completed":
+            payload["resume_from"] = job_id
+        
         # 创建新的任务记录
         new_job_data = {
             "id": new_job_id,
@@ -133,59 +505,151 @@ def retry_job(job_id: str, user_id: str = Depends(get_current_user_id)):
             "model_name": job["model_name"],
             "dataset_url": job["dataset_url"],
             "parameters": job["parameters"],
+            "priority": job.get("priority", "interactive"),
+            "spec_hash": job.get("spec_hash"),
             "status": "pending",
             "created_at": datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat(),
             "retry_from": job_id,  # 记录重试来源
-            "retry_count": original_retry_count + 1  # 增加重试次数
+            "retry_count": original_retry_count + 1,  # 增加重试次数
+            "sweep_id": job.get("sweep_id"),  # 超参数搜索的子任务重试后仍归属于该搜索
+            **outbox_fields(payload)
         }
         
-        # 保存到 Supabase
-        SupabaseService.create_job(new_job_data)
+        # 任务行与待推送的消息一起写入发件箱，由 dispatcher 推送到 SQS
+        await AsyncSupabaseService.create_job(new_job_data)
+        outbox_dispatcher.notify()
         print(f"Retry job created in database with ID: {new_job_id}")
         
-        # 添加到 SQS 队列
-        payload = {
-            "job_id": new_job_id,
-            "model_name": job["model_name"],
-            "dataset_url": job["dataset_url"],
-            "parameters": job["parameters"],
-            "type": "training"
-        }
+        return {"message": "Job retry initiated", "new_job_id": new_job_id}
         
-        # 添加到 SQS 队列
-        msg_id = enqueue_job(payload)
-        print(f"Retry job enqueued successfully with message_id: {msg_id}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error retrying job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/{job_id}")
+async def delete_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+    """删除已结束的任务（软删除：不再出现在列表中，增量同步以墓碑返回）"""
+    try:
+        if await AsyncSupabaseService.delete_job(job_id, user_id, TERMINAL_STATUSES):
+            # 已删除的任务不能再重试，检查点不再需要
+            await clear_job_checkpoints(job_id)
+            return {"message": "Job deleted", "job_id": job_id}
+
+        job = await AsyncSupabaseService.get_job(job_id, user_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail="Only completed, failed or dead-lettered jobs can be deleted")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error deleting job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{job_id}/logs")
+async def get_job_logs(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    user_id: str = Depends(get_current_user_id)
+):
+    """从第 offset 行开始读取任务的训练日志（用户隔离），下次轮询以返回的 next_offset 作为 offset"""
+    try:
+        job = await AsyncSupabaseService.get_job(job_id, user_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
         
-        # 更新数据库中的 SQS message ID
-        SupabaseService.update_job_status(
-            new_job_id, 
-            "queued", 
-            {"sqs_message_id": msg_id}
-        )
+        max_chunks = 20
+        chunks = await AsyncSupabaseService.get_job_logs(job_id, offset, max_chunks=max_chunks)
+        lines = []
+        next_offset = offset
+        for chunk in chunks:
+            # 日志块之间有缺口（推送失败被丢弃）时从下一块的起始行继续
+            start = max(next_offset, chunk["line_offset"])
+            taken = chunk["lines"][start - chunk["line_offset"]:][:limit - len(lines)]
+            lines.extend(taken)
+            next_offset = start + len(taken)
+            if len(lines) >= limit:
+                break
         
-        return {"message": "Job retry initiated", "new_job_id": new_job_id}
+        has_more = len(lines) >= limit or len(chunks) >= max_chunks
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "offset": offset,
+            "next_offset": next_offset,
+            "lines": lines,
+            "complete": job["status"] in TERMINAL_STATUSES and not has_more
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error getting job logs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{job_id}/metrics")
+async def get_job_metrics(
+    job_id: str,
+    points: int = Query(200, ge=3, le=5000),
+    user_id: str = Depends(get_current_user_id)
+):
+    """获取任务的每轮训练指标曲线（用户隔离），每条曲线在服务端用 LTTB 降采样到最多 points 个点"""
+    try:
+        job = await AsyncSupabaseService.get_job(job_id, user_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        
+        metrics = await AsyncSupabaseService.get_job_metrics(job_id) or {}
+        epochs = metrics.get("epochs") or []
+        series = {}
+        for name in METRIC_SERIES:
+            values = metrics.get(name) or []
+            kept = lttb(epochs, values, points)
+            series[name] = {
+                "epoch": [epochs[i] for i in kept],
+                "value": [values[i] for i in kept]
+            }
         
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "total_epochs": len(epochs),
+            "series": series,
+            "final_accuracy": job.get("final_accuracy"),
+            "final_loss": job.get("final_loss")
+        }
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error retrying job: {str(e)}")
+        print(f"Error getting job metrics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{job_id}/error-log")
-def get_job_error_log(job_id: str, user_id: str = Depends(get_current_user_id)):
-    """获取任务的错误日志（用户隔离）"""
+async def get_job_error_log(
+    job_id: str,
+    full: bool = Query(False),
+    user_id: str = Depends(get_current_user_id)
+):
+    """获取任务的错误日志（用户隔离）：默认返回任务行上的首尾摘要，full=true 时返回解压后的完整内容"""
     try:
-        job = SupabaseService.get_job(job_id, user_id)
+        job = await AsyncSupabaseService.get_job(job_id, user_id)
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
         
-        if job["status"] != "failed":
+        if job["status"] not in ["failed", "dead_letter"]:
             raise HTTPException(status_code=400, detail="Only failed jobs have error logs")
         
+        error_log = job.get("error_log") or "No error log available"
+        if full:
+            # 早于压缩存储的任务没有完整记录，任务行上的就是完整内容
+            error_log = await AsyncSupabaseService.get_error_log(job_id) or error_log
+        
         return {
             "job_id": job_id,
-            "error_log": job.get("error_log", "No error log available"),
+            "error_log": error_log,
+            "full": full,
             "failed_at": job.get("failed_at")
         }
     except HTTPException:
@@ -0,0 +1,212 @@
+# backend/app/api/sweeps.py
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+from app.api.jobs import TERMINAL_STATUSES
+from app.services.sqs_service import enqueue_jobs_async
+from app.services.supabase_service import AsyncSupabaseService
+from app.services.outbox import outbox_fields
+from app.utils.sweep import expand_grid, sample_random
+from app.utils.spec_hash import spec_hash
+from app.dependencies.auth import get_current_user_id
+import os
+import uuid
+from datetime import datetime
+
+router = APIRouter(prefix="/sweeps", tags=["sweeps"])
+
+# 单次超参数搜索最多展开的子任务数
+SWEEP_MAX_JOBS = int(os.getenv("SWEEP_MAX_JOBS", "200"))
+
+class RandomSearchSpec(BaseModel):
+    # 参数名 -> {"values": [...]} 或 {"min": a, "max": b, "log": bool, "type": "int" | "float"}
+    space: Dict[str, Dict[str, Any]]
+    trials: int = Field(..., ge=1)
+    seed: Optional[int] = None
+
+class SweepRequest(BaseModel):
+    model_name: str
+    dataset_url: str
+    # 所有子任务共用的参数，grid / random 中的参数覆盖同名参数
+    parameters: dict = {}
+    # 网格搜索与随机搜索二选一
+    grid: Optional[Dict[str, List[Any]]] = None
+    random: Optional[RandomSearchSpec] = None
+    # 排行榜的排序指标
+    objective: Literal["final_accuracy", "final_loss"] = "final_accuracy"
+    # 子任务默认走批量通道，不挤占交互式任务
+    priority: Literal["interactive", "bulk"] = "bulk"
+
+def expand_sweep(req: SweepRequest) -> List[dict]:
+    """把搜索定义展开为每个子任务的参数"""
+    if (req.grid is None) == (req.random is None):
+        raise ValueError("Exactly one of grid or random must be provided")
+    if req.grid is not None:
+        if not req.grid or any(not values for values in req.grid.values()):
+            raise ValueError("Every grid parameter needs at least one value")
+        total = 1
+        for values in req.grid.values():
+            total *= len(values)
+        if total > SWEEP_MAX_JOBS:
+            raise ValueError(f"Sweep expands to {total} jobs, the limit is {SWEEP_MAX_JOBS}")
+        return expand_grid(req.parameters, req.grid)
+
+    if req.random.trials > SWEEP_MAX_JOBS:
+        raise ValueError(f"Sweep expands to {req.random.trials} jobs, the limit is {SWEEP_MAX_JOBS}")
+    for name, dist in req.random.space.items():
+        if "values" in dist:
+            if not dist["values"]:
+                raise ValueError(f"Parameter {name} needs at least one value")
+        elif "min" not in dist or "max" not in dist or dist["min"] > dist["max"]:
+            raise ValueError(f"Parameter {name} needs values, or min <= max")
+    return sample_random(req.parameters, req.random.space, req.random.trials, req.random.seed)
+
+@router.post("")
+async def submit_sweep(req: SweepRequest, user_id: str = Depends(get_current_user_id)):
+    """
+    提交超参数搜索：展开为子任务后一次批量插入（sweep_id 关联到搜索记录），
+    再以 send_message_batch 并行批量推送到 SQS，由 worker 像普通任务一样派发到 Modal。
+    """
+    try:
+        try:
+            parameter_sets = expand_sweep(req)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        print(f"Sweep API called - Model: {req.model_name}, Jobs: {len(parameter_sets)}, User: {user_id}")
+
+        sweep_id = str(uuid.uuid4())
+        now = datetime.utcnow().isoformat()
+        await AsyncSupabaseService.create_sweep({
+            "id": sweep_id,
+            "user_id": user_id,
+            "model_name": req.model_name,
+            "dataset_url": req.dataset_url,
+            "spec": req.model_dump(include={"parameters", "grid", "random"}),
+            "objective": req.objective,
+            "total_jobs": len(parameter_sets),
+            "created_at": now
+        })
+
+        payloads = [
+            {
+                "job_id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "model_name": req.model_name,
+                "dataset_url": req.dataset_url,
+                "parameters": parameters,
+                "priority": req.priority,
+                "sweep_id": sweep_id,
+                "type": "training"
+            }
+            for parameters in parameter_sets
+        ]
+        # 子任务同时写入发件箱并由本请求预留，请求中途失败时由 dispatcher 补推
+        jobs = [
+            {
+                "id": payload["job_id"],
+                "user_id": user_id,
+                "model_name": req.model_name,
+                "dataset_url": req.dataset_url,
+                "parameters": payload["parameters"],
+                "priority": req.priority,
+                "sweep_id": sweep_id,
+                "spec_hash": spec_hash(req.model_name, req.dataset_url, payload["parameters"]),
+                "status": "pending",
+                "created_at": now,
+                "updated_at": now,
+                **outbox_fields(payload, reserved=True)
+            }
+            for payload in payloads
+        ]
+        await AsyncSupabaseService.create_jobs(jobs)
+        print(f"Sweep {sweep_id} created {len(jobs)} jobs in database")
+
+        message_ids = await enqueue_jobs_async(payloads)
+
+        # 一次请求写回各子任务的 SQS message ID 并推进到 queued（仅当 worker 尚未开始处理时）；
+        # 推送失败的子任务直接标记为失败
+        enqueued = [(job["id"], msg_id) for job, msg_id in zip(jobs, message_ids) if msg_id]
+        not_enqueued = [job["id"] for job, msg_id in zip(jobs, message_ids) if not msg_id]
+        if enqueued:
+            await AsyncSupabaseService.mark_jobs_queued(
+                [job_id for job_id, _ in enqueued], [msg_id for _, msg_id in enqueued]
+            )
+        if not_enqueued:
+            print(f"Sweep {sweep_id}: {len(not_enqueued)} jobs failed to enqueue")
+            await AsyncSupabaseService.transition_jobs_status(
+                not_enqueued, "failed", {"error_log": "Failed to enqueue sweep job", "outbox_payload": None}
+            )
+
+        return {
+            "sweep_id": sweep_id,
+            "job_ids": [job["id"] for job in jobs],
+            "total_jobs": len(jobs),
+            "enqueued": len(enqueued)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error creating sweep: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{sweep_id}")
+async def get_sweep(
+    sweep_id: str,
+    top: int = Query(10, ge=1, le=200),
+    user_id: str = Depends(get_current_user_id)
+):
+    """获取超参数搜索的汇总状态与排行榜（用户隔离）"""
+    try:
+        sweep = await AsyncSupabaseService.get_sweep(sweep_id, user_id)
+        if not sweep:
+            raise HTTPException(status_code=404, detail="Sweep not found")
+
+        jobs = await AsyncSupabaseService.list_sweep_jobs(sweep_id)
+        # 被重试取代的子任务只计入 retried，以最新一次重试的结果为准
+        superseded = {job["retry_from"] for job in jobs if job.get("retry_from")}
+        current = [job for job in jobs if job["id"] not in superseded]
+
+        counts: Dict[str, int] = {}
+        for job in current:
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        finished = all(job["status"] in TERMINAL_STATUSES for job in current)
+        if not finished:
+            status = "running"
+        elif counts.get("completed"):
+            status = "completed"
+        else:
+            status = "failed"
+
+        objective = sweep.get("objective") or "final_accuracy"
+        scored = [job for job in current if job["status"] == "completed" and job.get(objective) is not None]
+        scored.sort(key=lambda job: job[objective], reverse=objective == "final_accuracy")
+        leaderboard = [
+            {
+                "rank": rank,
+                "job_id": job["id"],
+                "parameters": job["parameters"],
+                "final_accuracy": job.get("final_accuracy"),
+                "final_loss": job.get("final_loss")
+            }
+            for rank, job in enumerate(scored[:top], start=1)
+        ]
+
+        return {
+            "sweep_id": sweep_id,
+            "model_name": sweep["model_name"],
+            "dataset_url": sweep["dataset_url"],
+            "objective": objective,
+            "status": status,
+            "total_jobs": len(current),
+            "counts": counts,
+            "retried": len(superseded & {job["id"] for job in jobs}),
+            "best": leaderboard[0] if leaderboard else None,
+            "leaderboard": leaderboard,
+            "created_at": sweep.get("created_at")
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error getting sweep: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
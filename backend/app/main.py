@@ -1,8 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.jobs import router as jobs_router
+from app.api.sweeps import router as sweeps_router
+from app.services.supabase_service import open_async_supabase, close_async_supabase
+from app.services.sqs_service import open_async_sqs, close_async_sqs
+from app.services.outbox import OUTBOX_DISPATCHER_ENABLED, dispatcher as outbox_dispatcher
+from app.services.job_events import start_job_events, stop_job_events
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 所有请求共享的客户端与连接池：启动时创建，关闭时释放
+    await open_async_supabase()
+    open_async_sqs()
+    # 订阅任务状态变更事件，推送给 GET /jobs/stream 的连接
+    await start_job_events()
+    # 发件箱 dispatcher：把新提交的任务推送到 SQS（多个副本可同时运行）
+    if OUTBOX_DISPATCHER_ENABLED:
+        outbox_dispatcher.start()
+    yield
+    if OUTBOX_DISPATCHER_ENABLED:
+        outbox_dispatcher.stop()
+    await stop_job_events()
+    close_async_sqs()
+    await close_async_supabase()
+
+app = FastAPI(lifespan=lifespan)
 
 # 添加 CORS 中间件
 app.add_middleware(
@@ -14,7 +37,8 @@ app.add_middleware(
 )
 
 app.include_router(jobs_router)
+app.include_router(sweeps_router)
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Hello, FastAPI!"}
\ No newline at end of file
@@ -0,0 +1,125 @@
+# backend/app/services/checkpoints.py
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+_CHECKPOINT_RE = re.compile(r"^epoch-(\d+)\.json$")
+
+
+def _checksum(state: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """
+    训练检查点存储（Modal 上挂载在持久化 Volume）：<root>/<job_id>/epoch-<N>.json。
+
+    - 先写临时文件再原子重命名，并记录内容校验和，读取时跳过不完整或校验失败的检查点；
+    - 每个任务只保留最近 keep 个检查点；
+    - 训练成功后立即删除；失败的任务保留 sweep() 的期限，期间手动重试仍可从检查点继续。
+
+    commit / reload 用于 Modal Volume：写入后提交，读取其他任务的检查点前刷新视图。
+    """
+
+    def __init__(
+        self,
+        root: str,
+        keep: int = 2,
+        commit: Optional[Callable[[], None]] = None,
+        reload: Optional[Callable[[], None]] = None,
+    ):
+        self.root = root
+        self.keep = keep
+        self.commit = commit
+        self.reload = reload
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def epochs(self, job_id: str) -> List[int]:
+        """任务已有检查点的轮次（降序）"""
+        try:
+            names = os.listdir(self._job_dir(job_id))
+        except OSError:
+            return []
+        matches = (_CHECKPOINT_RE.match(name) for name in names)
+        return sorted((int(m.group(1)) for m in matches if m), reverse=True)
+
+    def save(self, job_id: str, epoch: int, state: Dict[str, Any]):
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        path = os.path.join(job_dir, f"epoch-{epoch:06d}.json")
+        tmp_path = os.path.join(job_dir, f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"epoch": epoch, "state": state, "checksum": _checksum(state)}, f)
+        os.replace(tmp_path, path)
+
+        for old in self.epochs(job_id)[self.keep:]:
+            try:
+                os.remove(os.path.join(job_dir, f"epoch-{old:06d}.json"))
+            except OSError:
+                pass
+        if self.commit:
+            self.commit()
+
+    def load(self, job_id: str, epoch: int) -> Optional[Dict[str, Any]]:
+        """读取并校验一个检查点，无效时返回 None"""
+        path = os.path.join(self._job_dir(job_id), f"epoch-{epoch:06d}.json")
+        try:
+            with open(path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if checkpoint.get("epoch") != epoch or checkpoint.get("checksum") != _checksum(checkpoint.get("state", {})):
+            return None
+        return checkpoint
+
+    def latest(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """任务最近的有效检查点"""
+        if self.reload:
+            self.reload()
+        for epoch in self.epochs(job_id):
+            checkpoint = self.load(job_id, epoch)
+            if checkpoint is not None:
+                return checkpoint
+        return None
+
+    def clear(self, job_id: str):
+        """删除任务的所有检查点（训练成功结束后不再需要）"""
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+        if self.commit:
+            self.commit()
+
+    def sweep(self, max_age: float, now: Optional[float] = None) -> int:
+        """删除最近一次写入早于 max_age 秒的任务检查点（失败、删除或被遗弃的任务），返回删除的任务数"""
+        if now is None:
+            now = time.time()
+        if self.reload:
+            self.reload()
+        try:
+            job_ids = os.listdir(self.root)
+        except OSError:
+            return 0
+
+        removed = 0
+        for job_id in job_ids:
+            job_dir = self._job_dir(job_id)
+            try:
+                latest = max(
+                    [os.path.getmtime(job_dir)]
+                    + [os.path.getmtime(os.path.join(job_dir, name)) for name in os.listdir(job_dir)]
+                )
+            except OSError:
+                continue
+            if now - latest > max_age:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                removed += 1
+        if removed and self.commit:
+            self.commit()
+        return removed
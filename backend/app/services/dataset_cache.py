@@ -0,0 +1,349 @@
+# backend/app/services/dataset_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 下载时的分块大小
+CHUNK_SIZE = 1024 * 1024
+
+
+def _split_s3_url(url: str) -> Tuple[str, str]:
+    bucket, _, key = url[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def fetch_validator(url: str, timeout: float = 10.0) -> str:
+    """
+    获取数据集的校验标识（S3 / HTTP ETag，或 Last-Modified + Content-Length），
+    源站内容变化时标识随之变化，缓存键也随之失效。无法获取时返回空字符串（仅按 URL 缓存）。
+    """
+    if url.startswith("s3://"):
+        try:
+            import boto3
+            bucket, key = _split_s3_url(url)
+            return f"etag:{boto3.client('s3').head_object(Bucket=bucket, Key=key)['ETag']}"
+        except Exception:
+            return ""
+    if not url.startswith(("http://", "https://")):
+        return ""
+    try:
+        request = urllib.request.Request(url, method="HEAD")
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            etag = resp.headers.get("ETag")
+            if etag:
+                return f"etag:{etag}"
+            modified = resp.headers.get("Last-Modified")
+            length = resp.headers.get("Content-Length")
+            if modified or length:
+                return f"modified:{modified}|length:{length}"
+    except (urllib.error.URLError, OSError):
+        pass
+    return ""
+
+
+class _HashingWriter:
+    """写入文件的同时计算 sha256"""
+
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+
+    def write(self, block: bytes) -> int:
+        self.digest.update(block)
+        return self.f.write(block)
+
+
+def _download_s3(url: str, dest: str) -> str:
+    import boto3
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    bucket, key = _split_s3_url(url)
+    try:
+        with open(dest, "wb") as f:
+            writer = _HashingWriter(f)
+            boto3.client("s3").download_fileobj(bucket, key, writer)
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code", "")
+        if code in ("404", "403", "NoSuchKey", "NoSuchBucket", "AccessDenied"):
+            raise ValueError(f"下载数据集失败 ({code}): {url}") from e
+        raise ConnectionError(f"下载数据集失败 ({code}): {url}") from e
+    except BotoCoreError as e:
+        raise ConnectionError(f"下载数据集失败: {url} ({e})") from e
+    return writer.digest.hexdigest()
+
+
+def download(url: str, dest: str, timeout: float = 60.0) -> str:
+    """下载到 dest，返回内容的 sha256。网络类错误抛出 ConnectionError（可重试），地址或权限错误抛出 ValueError"""
+    if url.startswith("s3://"):
+        return _download_s3(url, dest)
+
+    digest = hashlib.sha256()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp, open(dest, "wb") as f:
+            while True:
+                block = resp.read(CHUNK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                f.write(block)
+    except urllib.error.HTTPError as e:
+        if e.code >= 500 or e.code == 429:
+            raise ConnectionError(f"下载数据集失败 ({e.code}): {url}") from e
+        raise ValueError(f"下载数据集失败 ({e.code}): {url}") from e
+    except urllib.error.URLError as e:
+        if isinstance(e.reason, FileNotFoundError) or (isinstance(e.reason, str) and "unknown url type" in e.reason):
+            raise ValueError(f"不支持的数据集地址: {url}") from e
+        raise ConnectionError(f"下载数据集失败: {url} ({e.reason})") from e
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """
+    内容寻址的数据集缓存（Modal 上挂载在持久化 Volume，本地为普通目录）：
+
+    - index/<key>.json：缓存键（URL + 校验标识的哈希）-> 内容哈希；
+    - objects/<sha256>：按内容哈希存储的数据集文件，不同 URL 的相同内容只存一份；
+    - 总大小超过 max_bytes 时按最近访问时间淘汰最久未使用的数据集；
+    - 同一数据集的并发下载只进行一次：进程内用线程锁，跨进程用下载锁，
+      其他请求者等待下载完成后直接命中缓存。
+
+    registry 为各容器共享的键值存储（Modal 上为 modal.Dict），保存下载锁和访问时间：
+    每个容器看到的是 Volume 的独立视图（commit / reload 后才同步），锁文件和文件 mtime
+    都不能在容器之间可靠共享。不传 registry 时使用 locks/<key>.lock 锁文件和文件 mtime，
+    只在共享同一文件系统的进程之间（单机）有效。
+
+    commit / reload 用于 Modal Volume：写入后提交，等待其他容器下载时刷新视图。
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int,
+        commit: Optional[Callable[[], None]] = None,
+        reload: Optional[Callable[[], None]] = None,
+        fetch: Callable[[str, str], str] = download,
+        validator: Callable[[str], str] = fetch_validator,
+        lock_timeout: float = 1800.0,
+        poll_interval: float = 2.0,
+        registry=None,
+    ):
+        self.root = root
+        self.registry = registry
+        self.max_bytes = max_bytes
+        self.commit = commit
+        self.reload = reload
+        self.fetch = fetch
+        self.validator = validator
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        for sub in ("index", "objects", "locks", "tmp"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    @staticmethod
+    def cache_key(url: str, validator: str) -> str:
+        return hashlib.sha256(f"{url}\n{validator}".encode("utf-8")).hexdigest()
+
+    def get(self, url: str) -> Tuple[str, Dict[str, Any]]:
+        """返回数据集的本地路径，以及本次访问的缓存指标（hit、bytes、fetch_seconds、evicted）"""
+        started = time.time()
+        key = self.cache_key(url, self.validator(url))
+        with self._key_lock(key):
+            path = self._lookup(key)
+            hit, evicted = True, 0
+            if path is None:
+                # 等待到其他容器下载完成的数据集也算命中
+                path, downloaded = self._wait_or_download(key, url)
+                if downloaded:
+                    hit = False
+                    evicted = self._evict(protect=path)
+                    if self.commit:
+                        self.commit()
+
+        return path, {
+            "hit": hit,
+            "key": key,
+            "bytes": os.path.getsize(path),
+            "fetch_seconds": round(time.time() - started, 3),
+            "evicted": evicted,
+        }
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._guard:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key: str) -> Optional[str]:
+        index_path = os.path.join(self.root, "index", f"{key}.json")
+        try:
+            with open(index_path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = os.path.join(self.root, "objects", entry["sha256"])
+        if not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+            # 数据集已被淘汰或不完整，清理失效的索引
+            try:
+                os.remove(index_path)
+            except OSError:
+                pass
+            return None
+        self._touch(path)
+        return path
+
+    def _touch(self, path: str):
+        """更新访问时间供 LRU 淘汰"""
+        if self.registry is not None:
+            try:
+                self.registry[f"atime:{os.path.basename(path)}"] = time.time()
+            except Exception as e:
+                # 访问时间只影响淘汰顺序，记录失败不影响训练
+                print(f"[DatasetCache] 记录访问时间失败: {e}")
+        else:
+            os.utime(path)
+
+    def _access_time(self, path: str, mtime: float) -> float:
+        if self.registry is None:
+            return mtime
+        try:
+            return max(self.registry.get(f"atime:{os.path.basename(path)}", mtime), mtime)
+        except Exception:
+            return mtime
+
+    def _try_lock(self, key: str) -> Optional[Callable[[], None]]:
+        """尝试获取数据集的下载锁，成功时返回释放函数"""
+        if self.registry is None:
+            return self._try_lock_file(key)
+
+        name = f"lock:{key}"
+        token = {"owner": uuid.uuid4().hex, "at": time.time()}
+        acquired = self.registry.put(name, token, skip_if_exists=True)
+        if not acquired:
+            # 锁过期则视为下载方已退出；同一个过期的锁只有一个请求者能接管
+            held = self.registry.get(name)
+            if held and time.time() - held["at"] > self.lock_timeout:
+                if self.registry.put(f"takeover:{key}:{held['owner']}", token["owner"], skip_if_exists=True):
+                    self.registry[name] = token
+                    acquired = True
+        if not acquired:
+            return None
+
+        def release():
+            try:
+                self.registry.pop(name)
+            except Exception as e:
+                # 释放失败时锁在 lock_timeout 后过期
+                print(f"[DatasetCache] 释放下载锁失败: {e}")
+        return release
+
+    def _try_lock_file(self, key: str) -> Optional[Callable[[], None]]:
+        lock_path = os.path.join(self.root, "locks", f"{key}.lock")
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # 锁文件过期则视为下载方已退出
+            try:
+                if time.time() - os.path.getmtime(lock_path) > self.lock_timeout:
+                    os.remove(lock_path)
+            except OSError:
+                pass
+            return None
+        os.close(fd)
+
+        def release():
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+        return release
+
+    def _wait_or_download(self, key: str, url: str) -> Tuple[str, bool]:
+        while True:
+            release = self._try_lock(key)
+            if release is None:
+                # 其他进程正在下载同一数据集：等待其完成
+                time.sleep(self.poll_interval)
+                if self.reload:
+                    self.reload()
+                path = self._lookup(key)
+                if path is not None:
+                    return path, False
+                continue
+
+            try:
+                # 拿到锁后再检查一次：上一个持锁者可能刚刚下载完成
+                if self.reload:
+                    self.reload()
+                path = self._lookup(key)
+                if path is not None:
+                    return path, False
+                path = self._download(key, url)
+                # 释放锁之前提交，等待的容器刷新视图后即可命中
+                if self.commit:
+                    self.commit()
+                return path, True
+            finally:
+                release()
+
+    def _download(self, key: str, url: str) -> str:
+        tmp_path = os.path.join(self.root, "tmp", uuid.uuid4().hex)
+        try:
+            sha256 = self.fetch(url, tmp_path)
+            path = os.path.join(self.root, "objects", sha256)
+            size = os.path.getsize(tmp_path)
+            if os.path.exists(path):
+                # 其他 URL 已缓存相同内容
+                os.remove(tmp_path)
+                os.utime(path)
+            else:
+                shutil.move(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._touch(path)
+
+        index_path = os.path.join(self.root, "index", f"{key}.json")
+        with open(index_path + ".tmp", "w") as f:
+            json.dump({"url": url, "sha256": sha256, "size": size, "cached_at": time.time()}, f)
+        os.replace(index_path + ".tmp", index_path)
+        return path
+
+    def _evict(self, protect: str) -> int:
+        """按最近访问时间淘汰数据集直到总大小不超过 max_bytes，返回淘汰的数量"""
+        objects_dir = os.path.join(self.root, "objects")
+        entries = []
+        for name in os.listdir(objects_dir):
+            path = os.path.join(objects_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((self._access_time(path, stat.st_mtime), stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == protect:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+            if self.registry is not None:
+                try:
+                    self.registry.pop(f"atime:{os.path.basename(path)}")
+                except Exception:
+                    pass
+        return evicted
@@ -0,0 +1,299 @@
+# backend/app/services/job_events.py
+
+import asyncio
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+import httpx
+
+from app.services.local_backends import LOCAL_BACKENDS, get_local_job_broker
+
+# 每个 API 进程保留的最近事件数，客户端断线重连时从中补发（超出范围时通知客户端重新拉取列表）
+JOB_EVENTS_BUFFER_SIZE = int(os.getenv("JOB_EVENTS_BUFFER_SIZE", "10000"))
+# 单个连接积压的事件上限，客户端读取太慢时丢弃积压并通知重新拉取列表
+JOB_STREAM_QUEUE_SIZE = int(os.getenv("JOB_STREAM_QUEUE_SIZE", "1000"))
+
+# Supabase Realtime 私有广播频道（权限见 migrations/018_add_job_events.sql）
+JOB_EVENTS_TOPIC = "job-events"
+# 频道只允许 service_role 收发（事件包含所有用户的任务），不能使用前端也持有的 anon key
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+# 关闭后不发布也不订阅任务事件，GET /jobs/stream 只发送心跳；
+# 未配置 SUPABASE_SERVICE_ROLE_KEY 时（LOCAL_BACKENDS 除外）无法收发，启动时提示一次并关闭
+JOB_EVENTS_ENABLED = os.getenv("JOB_EVENTS_ENABLED", "true").lower() == "true"
+if JOB_EVENTS_ENABLED and not LOCAL_BACKENDS and not SUPABASE_SERVICE_ROLE_KEY:
+    print("[JobEvents] 未配置 SUPABASE_SERVICE_ROLE_KEY, 任务事件已关闭")
+    JOB_EVENTS_ENABLED = False
+
+# 事件中携带的任务字段（与任务列表默认返回的摘要列一致，不含 parameters、error_log 等大字段）；
+# 状态转换返回的行只包含其中一部分时只发送这些字段，客户端按 id 合并
+JOB_EVENT_FIELDS = (
+    "id", "user_id", "model_name", "dataset_url", "status", "priority",
+    "created_at", "updated_at", "completed_at", "failed_at",
+    "retry_from", "retry_count", "final_accuracy", "final_loss", "deleted_at",
+)
+
+# 订阅者队列中的特殊事件：积压被丢弃，客户端需要重新拉取任务列表
+RESET = None
+
+
+@dataclass
+class JobEvent:
+    # 发送给客户端的事件ID："{进程epoch}-{序号}"，用于 Last-Event-ID 断线续传
+    id: str
+    seq: int
+    user_id: str
+    job: Dict[str, Any]
+
+
+@dataclass(eq=False)
+class JobSubscription:
+    user_id: str
+    loop: asyncio.AbstractEventLoop
+    max_queue: int
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    # 订阅时从缓冲区补发的事件
+    replay: List[JobEvent] = field(default_factory=list)
+    # Last-Event-ID 已不在缓冲区中（或来自其他进程），客户端需要重新拉取任务列表
+    reset: bool = False
+
+    def _deliver(self, event: JobEvent):
+        """在订阅者的事件循环中执行"""
+        if self.queue.qsize() >= self.max_queue:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+            return
+        self.queue.put_nowait(event)
+
+
+class JobEventHub:
+    """
+    API 进程内的任务事件 pub/sub：代理收到的任务变更按用户分发给 GET /jobs/stream 的连接。
+
+    - publish 可以在任意线程调用（本地代理在 worker 线程中直接投递）；
+    - 每个事件分配递增序号，最近 buffer_size 个事件保留在缓冲区中，重连时按 Last-Event-ID 补发；
+    - 订阅与补发在同一把锁内完成，补发与后续推送之间不会遗漏或重复事件。
+    """
+
+    def __init__(self, buffer_size: int = 10000, queue_size: int = 1000):
+        # 进程重启或连接到其他副本时，旧的事件ID不再有效
+        self.epoch = uuid.uuid4().hex[:8]
+        self.queue_size = queue_size
+        self._seq = 0
+        self._buffer: Deque[JobEvent] = deque(maxlen=buffer_size)
+        self._subscribers: Dict[str, Set[JobSubscription]] = {}
+        self._lock = threading.Lock()
+
+        # 指标
+        self.events_published = 0
+        self.resets = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            subscribers = sum(len(subs) for subs in self._subscribers.values())
+        return {
+            "events_published": self.events_published,
+            "resets": self.resets,
+            "subscribers": subscribers,
+        }
+
+    def publish(self, jobs: List[Dict[str, Any]]):
+        with self._lock:
+            for job in jobs:
+                user_id = job.get("user_id")
+                if not user_id or not job.get("id"):
+                    continue
+                self._seq += 1
+                event = JobEvent(
+                    id=f"{self.epoch}-{self._seq}",
+                    seq=self._seq,
+                    user_id=user_id,
+                    job={key: value for key, value in job.items() if key != "user_id"},
+                )
+                self._buffer.append(event)
+                self.events_published += 1
+                # 在锁内投递，保证每个订阅者按序号顺序收到事件
+                for subscription in self._subscribers.get(user_id, ()):
+                    try:
+                        subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+                    except RuntimeError:
+                        # 事件循环已关闭，连接随之结束
+                        pass
+
+    def _parse_event_id(self, event_id: str) -> Optional[int]:
+        epoch, _, seq = event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def subscribe(self, user_id: str, last_event_id: Optional[str] = None) -> JobSubscription:
+        """在事件循环中调用；last_event_id 为客户端收到的最后一个事件ID"""
+        subscription = JobSubscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            if last_event_id:
+                seq = self._parse_event_id(last_event_id)
+                oldest = self._buffer[0].seq if self._buffer else self._seq + 1
+                if seq is None or seq > self._seq or seq < oldest - 1:
+                    subscription.reset = True
+                    self.resets += 1
+                else:
+                    subscription.replay = [
+                        event for event in self._buffer if event.seq > seq and event.user_id == user_id
+                    ]
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: JobSubscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+
+class RealtimeJobBroker:
+    """
+    通过 Supabase Realtime 广播频道在 worker 与各 API 副本之间传递任务事件。
+
+    - publish 只把事件放入队列立即返回，后台线程批量调用 Realtime 的 HTTP 广播接口（同步 worker 与 async API 都可以调用）；
+    - API 在 lifespan 中用单独的异步客户端订阅频道，收到的事件交给 JobEventHub。
+    发布与订阅都使用 service role key；事件只经 JobEventHub 按用户过滤后发给客户端。
+    Realtime 断线期间的事件会丢失，客户端的列表在下次重新拉取（如 reset 事件）时恢复一致。
+    """
+
+    def __init__(self, url: str, key: str, batch_size: int = 100):
+        self.url = url
+        self.key = key
+        self.endpoint = f"{url}/realtime/v1/api/broadcast"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self.batch_size = batch_size
+        self._pending: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._client = None
+        self._channel = None
+
+    def publish(self, events: List[Dict[str, Any]]):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="job-events-publisher", daemon=True)
+                self._thread.start()
+        for event in events:
+            self._pending.put(event)
+
+    def flush(self, timeout: float = 5.0):
+        """等待队列中的事件发送完（进程退出前调用）"""
+        deadline = time.time() + timeout
+        while self._pending.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+
+    def _run(self):
+        with httpx.Client(timeout=10) as client:
+            while True:
+                batch = [self._pending.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._pending.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    response = client.post(self.endpoint, headers=self.headers, json={
+                        "messages": [
+                            {"topic": JOB_EVENTS_TOPIC, "event": "job", "payload": event, "private": True}
+                            for event in batch
+                        ]
+                    })
+                    response.raise_for_status()
+                except Exception as e:
+                    print(f"[JobEvents] 广播 {len(batch)} 个任务事件失败: {e}")
+                finally:
+                    for _ in batch:
+                        self._pending.task_done()
+
+    async def start(self, listener: Callable[[List[Dict[str, Any]]], None]):
+        from supabase import acreate_client
+        # 不复用 API 查询用的 anon 客户端：私有频道按连接的角色鉴权
+        self._client = client = await acreate_client(self.url, self.key)
+        channel = client.channel(JOB_EVENTS_TOPIC, {
+            "config": {"broadcast": {"ack": False, "self": False}, "presence": {"key": ""}, "private": True}
+        })
+        # 回调参数为广播消息，事件内容在 payload 中
+        channel.on_broadcast("job", lambda message: listener([message.get("payload", message)]))
+        await channel.subscribe()
+        self._channel = channel
+        print(f"[JobEvents] 已订阅 Realtime 频道 {JOB_EVENTS_TOPIC}")
+
+    async def stop(self, listener: Callable[[List[Dict[str, Any]]], None]):
+        if self._channel is None:
+            return
+        try:
+            await self._client.remove_channel(self._channel)
+        except Exception as e:
+            print(f"[JobEvents] 取消订阅失败: {e}")
+        self._client = None
+        self._channel = None
+
+
+# API 进程内共享的事件分发
+hub = JobEventHub(buffer_size=JOB_EVENTS_BUFFER_SIZE, queue_size=JOB_STREAM_QUEUE_SIZE)
+
+_broker = None
+
+
+def get_broker():
+    """任务事件代理（LOCAL_BACKENDS 时为进程内替身）"""
+    global _broker
+    if _broker is None:
+        if LOCAL_BACKENDS:
+            _broker = get_local_job_broker()
+        elif not SUPABASE_SERVICE_ROLE_KEY:
+            raise RuntimeError("SUPABASE_SERVICE_ROLE_KEY is not set; job events need the service role key")
+        else:
+            _broker = RealtimeJobBroker(os.getenv("SUPABASE_URL"), SUPABASE_SERVICE_ROLE_KEY)
+    return _broker
+
+
+def publish_job_changes(rows: Optional[List[Dict[str, Any]]]):
+    """发布新建或状态变更的任务（只发送摘要字段），不阻塞调用方，发布失败不影响状态写入"""
+    if not JOB_EVENTS_ENABLED or not rows:
+        return
+    events = [
+        {key: row[key] for key in JOB_EVENT_FIELDS if key in row}
+        for row in rows
+        if row.get("user_id")
+    ]
+    if not events:
+        return
+    try:
+        get_broker().publish(events)
+    except Exception as e:
+        print(f"[JobEvents] 发布任务事件失败: {e}")
+
+
+def flush_job_events(timeout: float = 5.0):
+    """进程退出前等待已发布的事件发送完"""
+    if JOB_EVENTS_ENABLED and _broker is not None and hasattr(_broker, "flush"):
+        _broker.flush(timeout)
+
+
+async def start_job_events():
+    """API lifespan 中订阅任务事件；订阅失败时 API 照常启动，事件流只发送心跳"""
+    if not JOB_EVENTS_ENABLED:
+        return
+    try:
+        await get_broker().start(hub.publish)
+    except Exception as e:
+        print(f"[JobEvents] 订阅任务事件失败: {e}")
+
+
+async def stop_job_events():
+    if JOB_EVENTS_ENABLED and _broker is not None:
+        await _broker.stop(hub.publish)
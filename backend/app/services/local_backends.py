@@ -0,0 +1,56 @@
+# backend/app/services/local_backends.py
+
+import os
+
+# LOCAL_BACKENDS=true 时 SQS、Supabase、Modal 全部替换为进程内替身（本地运行与压测）
+LOCAL_BACKENDS = os.getenv("LOCAL_BACKENDS", "false").lower() == "true"
+
+# 替身队列的默认 URL（未配置 SQS_QUEUE_URL 时使用）
+LOCAL_QUEUE_URL = "local://training-jobs"
+
+# 同一进程内 API 与 Worker 共用同一组替身
+_sqs = None
+_supabase = None
+_modal = None
+_job_broker = None
+
+
+def get_local_sqs():
+    global _sqs
+    if _sqs is None:
+        from app.services.local_sqs import LocalSQS
+        _sqs = LocalSQS(
+            visibility_timeout=int(os.getenv("SQS_VISIBILITY_TIMEOUT", "30")),
+            latency=float(os.getenv("LOCAL_SQS_LATENCY", "0")),
+        )
+    return _sqs
+
+
+def get_local_supabase():
+    global _supabase
+    if _supabase is None:
+        from app.services.local_supabase import LocalSupabase
+        _supabase = LocalSupabase(latency=float(os.getenv("LOCAL_DB_LATENCY", "0")))
+    return _supabase
+
+
+def get_local_modal():
+    global _modal
+    if _modal is None:
+        from app.services.local_modal import LocalModal
+        _modal = LocalModal(
+            duration=float(os.getenv("LOCAL_TRAIN_DURATION", "2")),
+            failure_rate=float(os.getenv("LOCAL_TRAIN_FAILURE_RATE", "0")),
+            transient_ratio=float(os.getenv("LOCAL_TRAIN_TRANSIENT_RATIO", "0.5")),
+            spawn_latency=float(os.getenv("LOCAL_SPAWN_LATENCY", "0")),
+            cold_start=float(os.getenv("LOCAL_COLD_START", "0")),
+        )
+    return _modal
+
+
+def get_local_job_broker():
+    global _job_broker
+    if _job_broker is None:
+        from app.services.local_job_broker import LocalJobBroker
+        _job_broker = LocalJobBroker()
+    return _job_broker
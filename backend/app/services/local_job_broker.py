@@ -0,0 +1,33 @@
+# backend/app/services/local_job_broker.py
+
+import threading
+from typing import Any, Callable, Dict, List
+
+
+class LocalJobBroker:
+    """
+    进程内的任务事件代理替身（代替 Supabase Realtime 广播频道），用于本地运行和压测：
+    同一进程中 API 与 worker 的状态转换直接投递给订阅者。
+    """
+
+    def __init__(self):
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._lock = threading.Lock()
+
+    def publish(self, events: List[Dict[str, Any]]):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(events)
+            except Exception as e:
+                print(f"[LocalJobBroker] 投递任务事件失败: {e}")
+
+    async def start(self, listener: Callable[[List[Dict[str, Any]]], None]):
+        with self._lock:
+            self._listeners.append(listener)
+
+    async def stop(self, listener: Callable[[List[Dict[str, Any]]], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
@@ -0,0 +1,171 @@
+# backend/app/services/local_modal.py
+
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.services.modal_service import TrainingError, TransientTrainingError
+
+
+class LocalFunctionCall:
+    """模拟的 modal.FunctionCall：到达完成时间前 get(timeout=0) 抛出 TimeoutError"""
+
+    def __init__(self, object_id: str, duration: float, error: Optional[BaseException], result: Dict[str, Any]):
+        self.object_id = object_id
+        self.started_at = time.time()
+        self.finishes_at = self.started_at + duration
+        self._error = error
+        self._result = result
+
+    def get(self, timeout: Optional[float] = None):
+        remaining = self.finishes_at - time.time()
+        if remaining > 0:
+            if timeout is not None and timeout < remaining:
+                if timeout > 0:
+                    time.sleep(timeout)
+                raise TimeoutError()
+            time.sleep(remaining)
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class LocalQueue:
+    """模拟的 modal.Queue（只实现日志流用到的 put / put_many / get_many）"""
+
+    def __init__(self):
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, v: Any, block: bool = True, timeout: Optional[float] = None, **_):
+        self.put_many([v])
+
+    def put_many(self, vs: List[Any], block: bool = True, timeout: Optional[float] = None, **_):
+        with self._cond:
+            self._items.extend(vs)
+            self._cond.notify_all()
+
+    def get_many(self, n_values: int, block: bool = True, timeout: Optional[float] = None, **_) -> List[Any]:
+        with self._cond:
+            if block and not self._items:
+                self._cond.wait(timeout)
+            return [self._items.popleft() for _ in range(min(n_values, len(self._items)))]
+
+
+class _LocalBatchFunction:
+    """模拟已部署的 train_batch 函数"""
+
+    def __init__(self, modal: "LocalModal"):
+        self._modal = modal
+
+    def spawn(self, jobs: List[Dict[str, Any]]) -> LocalFunctionCall:
+        return self._modal.spawn_batch(jobs)
+
+
+class LocalModal:
+    """
+    进程内的 Modal 替身，代替已部署的 train / train_batch 函数：按配置的时长完成训练，
+    并按 failure_rate 随机失败（其中 transient_ratio 比例为可重试的临时故障），
+    spawn_latency 模拟派发调用的网络延迟，cold_start 模拟每次调用的容器冷启动耗时
+    （打包的任务共用一次冷启动）。
+    """
+
+    def __init__(
+        self,
+        duration: float = 2.0,
+        jitter: float = 0.2,
+        failure_rate: float = 0.0,
+        transient_ratio: float = 0.5,
+        spawn_latency: float = 0.0,
+        cold_start: float = 0.0,
+    ):
+        self.duration = duration
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.transient_ratio = transient_ratio
+        self.spawn_latency = spawn_latency
+        self.cold_start = cold_start
+        self._calls: Dict[str, LocalFunctionCall] = {}
+        self._lock = threading.Lock()
+        self.log_queue = LocalQueue()
+        self.batch_function = _LocalBatchFunction(self)
+        # 模拟数据集缓存：见过的数据集地址视为命中
+        self._cached_datasets = set()
+
+    def _simulate(self, model_name: str, dataset_url: str, parameters: dict, job_id: Optional[str]):
+        """模拟一个训练任务：返回 (耗时, 错误, 结果)，并推送日志与每轮指标"""
+        error = None
+        if random.random() < self.failure_rate:
+            if random.random() < self.transient_ratio:
+                error = TransientTrainingError("模拟的临时故障")
+            else:
+                error = TrainingError("模拟的训练失败")
+        result = {
+            "status": "success",
+            "log_lines": 1,
+            "final_accuracy": random.uniform(0.85, 0.95),
+            "final_loss": random.uniform(0.08, 0.4),
+        }
+        duration = max(self.duration * random.uniform(1 - self.jitter, 1 + self.jitter), 0.0)
+        with self._lock:
+            hit = dataset_url in self._cached_datasets
+            self._cached_datasets.add(dataset_url)
+        result["dataset_cache"] = {"hit": hit, "bytes": 0, "fetch_seconds": 0.0, "evicted": 0}
+
+        if job_id:
+            self.log_queue.put({
+                "job_id": job_id,
+                "seq": 0,
+                "line_offset": 0,
+                "lines": [f"模拟训练 {model_name} ({dataset_url}), 预计 {duration:.1f}s"],
+            })
+            self.log_queue.put_many([
+                {
+                    "kind": "metrics",
+                    "job_id": job_id,
+                    "epoch": epoch,
+                    "values": {
+                        "train_loss": random.uniform(0.1, 0.5) / epoch,
+                        "val_loss": random.uniform(0.08, 0.4) / epoch,
+                        "accuracy": 1 - random.uniform(0.05, 0.15) / epoch,
+                    },
+                }
+                for epoch in range(1, int(parameters.get("epochs", 10)) + 1)
+            ])
+        return duration, error, result
+
+    def _register(self, duration: float, error: Optional[BaseException], result: Any) -> LocalFunctionCall:
+        call = LocalFunctionCall(f"fc-local-{uuid.uuid4().hex}", self.cold_start + duration, error, result)
+        with self._lock:
+            self._calls[call.object_id] = call
+        return call
+
+    def spawn(self, model_name: str, dataset_url: str, parameters: dict, job_id: Optional[str] = None, **_) -> LocalFunctionCall:
+        if self.spawn_latency:
+            time.sleep(self.spawn_latency)
+        duration, error, result = self._simulate(model_name, dataset_url, parameters, job_id)
+        return self._register(duration, error, result)
+
+    def spawn_batch(self, jobs: List[Dict[str, Any]]) -> LocalFunctionCall:
+        """模拟 train_batch：任务在同一个容器内依次运行，单个任务的失败记录在各自的结果中"""
+        if self.spawn_latency:
+            time.sleep(self.spawn_latency)
+        total, results = 0.0, {}
+        for job in jobs:
+            duration, error, result = self._simulate(job["model_name"], job["dataset_url"], job["parameters"], job["job_id"])
+            total += duration
+            if error is not None:
+                result = {"status": "failed", "transient": isinstance(error, TransientTrainingError), "error": str(error)}
+            results[job["job_id"]] = result
+        return self._register(total, None, {"batch": True, "results": results})
+
+    def from_id(self, call_id: str) -> LocalFunctionCall:
+        with self._lock:
+            return self._calls[call_id]
+
+    def calls(self) -> Dict[str, LocalFunctionCall]:
+        with self._lock:
+            return dict(self._calls)
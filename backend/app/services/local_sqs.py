@@ -0,0 +1,165 @@
+# backend/app/services/local_sqs.py
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+
+@dataclass
+class _LocalMessage:
+    message_id: str
+    body: str
+    attributes: Dict[str, Any]
+    visible_at: float
+    sent_at: float = field(default_factory=time.time)
+    receipt_handle: Optional[str] = None
+    receive_count: int = 0
+
+
+class LocalSQS:
+    """
+    进程内的 SQS 替身，实现 worker 和 API 用到的 boto3 SQS 客户端子集
+    （收发、可见性超时、批量删除/续期、队列深度），用于本地运行和压测，不需要 AWS。
+    """
+
+    def __init__(self, visibility_timeout: int = 30, latency: float = 0.0):
+        self.visibility_timeout = visibility_timeout
+        # 模拟每次 API 调用的网络延迟（秒）
+        self.latency = latency
+        self._queues: Dict[str, List[_LocalMessage]] = {}
+        self._cond = threading.Condition()
+
+    def _queue(self, url: str) -> List[_LocalMessage]:
+        return self._queues.setdefault(url, [])
+
+    def _simulate_latency(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes=None, DelaySeconds=0, **_):
+        self._simulate_latency()
+        msg = _LocalMessage(
+            message_id=str(uuid.uuid4()),
+            body=MessageBody,
+            attributes=MessageAttributes or {},
+            visible_at=time.time() + DelaySeconds,
+        )
+        with self._cond:
+            self._queue(QueueUrl).append(msg)
+            self._cond.notify_all()
+        return {"MessageId": msg.message_id}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self._simulate_latency()
+        successful = []
+        with self._cond:
+            for entry in Entries:
+                msg = _LocalMessage(
+                    message_id=str(uuid.uuid4()),
+                    body=entry["MessageBody"],
+                    attributes=entry.get("MessageAttributes", {}),
+                    visible_at=time.time() + entry.get("DelaySeconds", 0),
+                )
+                self._queue(QueueUrl).append(msg)
+                successful.append({"Id": entry["Id"], "MessageId": msg.message_id})
+            self._cond.notify_all()
+        return {"Successful": successful, "Failed": []}
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, WaitTimeSeconds=0, VisibilityTimeout=None, **_):
+        self._simulate_latency()
+        visibility = self.visibility_timeout if VisibilityTimeout is None else VisibilityTimeout
+        deadline = time.time() + WaitTimeSeconds
+        with self._cond:
+            while True:
+                now = time.time()
+                ready = [m for m in self._queue(QueueUrl) if m.visible_at <= now][:MaxNumberOfMessages]
+                if ready or now >= deadline:
+                    break
+                next_visible = min((m.visible_at for m in self._queue(QueueUrl)), default=deadline)
+                self._cond.wait(timeout=max(min(deadline, next_visible) - now, 0.01))
+
+            messages = []
+            for m in ready:
+                m.receipt_handle = str(uuid.uuid4())
+                m.receive_count += 1
+                m.visible_at = now + visibility
+                messages.append({
+                    "MessageId": m.message_id,
+                    "ReceiptHandle": m.receipt_handle,
+                    "Body": m.body,
+                    "MessageAttributes": m.attributes,
+                    "Attributes": {
+                        "ApproximateReceiveCount": str(m.receive_count),
+                        "SentTimestamp": str(int(m.sent_at * 1000)),
+                    },
+                })
+        return {"Messages": messages} if messages else {}
+
+    def _find(self, url: str, receipt_handle: str) -> Optional[_LocalMessage]:
+        for m in self._queue(url):
+            if m.receipt_handle == receipt_handle:
+                return m
+        return None
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self._simulate_latency()
+        with self._cond:
+            m = self._find(QueueUrl, ReceiptHandle)
+            if m:
+                self._queue(QueueUrl).remove(m)
+        return {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self._simulate_latency()
+        successful, failed = [], []
+        with self._cond:
+            for entry in Entries:
+                m = self._find(QueueUrl, entry["ReceiptHandle"])
+                if m:
+                    self._queue(QueueUrl).remove(m)
+                    successful.append({"Id": entry["Id"]})
+                else:
+                    failed.append({"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid", "SenderFault": True})
+        return {"Successful": successful, "Failed": failed}
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout):
+        resp = self.change_message_visibility_batch(
+            QueueUrl, [{"Id": "0", "ReceiptHandle": ReceiptHandle, "VisibilityTimeout": VisibilityTimeout}]
+        )
+        if resp["Failed"]:
+            code = resp["Failed"][0]["Code"]
+            raise ClientError({"Error": {"Code": code, "Message": code}}, "ChangeMessageVisibility")
+        return {}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        self._simulate_latency()
+        successful, failed = [], []
+        with self._cond:
+            now = time.time()
+            for entry in Entries:
+                m = self._find(QueueUrl, entry["ReceiptHandle"])
+                if m:
+                    m.visible_at = now + entry["VisibilityTimeout"]
+                    successful.append({"Id": entry["Id"]})
+                else:
+                    failed.append({"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid", "SenderFault": True})
+            self._cond.notify_all()
+        return {"Successful": successful, "Failed": failed}
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames=None):
+        self._simulate_latency()
+        with self._cond:
+            now = time.time()
+            queue = self._queue(QueueUrl)
+            visible = sum(1 for m in queue if m.visible_at <= now)
+            in_flight = sum(1 for m in queue if m.visible_at > now and m.receive_count > 0)
+            delayed = sum(1 for m in queue if m.visible_at > now and m.receive_count == 0)
+        return {"Attributes": {
+            "ApproximateNumberOfMessages": str(visible),
+            "ApproximateNumberOfMessagesNotVisible": str(in_flight),
+            "ApproximateNumberOfMessagesDelayed": str(delayed),
+        }}
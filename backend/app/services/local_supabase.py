@@ -0,0 +1,411 @@
+# backend/app/services/local_supabase.py
+
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+
+@dataclass
+class _Response:
+    data: List[Dict[str, Any]]
+    count: Optional[int] = None
+
+
+class _Query:
+    """PostgREST 查询构造器的子集：insert / upsert / update / delete / select + 过滤、排序、分页"""
+
+    def __init__(self, db: "LocalSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._payload: Any = None
+        self._on_conflict = ["id"]
+        self._ignore_duplicates = False
+        self._columns: Optional[List[str]] = None
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        # 按主键过滤（eq / in_ 作用于 id 列）时的候选 id，直接查找而不扫描整表
+        self._ids: Optional[set] = None
+        self._order: List[Tuple[str, bool]] = []
+        self._offset = 0
+        self._limit: Optional[int] = None
+
+    # 操作
+    def select(self, columns: str = "*"):
+        self._op = "select"
+        if columns.strip() != "*":
+            self._columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, data):
+        self._op, self._payload = "insert", data
+        return self
+
+    def upsert(self, data, on_conflict: str = "id", ignore_duplicates: bool = False):
+        self._op, self._payload = "upsert", data
+        self._on_conflict = [c.strip() for c in on_conflict.split(",")]
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: Dict[str, Any]):
+        self._op, self._payload = "update", data
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    # 过滤
+    def _where(self, predicate: Callable[[Dict[str, Any]], bool]):
+        self._filters.append(predicate)
+        return self
+
+    def _where_ids(self, ids):
+        self._ids = set(ids) if self._ids is None else self._ids & set(ids)
+        return self
+
+    def eq(self, column: str, value):
+        if column == "id":
+            return self._where_ids([value])
+        return self._where(lambda row: row.get(column) == value)
+
+    def neq(self, column: str, value):
+        return self._where(lambda row: row.get(column) != value)
+
+    def in_(self, column: str, values):
+        values = list(values)
+        if column == "id":
+            return self._where_ids(values)
+        return self._where(lambda row: row.get(column) in values)
+
+    def gt(self, column: str, value):
+        return self._where(lambda row: row.get(column) is not None and row[column] > value)
+
+    def gte(self, column: str, value):
+        return self._where(lambda row: row.get(column) is not None and row[column] >= value)
+
+    def lt(self, column: str, value):
+        return self._where(lambda row: row.get(column) is not None and row[column] < value)
+
+    def lte(self, column: str, value):
+        return self._where(lambda row: row.get(column) is not None and row[column] <= value)
+
+    def is_(self, column: str, value):
+        expected = None if value in (None, "null") else value
+        return self._where(lambda row: row.get(column) is expected or row.get(column) == expected)
+
+    def or_(self, filters: str):
+        """PostgREST 的 or 过滤：逗号分隔的 column.op.value，可嵌套 and(...) / or(...)，值可用双引号包裹"""
+        return self._where(_parse_logic("or", filters))
+
+    # 排序与分页
+    def order(self, column: str, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def execute(self) -> _Response:
+        return self._db._execute(self)
+
+
+# or_ 过滤支持的比较运算
+_FILTER_OPS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+}
+
+
+def _split_top_level(expr: str) -> List[str]:
+    """按不在括号和双引号内的逗号切分"""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(expr):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _parse_logic(mode: str, expr: str) -> Callable[[Dict[str, Any]], bool]:
+    predicates = []
+    for term in _split_top_level(expr):
+        for nested in ("and", "or"):
+            if term.startswith(f"{nested}(") and term.endswith(")"):
+                predicates.append(_parse_logic(nested, term[len(nested) + 1:-1]))
+                break
+        else:
+            column, op, value = term.split(".", 2)
+            if value.startswith('"') and value.endswith('"'):
+                value = value[1:-1]
+            predicates.append(_condition(column, _FILTER_OPS[op], value))
+    combine = all if mode == "and" else any
+    return lambda row: combine(predicate(row) for predicate in predicates)
+
+
+def _condition(column: str, compare, value: str) -> Callable[[Dict[str, Any]], bool]:
+    def predicate(row):
+        actual = row.get(column)
+        # 过滤值总是字符串，按列的实际类型比较
+        expected = type(actual)(value) if isinstance(actual, (int, float)) and not isinstance(actual, bool) else value
+        return compare(actual, expected)
+    return predicate
+
+
+class _Rpc:
+    def __init__(self, db: "LocalSupabase", name: str, params: Dict[str, Any]):
+        self._db = db
+        self._name = name
+        self._params = params
+
+    def execute(self) -> _Response:
+        return _Response(self._db._call(self._name, self._params))
+
+
+class _AsyncQuery:
+    """异步查询：构造方法与 _Query 相同，execute() 需要 await，模拟的网络延迟不占用线程"""
+
+    def __init__(self, query: _Query):
+        self._query = query
+
+    def __getattr__(self, name: str):
+        method = getattr(self._query, name)
+
+        def chain(*args, **kwargs):
+            result = method(*args, **kwargs)
+            return self if result is self._query else result
+        return chain
+
+    async def execute(self) -> _Response:
+        db = self._query._db
+        if db.latency:
+            await asyncio.sleep(db.latency)
+        return db._execute(self._query, simulate_latency=False)
+
+
+class _AsyncRpc:
+    def __init__(self, rpc: _Rpc):
+        self._rpc = rpc
+
+    async def execute(self) -> _Response:
+        db = self._rpc._db
+        if db.latency:
+            await asyncio.sleep(db.latency)
+        return _Response(db._call(self._rpc._name, self._rpc._params, simulate_latency=False))
+
+
+class AsyncLocalSupabase:
+    """LocalSupabase 的异步视图（对应 supabase 的 AsyncClient），与同步视图共享同一份数据"""
+
+    def __init__(self, db: "LocalSupabase"):
+        self._db = db
+
+    def table(self, name: str) -> _AsyncQuery:
+        return _AsyncQuery(self._db.table(name))
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> _AsyncRpc:
+        return _AsyncRpc(self._db.rpc(name, params))
+
+
+class LocalSupabase:
+    """
+    进程内的 Supabase 替身，实现 SupabaseService 用到的 table() 查询构造器子集，
+    用于本地运行和压测，不需要 Supabase 项目。
+    """
+
+    def __init__(self, latency: float = 0.0):
+        # 模拟每次请求的网络往返延迟（秒）
+        self.latency = latency
+        self._tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # 每个任务的状态变化记录 (状态, 时间)，供压测统计排队与启动耗时
+        self.status_log: Dict[str, List[Tuple[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> "_Rpc":
+        return _Rpc(self, name, params)
+
+    def _call(self, name: str, params: Dict[str, Any], simulate_latency: bool = True):
+        """迁移中定义的数据库函数的 Python 实现"""
+        if self.latency and simulate_latency:
+            time.sleep(self.latency)
+        with self._lock:
+            return getattr(self, f"_rpc_{name}")(**params)
+
+    def _rpc_append_job_metrics(self, p_job_id, p_epochs, **series):
+        rows = self._rows("job_metrics")
+        row = rows.setdefault(p_job_id, {"job_id": p_job_id, "epochs": []})
+        names = [param[len("p_"):] for param in series]
+        # epoch -> 各指标的值，已记录的轮次优先
+        merged = {
+            epoch: [row.get(name, [])[i] for name in names]
+            for i, epoch in enumerate(row["epochs"])
+        }
+        added = 0
+        for i, epoch in enumerate(p_epochs):
+            if epoch not in merged:
+                merged[epoch] = [values[i] for values in series.values()]
+                added += 1
+        if added:
+            row["epochs"] = sorted(merged)
+            for j, name in enumerate(names):
+                row[name] = [merged[epoch][j] for epoch in row["epochs"]]
+        return added
+
+    def _rpc_increment_job_cache_hits(self, p_job_id):
+        row = self._rows("jobs").get(p_job_id)
+        if row is None:
+            return None
+        row["cache_hits"] = (row.get("cache_hits") or 0) + 1
+        row["updated_at"] = datetime.utcnow().isoformat()
+        return row["cache_hits"]
+
+    def _rpc_find_cached_jobs(self, p_user_id, p_spec_hashes):
+        hashes = set(p_spec_hashes)
+        latest: Dict[str, Dict[str, Any]] = {}
+        for row in self._rows("jobs").values():
+            if (
+                row.get("user_id") == p_user_id
+                and row.get("spec_hash") in hashes
+                and row["status"] == "completed"
+                and not row.get("deleted_at")
+            ):
+                current = latest.get(row["spec_hash"])
+                if current is None or (row.get("completed_at") or "") > (current.get("completed_at") or ""):
+                    latest[row["spec_hash"]] = row
+        return [
+            {"id": row["id"], "spec_hash": row["spec_hash"], "completed_at": row.get("completed_at")}
+            for row in latest.values()
+        ]
+
+    def _rpc_mark_jobs_queued(self, p_job_ids, p_message_ids):
+        rows = self._rows("jobs")
+        now = datetime.utcnow().isoformat()
+        updated = []
+        for job_id, message_id in zip(p_job_ids, p_message_ids):
+            row = rows.get(job_id)
+            if row is None:
+                continue
+            row["sqs_message_id"] = message_id
+            if row["status"] == "pending":
+                row["status"] = "queued"
+            row["outbox_payload"] = None
+            row["outbox_claimed_until"] = None
+            row["updated_at"] = now
+            self._record_status(row)
+            updated.append({key: row.get(key) for key in ("id", "user_id", "status", "updated_at")})
+        return updated
+
+    def _rpc_claim_outbox_jobs(self, p_limit, p_lease_seconds):
+        now = datetime.utcnow()
+        claimable = sorted(
+            (
+                row for row in self._rows("jobs").values()
+                if row.get("outbox_payload") is not None
+                and row["status"] == "pending"
+                and (not row.get("outbox_claimed_until") or row["outbox_claimed_until"] < now.isoformat())
+            ),
+            key=lambda row: row.get("created_at") or "",
+        )[:p_limit]
+        lease_until = (now + timedelta(seconds=p_lease_seconds)).isoformat()
+        for row in claimable:
+            row["outbox_claimed_until"] = lease_until
+            row["outbox_attempts"] = (row.get("outbox_attempts") or 0) + 1
+            row["updated_at"] = now.isoformat()
+        return copy.deepcopy(claimable)
+
+    def _rows(self, table: str) -> Dict[str, Dict[str, Any]]:
+        return self._tables.setdefault(table, {})
+
+    def _record_status(self, row: Dict[str, Any]):
+        if "status" in row and "id" in row:
+            log = self.status_log.setdefault(row["id"], [])
+            if not log or log[-1][0] != row["status"]:
+                log.append((row["status"], time.time()))
+
+    def _execute(self, query: _Query, simulate_latency: bool = True) -> _Response:
+        if self.latency and simulate_latency:
+            time.sleep(self.latency)
+        with self._lock:
+            rows = self._rows(query._table)
+            if query._op in ("insert", "upsert"):
+                return _Response(self._insert(rows, query))
+
+            candidates = rows.values() if query._ids is None else [rows[i] for i in query._ids if i in rows]
+            matched = [row for row in candidates if all(f(row) for f in query._filters)]
+            if query._op == "update":
+                for row in matched:
+                    row.update(copy.deepcopy(query._payload))
+                    self._record_status(row)
+                return _Response(copy.deepcopy(matched))
+            if query._op == "delete":
+                for row in matched:
+                    del rows[row["id"]]
+                return _Response(copy.deepcopy(matched))
+
+            # 多列排序：从最后一个排序键开始依次稳定排序
+            for column, desc in reversed(query._order):
+                matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            end = None if query._limit is None else query._offset + query._limit
+            selected = matched[query._offset:end]
+            if query._columns:
+                selected = [{c: row.get(c) for c in query._columns} for row in selected]
+            return _Response(copy.deepcopy(selected))
+
+    def _insert(self, rows: Dict[str, Dict[str, Any]], query: _Query) -> List[Dict[str, Any]]:
+        records = query._payload if isinstance(query._payload, list) else [query._payload]
+        upsert = query._op == "upsert"
+
+        def conflict(record):
+            key = [record.get(c) for c in query._on_conflict]
+            for row in rows.values():
+                if [row.get(c) for c in query._on_conflict] == key:
+                    return row
+            return None
+
+        if not upsert:
+            for record in records:
+                if record.get("id") in rows:
+                    raise APIError({
+                        "message": f"duplicate key value violates unique constraint (id={record['id']})",
+                        "code": "23505",
+                    })
+
+        inserted = []
+        for record in records:
+            existing = conflict(record) if upsert else None
+            if existing is not None:
+                if query._ignore_duplicates:
+                    continue
+                existing.update(copy.deepcopy(record))
+                row = existing
+            else:
+                row = copy.deepcopy(record)
+                rows[row.setdefault("id", str(uuid.uuid4()))] = row
+            self._record_status(row)
+            inserted.append(copy.deepcopy(row))
+        return inserted
@@ -2,30 +2,254 @@
 
 import modal
 import os
+import time
+from collections import deque
+from typing import List, Optional
+
+# 已部署的 Modal 应用名称（通过 `modal deploy app/services/modal_service.py` 部署）
+MODAL_APP_NAME = os.getenv("MODAL_APP_NAME", "training-job")
 
 # Modal 会自动使用已配置的 Token，不需要手动设置
-app = modal.App("training-job")
-
-@app.function(
-    image=modal.Image.debian_slim().pip_install("torch","torchvision"), 
-    timeout=3600,
-)
-def train(model_name: str, dataset_url: str, parameters: dict):
-    """训练函数 - 包含详细的日志记录"""
+app = modal.App(MODAL_APP_NAME)
+
+class TrainingError(Exception):
+    """训练失败（参数、数据或代码问题），重试不会成功"""
+
+class TransientTrainingError(TrainingError):
+    """训练因临时故障失败（例如下载数据集时网络中断），可以自动重试"""
+
+# 训练日志流：train 把日志块与每轮指标写入该 Queue，Worker 读取后追加到 job_logs / job_metrics 表
+LOG_QUEUE_NAME = os.getenv("LOG_QUEUE_NAME", "training-logs")
+
+# 数据集缓存：持久化 Volume 挂载到训练容器的 /cache，超过上限时按 LRU 淘汰
+DATASET_CACHE_VOLUME = os.getenv("DATASET_CACHE_VOLUME", "dataset-cache")
+DATASET_CACHE_DIR = "/cache/datasets"
+DATASET_CACHE_MAX_BYTES = int(float(os.getenv("DATASET_CACHE_MAX_GB", "50")) * 1024 ** 3)
+dataset_volume = modal.Volume.from_name(DATASET_CACHE_VOLUME, create_if_missing=True)
+# 各容器共享的下载锁与访问时间（Volume 上的文件在容器之间不是原子共享的）
+DATASET_CACHE_REGISTRY = os.getenv("DATASET_CACHE_REGISTRY", "dataset-cache-registry")
+dataset_registry = modal.Dict.from_name(DATASET_CACHE_REGISTRY, create_if_missing=True)
+
+# 训练检查点：持久化 Volume 挂载到训练容器的 /checkpoints，重试任务从父任务最近的有效检查点继续
+CHECKPOINT_VOLUME = os.getenv("CHECKPOINT_VOLUME", "training-checkpoints")
+CHECKPOINT_DIR = "/checkpoints"
+CHECKPOINT_EVERY = int(os.getenv("CHECKPOINT_EVERY", "5"))
+checkpoint_volume = modal.Volume.from_name(CHECKPOINT_VOLUME, create_if_missing=True)
+# 未完成任务（失败、删除）的检查点保留天数，期间手动重试仍可从检查点继续；定期清理的间隔（小时）
+CHECKPOINT_TTL_DAYS = float(os.getenv("CHECKPOINT_TTL_DAYS", "7"))
+CHECKPOINT_SWEEP_HOURS = int(os.getenv("CHECKPOINT_SWEEP_HOURS", "6"))
+
+def get_log_queue():
+    """获取训练日志 Queue（LOCAL_BACKENDS 时为进程内替身）"""
+    from app.services.local_backends import LOCAL_BACKENDS, get_local_modal
+    if LOCAL_BACKENDS:
+        return get_local_modal().log_queue
+    return modal.Queue.from_name(LOG_QUEUE_NAME, create_if_missing=True)
+
+class LogStream:
+    """
+    训练日志分块输出：每 chunk_lines 行或 flush_seconds 秒向日志 Queue 推送一块，
+    进程内只保留最初 head_lines 行和最近 tail_lines 行的环形缓冲（用于失败时的错误信息），
+    单行超过 max_line_chars 时截断，内存占用与训练时长无关。
+
+    推送不阻塞（put(block=False)）：Worker 停止读取、Queue 已满或推送出错时训练照常进行，
+    日志行与指标事件留在有界的待推送缓冲中，flush_seconds 后重试，超出上限时丢弃最早的。
+    """
+
+    def __init__(
+        self,
+        job_id: Optional[str],
+        queue=None,
+        chunk_lines: int = 50,
+        flush_seconds: float = 2.0,
+        tail_lines: int = 50,
+        max_pending_lines: int = 1000,
+        head_lines: int = 20,
+        max_line_chars: int = 2000,
+        max_pending_events: int = 1000,
+    ):
+        self.job_id = job_id
+        self.queue = queue
+        self.chunk_lines = chunk_lines
+        self.flush_seconds = flush_seconds
+        self.max_pending_lines = max_pending_lines
+        self.head_lines = head_lines
+        self.max_line_chars = max_line_chars
+        self.max_pending_events = max_pending_events
+        self.line_count = 0
+        self._seq = 0
+        self._pending: List[str] = []
+        # 待推送第一行的行号
+        self._pending_offset = 0
+        self._last_flush = time.time()
+        # 推送失败后，flush_seconds 内不再重试
+        self._retry_at = 0.0
+        # 推送失败、等待重试的指标与续训事件
+        self._events: List[dict] = []
+        self._head: List[str] = []
+        self._tail = deque(maxlen=tail_lines)
+
+    def write(self, line: str):
+        if len(line) > self.max_line_chars:
+            line = line[:self.max_line_chars] + f" ... [截断 {len(line) - self.max_line_chars} 个字符]"
+        self.line_count += 1
+        if len(self._head) < self.head_lines:
+            self._head.append(line)
+        else:
+            self._tail.append(line)
+        if self.queue is None or not self.job_id:
+            return
+        self._pending.append(line)
+        # 积压过多（推送持续失败）时丢弃最早的行，保证内存有界
+        overflow = len(self._pending) - self.max_pending_lines
+        if overflow > 0:
+            del self._pending[:overflow]
+            self._pending_offset += overflow
+        now = time.time()
+        if now >= self._retry_at and (len(self._pending) >= self.chunk_lines or now - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def _put(self, item: dict) -> bool:
+        try:
+            self.queue.put(item, block=False)
+            return True
+        except Exception as e:
+            # 包括 queue.Full：推送失败不影响训练，稍后重试
+            print(f"[LogStream] 推送日志失败: {e}")
+            self._retry_at = time.time() + self.flush_seconds
+            return False
+
+    def flush(self):
+        if self.queue is None:
+            return
+        self.flush_events()
+        if not self._pending:
+            return
+        chunk = {
+            "job_id": self.job_id,
+            "seq": self._seq,
+            "line_offset": self._pending_offset,
+            "lines": list(self._pending),
+        }
+        self._last_flush = time.time()
+        if not self._put(chunk):
+            return
+        self._seq += 1
+        self._pending_offset += len(self._pending)
+        self._pending = []
+
+    def summary(self) -> List[str]:
+        """最初几行 + 最近几行，中间省略的行数用一行说明代替"""
+        omitted = self.line_count - len(self._head) - len(self._tail)
+        gap = [f"... [省略 {omitted} 行, 完整日志见 job_logs] ..."] if omitted > 0 else []
+        return self._head + gap + list(self._tail)
+
+    def write_metrics(self, epoch: int, values: dict):
+        """推送一轮训练指标（与日志共用 Queue，由 Worker 写入 job_metrics）"""
+        self._put_event({"kind": "metrics", "epoch": epoch, "values": values})
+
+    def write_resume(self, epoch: int):
+        """推送断点续训的起始轮次（由 Worker 记录到任务的 resume_epoch）"""
+        self._put_event({"kind": "resume", "epoch": epoch})
+
+    def _put_event(self, event: dict):
+        if self.queue is None or not self.job_id:
+            return
+        self._events.append(dict(event, job_id=self.job_id))
+        if time.time() >= self._retry_at:
+            self.flush_events()
+        if len(self._events) > self.max_pending_events:
+            overflow = len(self._events) - self.max_pending_events
+            print(f"[LogStream] 待推送事件过多, 丢弃最早的 {overflow} 个")
+            del self._events[:overflow]
+
+    def flush_events(self):
+        while self._events and self._put(self._events[0]):
+            self._events.pop(0)
+
+# 已部署 train 函数的句柄（首次使用时懒加载）
+_train_function = None
+
+def get_train_function():
+    """获取已部署应用中的 train 函数句柄，避免每个任务都启动临时应用"""
+    global _train_function
+    from app.services.local_backends import LOCAL_BACKENDS, get_local_modal
+    if LOCAL_BACKENDS:
+        return get_local_modal()
+    if _train_function is None:
+        _train_function = modal.Function.from_name(MODAL_APP_NAME, "train")
+    return _train_function
+
+def spawn_training(
+    model_name: str,
+    dataset_url: str,
+    parameters: dict,
+    job_id: Optional[str] = None,
+    resume_from: Optional[str] = None
+) -> modal.FunctionCall:
+    """异步派发训练任务，立即返回 FunctionCall（不等待训练结束）；resume_from 为断点续训的父任务ID"""
+    return get_train_function().spawn(
+        model_name=model_name,
+        dataset_url=dataset_url,
+        parameters=parameters,
+        job_id=job_id,
+        resume_from=resume_from
+    )
+
+# 已部署 train_batch 函数的句柄（首次使用时懒加载）
+_train_batch_function = None
+
+def get_train_batch_function():
+    """获取已部署应用中的 train_batch 函数句柄"""
+    global _train_batch_function
+    from app.services.local_backends import LOCAL_BACKENDS, get_local_modal
+    if LOCAL_BACKENDS:
+        return get_local_modal().batch_function
+    if _train_batch_function is None:
+        _train_batch_function = modal.Function.from_name(MODAL_APP_NAME, "train_batch")
+    return _train_batch_function
+
+def spawn_training_batch(jobs: List[dict]) -> modal.FunctionCall:
+    """
+    异步派发一批打包的训练任务（同一个容器内依次运行），立即返回 FunctionCall。
+    每个任务包含 job_id、model_name、dataset_url、parameters 和可选的 resume_from；
+    调用结果为 {"batch": True, "results": {job_id: 结果}}。
+    """
+    return get_train_batch_function().spawn(jobs=jobs)
+
+def get_function_call(call_id: str) -> modal.FunctionCall:
+    """根据持久化在任务记录上的 call id 重新获取 FunctionCall 句柄（用于接管运行中的任务）"""
+    from app.services.local_backends import LOCAL_BACKENDS, get_local_modal
+    if LOCAL_BACKENDS:
+        return get_local_modal().from_id(call_id)
+    return modal.FunctionCall.from_id(call_id)
+
+# train 与 train_batch 共用的镜像和挂载
+training_image = modal.Image.debian_slim().pip_install("torch","torchvision","boto3").add_local_python_source("app")
+training_volumes = {"/cache": dataset_volume, CHECKPOINT_DIR: checkpoint_volume}
+
+def run_training(
+    model_name: str,
+    dataset_url: str,
+    parameters: dict,
+    job_id: Optional[str] = None,
+    resume_from: Optional[str] = None
+) -> dict:
+    """执行一个训练任务（在 Modal 容器内运行），失败时抛出 TrainingError / TransientTrainingError"""
     import time
     import random
     import traceback
     from datetime import datetime
     
-    # 初始化日志
-    logs = []
+    # 初始化日志流
+    stream = LogStream(job_id, modal.Queue.from_name(LOG_QUEUE_NAME, create_if_missing=True) if job_id else None)
     
     def log(message):
         """记录日志"""
         timestamp = datetime.utcnow().isoformat()
         log_entry = f"[{timestamp}] {message}"
         print(log_entry)
-        logs.append(log_entry)
+        stream.write(log_entry)
     
     try:
         log(f"=== 开始训练任务 ===")
@@ -40,11 +264,19 @@ def train(model_name: str, dataset_url: str, parameters: dict):
         log(f"Python版本: {sys.version}")
         log(f"工作目录: {os.getcwd()}")
         
-        # 步骤2: 数据准备
+        # 步骤2: 数据准备（同一数据集只下载一次，重试任务直接命中缓存）
         log("步骤2: 准备训练数据...")
-        log(f"从 {dataset_url} 下载数据集...")
-        time.sleep(1)  # 模拟数据下载
-        log("数据集下载完成")
+        from app.services.dataset_cache import DatasetCache
+        cache = DatasetCache(
+            DATASET_CACHE_DIR,
+            DATASET_CACHE_MAX_BYTES,
+            commit=dataset_volume.commit,
+            reload=dataset_volume.reload,
+            registry=dataset_registry
+        )
+        dataset_path, cache_stats = cache.get(dataset_url)
+        log(f"数据集{'命中缓存' if cache_stats['hit'] else '下载完成'}: {dataset_path} "
+            f"({cache_stats['bytes']} bytes, {cache_stats['fetch_seconds']}s, 淘汰 {cache_stats['evicted']} 个)")
         
         # 步骤3: 模型初始化
         log("步骤3: 初始化模型...")
@@ -60,7 +292,25 @@ def train(model_name: str, dataset_url: str, parameters: dict):
         
         log(f"训练配置: epochs={epochs}, batch_size={batch_size}, lr={learning_rate}")
         
-        for epoch in range(epochs):
+        from app.services.checkpoints import CheckpointStore
+        checkpoints = CheckpointStore(CHECKPOINT_DIR, commit=checkpoint_volume.commit, reload=checkpoint_volume.reload)
+        start_epoch = 0
+        train_loss = val_loss = accuracy = None
+        if resume_from:
+            checkpoint = checkpoints.latest(resume_from)
+            state = checkpoint["state"] if checkpoint else {}
+            if checkpoint and state.get("model_name") == model_name and state.get("dataset_url") == dataset_url:
+                start_epoch = min(checkpoint["epoch"], epochs)
+                train_loss, val_loss, accuracy = state.get("train_loss"), state.get("val_loss"), state.get("accuracy")
+                log(f"从父任务 {resume_from} 的检查点继续: epoch {start_epoch}/{epochs}")
+                stream.write_resume(start_epoch)
+                # 复制到本任务名下，本任务在下一个检查点前失败时，后续重试仍能从这里继续
+                if job_id:
+                    checkpoints.save(job_id, start_epoch, state)
+            else:
+                log(f"父任务 {resume_from} 没有可用的检查点, 从头开始训练")
+        
+        for epoch in range(start_epoch, epochs):
             log(f"Epoch {epoch+1}/{epochs}: 开始训练...")
             time.sleep(0.5)  # 模拟每个epoch的训练时间
             
@@ -70,6 +320,17 @@ def train(model_name: str, dataset_url: str, parameters: dict):
             accuracy = random.uniform(0.85, 0.95)
             
             log(f"Epoch {epoch+1}/{epochs}: train_loss={train_loss:.4f}, val_loss={val_loss:.4f}, accuracy={accuracy:.4f}")
+            stream.write_metrics(epoch + 1, {"train_loss": train_loss, "val_loss": val_loss, "accuracy": accuracy})
+            
+            if job_id and ((epoch + 1) % CHECKPOINT_EVERY == 0 or epoch + 1 == epochs):
+                checkpoints.save(job_id, epoch + 1, {
+                    "model_name": model_name,
+                    "dataset_url": dataset_url,
+                    "train_loss": train_loss,
+                    "val_loss": val_loss,
+                    "accuracy": accuracy,
+                })
+                log(f"Epoch {epoch+1}/{epochs}: 检查点已保存")
         
         # 步骤5: 模型保存
         log("步骤5: 保存训练结果...")
@@ -79,14 +340,19 @@ def train(model_name: str, dataset_url: str, parameters: dict):
         # 步骤6: 清理资源
         log("步骤6: 清理训练资源...")
         log("GPU内存已释放")
-        log("临时文件已清理")
+        if job_id:
+            checkpoints.clear(job_id)
+        log("临时文件与检查点已清理")
         
         log("=== 训练任务完成 ===")
         log(f"结束时间: {datetime.utcnow().isoformat()}")
+        stream.flush()
         
         return {
             "status": "success",
-            "logs": logs,
+            "log_lines": stream.line_count,
+            "dataset_cache": cache_stats,
+            "resume_epoch": start_epoch,
             "final_accuracy": accuracy,
             "final_loss": val_loss
         }
@@ -100,7 +366,65 @@ def train(model_name: str, dataset_url: str, parameters: dict):
             if line.strip():
                 log(f"  {line}")
         log(f"失败时间: {datetime.utcnow().isoformat()}")
+        stream.flush()
         
-        # 将日志作为错误信息的一部分抛出
-        error_with_logs = f"训练失败\n\n详细日志:\n" + "\n".join(logs)
-        raise Exception(error_with_logs)
+        # 将日志首尾摘要作为错误信息的一部分抛出（完整日志见 job_logs），网络类错误标记为可重试
+        error_with_logs = f"训练失败\n\n日志摘要:\n" + "\n".join(stream.summary())
+        if isinstance(e, (ConnectionError, TimeoutError)):
+            raise TransientTrainingError(error_with_logs)
+        raise TrainingError(error_with_logs)
+
+@app.function(image=training_image, timeout=3600, volumes=training_volumes)
+def train(
+    model_name: str,
+    dataset_url: str,
+    parameters: dict,
+    job_id: Optional[str] = None,
+    resume_from: Optional[str] = None
+):
+    """训练函数 - 训练日志按块实时推送到日志 Queue，定期保存检查点，重试任务从父任务的检查点继续"""
+    return run_training(model_name, dataset_url, parameters, job_id=job_id, resume_from=resume_from)
+
+@app.function(image=training_image, timeout=3600, volumes=training_volumes)
+def train_batch(jobs: List[dict]):
+    """
+    打包训练：在同一个容器内依次运行多个短任务，分摊容器冷启动与数据集准备的开销。
+    单个任务失败不影响其他任务，按 job_id 分别返回每个任务的结果或错误。
+    """
+    results = {}
+    for job in jobs:
+        try:
+            results[job["job_id"]] = run_training(
+                job["model_name"],
+                job["dataset_url"],
+                job["parameters"],
+                job_id=job["job_id"],
+                resume_from=job.get("resume_from")
+            )
+        except TrainingError as e:
+            results[job["job_id"]] = {
+                "status": "failed",
+                "transient": isinstance(e, TransientTrainingError),
+                "error": str(e)
+            }
+    return {"batch": True, "results": results}
+
+@app.function(image=training_image, volumes={CHECKPOINT_DIR: checkpoint_volume}, schedule=modal.Period(hours=CHECKPOINT_SWEEP_HOURS))
+def sweep_checkpoints():
+    """定期删除超过保留期限的检查点：永久失败、已删除或训练容器异常退出的任务不会走到成功后的清理"""
+    from app.services.checkpoints import CheckpointStore
+    checkpoints = CheckpointStore(CHECKPOINT_DIR, commit=checkpoint_volume.commit, reload=checkpoint_volume.reload)
+    removed = checkpoints.sweep(CHECKPOINT_TTL_DAYS * 86400)
+    print(f"[Checkpoints] 已清理 {removed} 个过期任务的检查点")
+    return removed
+
+async def clear_job_checkpoints(job_id: str):
+    """在训练容器之外删除任务的检查点（例如删除任务时），失败时留给 sweep_checkpoints 清理"""
+    from app.services.local_backends import LOCAL_BACKENDS
+    if LOCAL_BACKENDS:
+        return
+    try:
+        await checkpoint_volume.remove_file.aio(f"/{job_id}", recursive=True)
+    except Exception as e:
+        # 任务没有检查点（例如已完成）时同样会失败
+        print(f"Checkpoints for job {job_id} not removed: {e}")
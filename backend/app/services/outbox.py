@@ -0,0 +1,149 @@
+# backend/app/services/outbox.py
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.sqs_service import enqueue_jobs
+from app.services.supabase_service import SupabaseService
+
+# dispatcher 配置
+OUTBOX_DISPATCHER_ENABLED = os.getenv("OUTBOX_DISPATCHER_ENABLED", "true").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+# 认领租约：dispatcher 在租约内崩溃时，租约到期后由其他 dispatcher 重新推送
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+# 推送失败的任务在认领这么多次后标记为失败
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+
+
+def outbox_fields(payload: Dict[str, Any], reserved: bool = False) -> Dict[str, Any]:
+    """
+    任务行上的发件箱字段：与任务一起在同一次 INSERT 中写入待推送的消息体。
+    reserved 时由当前请求自己推送，租约内 dispatcher 不会认领；请求中途失败时租约到期后由 dispatcher 补推。
+    """
+    fields = {"outbox_payload": payload}
+    if reserved:
+        fields["outbox_claimed_until"] = (datetime.utcnow() + timedelta(seconds=OUTBOX_LEASE_SECONDS)).isoformat()
+    return fields
+
+
+class OutboxDispatcher:
+    """
+    发件箱 dispatcher：把 outbox_payload 非空的 pending 任务批量推送到 SQS。
+
+    - 以 claim_outbox_jobs 认领一批任务（FOR UPDATE SKIP LOCKED + 租约），多个 API 副本可以同时运行；
+    - enqueue_jobs 按队列每 10 条一次 send_message_batch 并行推送；
+    - mark_jobs_queued 一次请求写回所有消息ID并移出发件箱。
+
+    每个任务只有在认领租约到期后才会被再次推送，只有 dispatcher 在推送后、写回前崩溃时才会重复推送；
+    重复的消息由 worker 的 running 条件转换丢弃，任务仍只训练一次。
+    notify() 在提交任务后立即唤醒 dispatcher，否则每 poll_interval 秒检查一次。
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        lease_seconds: int = 60,
+        max_attempts: int = 5,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 指标
+        self.jobs_dispatched = 0
+        self.send_failures = 0
+        self.jobs_failed = 0
+        self.batches = 0
+
+    def notify(self):
+        """有新任务写入发件箱"""
+        self._wake.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "jobs_dispatched": self.jobs_dispatched,
+            "send_failures": self.send_failures,
+            "jobs_failed": self.jobs_failed,
+            "batches": self.batches,
+        }
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+        print(f"[Outbox] dispatcher 启动, 每批 {self.batch_size} 个任务")
+
+    def stop(self):
+        """停止后台线程，并推送发件箱中剩余的任务"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.drain()
+        print(f"[Outbox] dispatcher 已停止: {self.stats()}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"[Outbox] 推送发件箱失败: {e}")
+                time.sleep(self.poll_interval)
+
+    def drain(self) -> int:
+        """推送直到发件箱中没有可认领的任务，返回推送成功的任务数"""
+        total = 0
+        while True:
+            claimed, dispatched = self.dispatch_once()
+            total += dispatched
+            if claimed < self.batch_size:
+                return total
+
+    def dispatch_once(self) -> Tuple[int, int]:
+        """认领并推送一批任务，返回 (认领数, 推送成功数)"""
+        jobs = SupabaseService.claim_outbox_jobs(self.batch_size, self.lease_seconds)
+        if not jobs:
+            return 0, 0
+        self.batches += 1
+        message_ids = enqueue_jobs([job["outbox_payload"] for job in jobs])
+
+        sent = [(job["id"], msg_id) for job, msg_id in zip(jobs, message_ids) if msg_id]
+        unsent: List[Dict[str, Any]] = [job for job, msg_id in zip(jobs, message_ids) if not msg_id]
+        if sent:
+            SupabaseService.mark_jobs_queued([job_id for job_id, _ in sent], [msg_id for _, msg_id in sent])
+            self.jobs_dispatched += len(sent)
+        if unsent:
+            # 未推送的任务留在发件箱中，租约到期后重试；多次失败的标记为失败
+            self.send_failures += len(unsent)
+            give_up = [job["id"] for job in unsent if (job.get("outbox_attempts") or 0) >= self.max_attempts]
+            if give_up:
+                print(f"[Outbox] {len(give_up)} 个任务推送 {self.max_attempts} 次仍失败, 标记为失败")
+                failed = SupabaseService.transition_jobs_status(
+                    give_up, "failed", {"error_log": "Failed to enqueue job", "outbox_payload": None}
+                )
+                self.jobs_failed += len(failed)
+        print(f"[Outbox] 推送 {len(sent)}/{len(jobs)} 个任务")
+        return len(jobs), len(sent)
+
+
+# API 进程内共享的 dispatcher
+dispatcher = OutboxDispatcher(
+    batch_size=OUTBOX_BATCH_SIZE,
+    poll_interval=OUTBOX_POLL_INTERVAL,
+    lease_seconds=OUTBOX_LEASE_SECONDS,
+    max_attempts=OUTBOX_MAX_ATTEMPTS,
+)
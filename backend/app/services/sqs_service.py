@@ -2,33 +2,149 @@
 from dotenv import load_dotenv
 load_dotenv()
 import os
+import asyncio
 import boto3
 import json
-from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from app.services.local_backends import LOCAL_BACKENDS, LOCAL_QUEUE_URL, get_local_sqs
 
 # 从环境变量读取队列 URL
-SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL")
+SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL") or (LOCAL_QUEUE_URL if LOCAL_BACKENDS else None)
+# 批量任务使用独立队列；未配置时与交互式任务共用同一个队列
+SQS_BULK_QUEUE_URL = os.getenv("SQS_BULK_QUEUE_URL") or SQS_QUEUE_URL
 
-# 初始化 SQS 客户端
-sqs = boto3.client("sqs", region_name=os.getenv("AWS_DEFAULT_REGION"))
+# 优先级通道 -> 队列 URL
+PRIORITY_QUEUE_URLS = {
+    "interactive": SQS_QUEUE_URL,
+    "bulk": SQS_BULK_QUEUE_URL,
+}
 
-def enqueue_job(job_payload: dict) -> str:
+def queue_url_for(priority: str) -> str:
+    """根据任务优先级选择队列"""
+    return PRIORITY_QUEUE_URLS.get(priority, SQS_QUEUE_URL)
+
+# send_message_batch 每批最多 10 条消息
+SQS_BATCH_SIZE = 10
+# 批量推送时并行发送的批次数
+SQS_BATCH_PARALLELISM = int(os.getenv("SQS_BATCH_PARALLELISM", "8"))
+
+# SQS 客户端的 HTTP 连接池大小，也是 API 中同时进行的 SQS 调用数上限
+SQS_MAX_POOL_CONNECTIONS = int(os.getenv("SQS_MAX_POOL_CONNECTIONS", "50"))
+
+# 初始化 SQS 客户端（LOCAL_BACKENDS 时使用进程内替身）；boto3 客户端线程安全，所有线程共享同一个连接池
+sqs = get_local_sqs() if LOCAL_BACKENDS else boto3.client(
+    "sqs",
+    region_name=os.getenv("AWS_DEFAULT_REGION"),
+    config=Config(max_pool_connections=SQS_MAX_POOL_CONNECTIONS, tcp_keepalive=True),
+)
+
+# API 的异步推送：boto3 没有异步接口，SQS 调用在专用的有界线程池中执行，不占用事件循环
+_async_executor: Optional[ThreadPoolExecutor] = None
+
+def open_async_sqs():
+    """创建异步推送使用的线程池（在应用 lifespan 中调用）"""
+    global _async_executor
+    if _async_executor is None:
+        _async_executor = ThreadPoolExecutor(max_workers=SQS_MAX_POOL_CONNECTIONS, thread_name_prefix="sqs")
+
+def close_async_sqs():
+    global _async_executor
+    if _async_executor is not None:
+        _async_executor.shutdown(wait=True)
+        _async_executor = None
+
+async def _run_async(fn, *args):
+    # 未经 lifespan 创建线程池时（如 TestClient）退回到事件循环的默认线程池
+    return await asyncio.get_running_loop().run_in_executor(_async_executor, fn, *args)
+
+def enqueue_job(job_payload: dict, delay_seconds: int = 0) -> str:
     """
-    将 job_payload 推入 SQS 队列，返回 MessageId。
+    将 job_payload 按其 priority 推入对应的 SQS 队列，返回 MessageId。
+    delay_seconds 为投递延迟（最长 900 秒），用于自动重试的退避。
     """
     try:
         print(f"[SQS] 即将推送到 SQS 的内容: {json.dumps(job_payload, ensure_ascii=False, indent=2)}")
         resp = sqs.send_message(
-            QueueUrl=SQS_QUEUE_URL,
+            QueueUrl=queue_url_for(job_payload.get("priority", "interactive")),
             MessageBody=json.dumps(job_payload),
-            MessageAttributes={
-                'JobType': {
-                    'StringValue': job_payload.get("type", "training"),
-                    'DataType': 'String'
-                }
-            }
+            DelaySeconds=delay_seconds,
+            MessageAttributes=_message_attributes(job_payload)
         )
         return resp['MessageId']
     except ClientError as e:
         # 可根据需要改为日志或自定义异常
         raise RuntimeError(f"Failed to enqueue job: {e}")
+
+def _message_attributes(job_payload: dict) -> dict:
+    return {
+        'JobType': {
+            'StringValue': job_payload.get("type", "training"),
+            'DataType': 'String'
+        }
+    }
+
+def _send_batch(queue_url: str, payloads: List[dict]) -> List[Optional[str]]:
+    """发送一批（最多 10 条）消息，返回与 payloads 一一对应的 MessageId，发送失败的为 None"""
+    entries = [
+        {
+            "Id": str(i),
+            "MessageBody": json.dumps(payload),
+            "MessageAttributes": _message_attributes(payload),
+        }
+        for i, payload in enumerate(payloads)
+    ]
+    message_ids: List[Optional[str]] = [None] * len(payloads)
+    # 部分失败的条目重发一次
+    for _ in range(2):
+        try:
+            resp = sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
+        except (ClientError, BotoCoreError) as e:
+            # 包括连接失败、超时等 BotoCoreError：本批未成功的条目按推送失败返回 None
+            print(f"[SQS] 批量推送失败: {e}")
+            continue
+        for ok in resp.get("Successful", []):
+            message_ids[int(ok["Id"])] = ok["MessageId"]
+        failed = {item["Id"] for item in resp.get("Failed", [])}
+        entries = [entry for entry in entries if entry["Id"] in failed]
+        if not entries:
+            break
+        print(f"[SQS] 批量推送中 {len(entries)} 条失败, 重试")
+    return message_ids
+
+def enqueue_jobs(job_payloads: List[dict]) -> List[Optional[str]]:
+    """
+    批量推送多个任务：按 priority 分到对应队列，每 10 条一次 send_message_batch，
+    各批次并行发送。返回与 job_payloads 一一对应的 MessageId，推送失败的为 None。
+    """
+    batches = []
+    by_queue = {}
+    for i, payload in enumerate(job_payloads):
+        by_queue.setdefault(queue_url_for(payload.get("priority", "interactive")), []).append(i)
+    for queue_url, indexes in by_queue.items():
+        for start in range(0, len(indexes), SQS_BATCH_SIZE):
+            batches.append((queue_url, indexes[start:start + SQS_BATCH_SIZE]))
+
+    message_ids: List[Optional[str]] = [None] * len(job_payloads)
+    if not batches:
+        return message_ids
+    print(f"[SQS] 批量推送 {len(job_payloads)} 个任务, 共 {len(batches)} 批")
+    with ThreadPoolExecutor(max_workers=min(SQS_BATCH_PARALLELISM, len(batches))) as pool:
+        results = pool.map(
+            lambda batch: _send_batch(batch[0], [job_payloads[i] for i in batch[1]]),
+            batches
+        )
+        for (_, indexes), ids in zip(batches, results):
+            for i, message_id in zip(indexes, ids):
+                message_ids[i] = message_id
+    return message_ids
+
+async def enqueue_job_async(job_payload: dict, delay_seconds: int = 0) -> str:
+    """enqueue_job 的异步版本"""
+    return await _run_async(enqueue_job, job_payload, delay_seconds)
+
+async def enqueue_jobs_async(job_payloads: List[dict]) -> List[Optional[str]]:
+    """enqueue_jobs 的异步版本"""
+    return await _run_async(enqueue_jobs, job_payloads)
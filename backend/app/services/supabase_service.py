@@ -1,15 +1,135 @@
 # backend/app/services/supabase_service.py
 
 import os
-from supabase import create_client, Client
-from typing import Dict, Any, Optional
+import json
+import importlib.util
+import httpx
+from supabase import create_client, acreate_client, Client, AsyncClient, AsyncClientOptions
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterable, List, Set, Tuple
+from app.services.local_backends import LOCAL_BACKENDS, get_local_supabase
+from app.services.job_events import publish_job_changes
+from app.utils.compression import ENCODING, compress_text, decompress_text
+from app.utils.cursor import keyset_position
 
 # Supabase 配置
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
 
-# 创建 Supabase 客户端
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# 创建 Supabase 客户端（LOCAL_BACKENDS 时使用进程内替身）
+supabase: Client = get_local_supabase() if LOCAL_BACKENDS else create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# API 使用的异步客户端连接池配置
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "100"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+# 安装了 h2 时使用 HTTP/2，多个请求复用同一个连接
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+
+# 异步客户端在应用 lifespan 中创建，所有请求共享同一个连接池（keep-alive）
+async_supabase: Optional[AsyncClient] = None
+_async_http: Optional[httpx.AsyncClient] = None
+
+async def open_async_supabase() -> AsyncClient:
+    """创建共享的异步 Supabase 客户端（重复调用返回同一个）"""
+    global async_supabase, _async_http
+    if async_supabase is not None:
+        return async_supabase
+    if LOCAL_BACKENDS:
+        from app.services.local_supabase import AsyncLocalSupabase
+        async_supabase = AsyncLocalSupabase(get_local_supabase())
+        return async_supabase
+    _async_http = httpx.AsyncClient(
+        http2=SUPABASE_HTTP2,
+        timeout=SUPABASE_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_MAX_CONNECTIONS,
+            keepalive_expiry=60,
+        ),
+    )
+    async_supabase = await acreate_client(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        options=AsyncClientOptions(httpx_client=_async_http, postgrest_client_timeout=SUPABASE_TIMEOUT),
+    )
+    print(f"[Supabase] 异步客户端已创建 (http2={SUPABASE_HTTP2}, max_connections={SUPABASE_MAX_CONNECTIONS})")
+    return async_supabase
+
+async def close_async_supabase():
+    """关闭共享的异步客户端及其连接池"""
+    global async_supabase, _async_http
+    if _async_http is not None:
+        await _async_http.aclose()
+    async_supabase = None
+    _async_http = None
+
+def _async_client() -> AsyncClient:
+    if async_supabase is None:
+        if not LOCAL_BACKENDS:
+            raise RuntimeError("Async Supabase client is not open; call open_async_supabase() in the app lifespan")
+        # 本地替身不绑定事件循环，未经 lifespan（如 TestClient）时直接创建
+        from app.services.local_supabase import AsyncLocalSupabase
+        return AsyncLocalSupabase(get_local_supabase())
+    return async_supabase
+
+# 任务状态机：目标状态 -> 允许的来源状态
+# pending -> queued -> running -> completed / failed / dead_letter
+JOB_STATUS_TRANSITIONS = {
+    "queued": ("pending",),
+    # API 先推送 SQS 再更新为 queued，worker 可能先看到 pending
+    "running": ("pending", "queued"),
+    "completed": ("running",),
+    "failed": ("pending", "queued", "running"),
+    # 临时故障自动重试次数用尽后停放的终态，等待人工处理
+    "dead_letter": ("pending", "queued", "running"),
+}
+
+# 终态对应的时间戳字段
+TERMINAL_TIMESTAMP_FIELDS = {
+    "completed": "completed_at",
+    "failed": "failed_at",
+    "dead_letter": "failed_at",
+}
+
+# job_metrics 表中按数组存储的每轮指标
+METRIC_SERIES = ("train_loss", "val_loss", "accuracy")
+
+# 结果缓存查询只需要命中的任务ID（批量查询时按 spec_hash 分组）
+CACHE_LOOKUP_COLUMNS = "id,spec_hash,completed_at"
+
+def _transition_update(status: str, additional_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """状态转换写入的字段：状态、更新时间，终态时记录完成或失败时间"""
+    now = datetime.utcnow().isoformat()
+    update_data = {"status": status, "updated_at": now}
+    if status in TERMINAL_TIMESTAMP_FIELDS:
+        update_data[TERMINAL_TIMESTAMP_FIELDS[status]] = now
+    if additional_data:
+        update_data.update(additional_data)
+    return update_data
+
+def _before_filter(created_at: str, job_id: str) -> str:
+    """按 (created_at, id) 倒序分页时排在游标位置之后的行：created_at 更早，或 created_at 相同且 id 更小"""
+    created_at, job_id = keyset_position(created_at, job_id)
+    return f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{job_id}")'
+
+def _after_filter(updated_at: str, job_id: str) -> str:
+    """按 (updated_at, id) 正序同步变更时排在同步位置之后的行：updated_at 更晚，或 updated_at 相同且 id 更大"""
+    updated_at, job_id = keyset_position(updated_at, job_id)
+    return f'updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",id.gt."{job_id}")'
+
+def _decode_log_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """把压缩的日志行解压后放在 lines 中"""
+    for chunk in chunks:
+        # 迁移前写入的日志块未压缩，直接使用 lines
+        packed = chunk.pop("lines_z", None)
+        if packed:
+            chunk["lines"] = json.loads(decompress_text(packed))
+    return chunks
+
+def _decode_error_log(row: Dict[str, Any]) -> str:
+    if row["encoding"] != ENCODING:
+        raise ValueError(f"Unsupported error log encoding: {row['encoding']}")
+    return decompress_text(row["data"])
 
 class SupabaseService:
     """Supabase 数据库服务类"""
@@ -23,34 +143,160 @@ class SupabaseService:
                 raise ValueError("user_id is required")
             
             response = supabase.table("jobs").insert(job_data).execute()
+            publish_job_changes(response.data)
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error creating job: {e}")
             raise
-    
+
+    @staticmethod
+    def create_jobs(jobs_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量创建任务记录（一次 INSERT）"""
+        if not jobs_data:
+            return []
+        try:
+            if any("user_id" not in job for job in jobs_data):
+                raise ValueError("user_id is required")
+
+            response = supabase.table("jobs").insert(jobs_data).execute()
+            publish_job_changes(response.data)
+            return response.data or []
+        except Exception as e:
+            print(f"Error creating jobs: {e}")
+            raise
+
+    @staticmethod
+    def create_sweep(sweep_data: Dict[str, Any]) -> Dict[str, Any]:
+        """创建超参数搜索记录"""
+        try:
+            response = supabase.table("sweeps").insert(sweep_data).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error creating sweep: {e}")
+            raise
+
+    @staticmethod
+    def get_sweep(sweep_id: str, user_id: str = None) -> Optional[Dict[str, Any]]:
+        """获取超参数搜索记录，支持用户隔离"""
+        try:
+            query = supabase.table("sweeps").select("*").eq("id", sweep_id)
+            if user_id:
+                query = query.eq("user_id", user_id)
+            response = query.execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting sweep: {e}")
+            return None
+
+    @staticmethod
+    def list_sweep_jobs(sweep_id: str) -> List[Dict[str, Any]]:
+        """获取超参数搜索的所有子任务（含自动重试和手动重试产生的任务）"""
+        try:
+            response = (
+                supabase.table("jobs")
+                .select("id,status,parameters,final_accuracy,final_loss,retry_from,created_at,completed_at,failed_at")
+                .eq("sweep_id", sweep_id)
+                .execute()
+            )
+            return response.data
+        except Exception as e:
+            print(f"Error listing sweep jobs: {e}")
+            raise
+
     @staticmethod
     def update_job_status(job_id: str, status: str, additional_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """更新任务状态"""
+        """更新任务状态（同时更新 updated_at，增量同步依赖它）"""
         try:
-            update_data = {"status": status}
+            update_data = {"status": status, "updated_at": datetime.utcnow().isoformat()}
             if additional_data:
                 update_data.update(additional_data)
             
             response = supabase.table("jobs").update(update_data).eq("id", job_id).execute()
+            publish_job_changes(response.data)
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error updating job status: {e}")
             raise
     
+    @staticmethod
+    def transition_job_status(
+        job_id: str,
+        status: str,
+        additional_data: Optional[Dict[str, Any]] = None,
+        from_statuses: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """
+        条件状态转换（compare-and-set）：仅当任务当前状态属于 from_statuses 时才更新，
+        单次 UPDATE ... WHERE id = ? AND status IN (...) 完成，无需先读再写。
+        返回本次转换是否成功（False 表示任务已被推进到其他状态）。
+        """
+        won = SupabaseService.transition_jobs_status([job_id], status, additional_data, from_statuses)
+        return job_id in won
+
+    @staticmethod
+    def transition_jobs_status(
+        job_ids: List[str],
+        status: str,
+        additional_data: Optional[Dict[str, Any]] = None,
+        from_statuses: Optional[Iterable[str]] = None,
+    ) -> Set[str]:
+        """
+        批量条件状态转换：对多个任务执行同一个 compare-and-set 更新（一次请求），
+        返回转换成功的任务ID集合。completed / failed / dead_letter 会自动记录完成或失败时间。
+        """
+        if from_statuses is None:
+            from_statuses = JOB_STATUS_TRANSITIONS[status]
+        try:
+            response = (
+                supabase.table("jobs")
+                .update(_transition_update(status, additional_data))
+                .in_("id", list(job_ids))
+                .in_("status", list(from_statuses))
+                .execute()
+            )
+            publish_job_changes(response.data)
+            return {row["id"] for row in response.data or []}
+        except Exception as e:
+            print(f"Error transitioning job status: {e}")
+            raise
+
+    @staticmethod
+    def claim_outbox_jobs(limit: int, lease_seconds: int) -> List[Dict[str, Any]]:
+        """认领一批发件箱中待推送的任务（claim_outbox_jobs 数据库函数），租约内不会被其他 dispatcher 认领"""
+        try:
+            response = supabase.rpc(
+                "claim_outbox_jobs", {"p_limit": limit, "p_lease_seconds": lease_seconds}
+            ).execute()
+            return response.data or []
+        except Exception as e:
+            print(f"Error claiming outbox jobs: {e}")
+            raise
+
+    @staticmethod
+    def mark_jobs_queued(job_ids: List[str], message_ids: List[str]) -> int:
+        """一次请求写回多个任务的 SQS message ID 并移出发件箱，仍为 pending 的任务推进到 queued"""
+        if not job_ids:
+            return 0
+        try:
+            response = supabase.rpc(
+                "mark_jobs_queued", {"p_job_ids": list(job_ids), "p_message_ids": list(message_ids)}
+            ).execute()
+            # 函数返回更新的任务（id、user_id、status、updated_at）
+            publish_job_changes(response.data)
+            return len(response.data or [])
+        except Exception as e:
+            print(f"Error marking jobs queued: {e}")
+            raise
+
     @staticmethod
     def get_job(job_id: str, user_id: str = None) -> Optional[Dict[str, Any]]:
         """获取任务信息，支持用户隔离"""
         try:
             query = supabase.table("jobs").select("*").eq("id", job_id)
             
-            # 如果提供了user_id，添加用户隔离
+            # 如果提供了user_id，添加用户隔离（用户已删除的任务不再返回）
             if user_id:
-                query = query.eq("user_id", user_id)
+                query = query.eq("user_id", user_id).is_("deleted_at", "null")
             
             response = query.execute()
             return response.data[0] if response.data else None
@@ -59,15 +305,63 @@ class SupabaseService:
             return None
     
     @staticmethod
-    def list_jobs(user_id: str, limit: int = 10) -> list:
-        """获取指定用户的任务列表"""
+    def list_jobs(
+        user_id: str,
+        limit: int = 10,
+        columns: str = "*",
+        before: Optional[Tuple[str, str]] = None,
+        statuses: Optional[List[str]] = None,
+        model_name: Optional[str] = None,
+    ) -> list:
+        """
+        获取指定用户的任务列表，按 (created_at, id) 倒序（走 idx_jobs_user_created 索引）。
+        before 为上一页最后一行的 (created_at, id)，返回其后的一页（keyset 分页）。
+        """
         try:
-            response = supabase.table("jobs").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
+            query = supabase.table("jobs").select(columns).eq("user_id", user_id).is_("deleted_at", "null")
+            if statuses:
+                query = query.in_("status", statuses)
+            if model_name:
+                query = query.eq("model_name", model_name)
+            if before:
+                query = query.or_(_before_filter(*before))
+            response = query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
             return response.data
         except Exception as e:
             print(f"Error listing jobs: {e}")
             return []
     
+    @staticmethod
+    def find_cached_job(user_id: str, spec_hash: str) -> Optional[Dict[str, Any]]:
+        """查找该用户训练规格相同、最近完成的任务（结果缓存）"""
+        try:
+            response = (
+                supabase.table("jobs")
+                .select(CACHE_LOOKUP_COLUMNS)
+                .eq("user_id", user_id)
+                .eq("spec_hash", spec_hash)
+                .eq("status", "completed")
+                .is_("deleted_at", "null")
+                .order("completed_at", desc=True)
+                .limit(1)
+                .execute()
+            )
+            return response.data[0] if response.data else None
+        except Exception as e:
+            # 缓存查询失败时按未命中处理，正常提交训练
+            print(f"Error finding cached job: {e}")
+            return None
+    
+    @staticmethod
+    def record_cache_hit(job_id: str) -> int:
+        """原子递增任务的缓存命中次数，返回递增后的值"""
+        try:
+            response = supabase.rpc("increment_job_cache_hits", {"p_job_id": job_id}).execute()
+            return response.data or 0
+        except Exception as e:
+            print(f"Error recording cache hit: {e}")
+            return 0
+    
     @staticmethod
     def get_job_by_sqs_message_id(sqs_message_id: str) -> Optional[Dict[str, Any]]:
         """通过 SQS message ID 获取任务信息"""
@@ -121,6 +415,7 @@ class SupabaseService:
                 update_data.update(additional_data)
             
             response = supabase.table("jobs").update(update_data).eq("id", job_id).execute()
+            publish_job_changes(response.data)
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error marking job as completed: {e}")
@@ -145,7 +440,469 @@ class SupabaseService:
                 update_data.update(additional_data)
             
             response = supabase.table("jobs").update(update_data).eq("id", job_id).execute()
+            publish_job_changes(response.data)
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error marking job as failed: {e}")
-            raise 
\ No newline at end of file
+            raise
+    
+    @staticmethod
+    def append_job_logs(chunks: List[Dict[str, Any]]) -> int:
+        """
+        追加训练日志块（只追加不修改）。每块包含 job_id、seq、line_offset、lines，
+        日志行压缩后存入 lines_z 列；以 (job_id, seq) 去重，重复写入同一块不会产生重复日志。
+        返回新写入的块数。
+        """
+        if not chunks:
+            return 0
+        try:
+            rows = [
+                {
+                    "job_id": chunk["job_id"],
+                    "seq": chunk["seq"],
+                    "line_offset": chunk["line_offset"],
+                    "line_end": chunk["line_offset"] + len(chunk["lines"]),
+                    "lines_z": compress_text(json.dumps(chunk["lines"], ensure_ascii=False)),
+                }
+                for chunk in chunks
+            ]
+            response = (
+                supabase.table("job_logs")
+                .upsert(rows, on_conflict="job_id,seq", ignore_duplicates=True)
+                .execute()
+            )
+            return len(response.data or [])
+        except Exception as e:
+            print(f"Error appending job logs: {e}")
+            raise
+    
+    @staticmethod
+    def get_job_logs(job_id: str, offset: int = 0, max_chunks: int = 20) -> List[Dict[str, Any]]:
+        """获取从第 offset 行开始的日志块（按 seq 排序，压缩的日志行解压后放在 lines 中）"""
+        try:
+            response = (
+                supabase.table("job_logs")
+                .select("seq,line_offset,line_end,lines,lines_z")
+                .eq("job_id", job_id)
+                .gt("line_end", offset)
+                .order("seq")
+                .limit(max_chunks)
+                .execute()
+            )
+            return _decode_log_chunks(response.data or [])
+        except Exception as e:
+            print(f"Error getting job logs: {e}")
+            raise
+    
+    @staticmethod
+    def save_error_log(job_id: str, error_log: str):
+        """压缩保存任务的完整错误信息（任务行上只保留摘要）"""
+        try:
+            supabase.table("job_error_logs").upsert({
+                "job_id": job_id,
+                "encoding": ENCODING,
+                "data": compress_text(error_log),
+                "original_chars": len(error_log),
+                "created_at": datetime.utcnow().isoformat()
+            }, on_conflict="job_id").execute()
+        except Exception as e:
+            print(f"Error saving error log: {e}")
+            raise
+    
+    @staticmethod
+    def get_error_log(job_id: str) -> Optional[str]:
+        """读取并解压任务的完整错误信息，不存在时返回 None"""
+        try:
+            response = supabase.table("job_error_logs").select("encoding,data").eq("job_id", job_id).execute()
+            return _decode_error_log(response.data[0]) if response.data else None
+        except Exception as e:
+            print(f"Error getting error log: {e}")
+            raise
+    
+    @staticmethod
+    def append_job_metrics(job_id: str, points: List[Dict[str, Any]]) -> int:
+        """
+        把若干轮训练指标按 epoch 合并到任务的指标数组（已记录的轮次保持不变，乱序到达的较早轮次也会插入）。
+        通过 append_job_metrics 数据库函数在一次请求内原子完成。返回新增的轮数。
+        """
+        if not points:
+            return 0
+        try:
+            points = sorted(points, key=lambda point: point["epoch"])
+            params = {"p_job_id": job_id, "p_epochs": [point["epoch"] for point in points]}
+            for name in METRIC_SERIES:
+                params[f"p_{name}"] = [point["values"].get(name) for point in points]
+            response = supabase.rpc("append_job_metrics", params).execute()
+            return response.data or 0
+        except Exception as e:
+            print(f"Error appending job metrics: {e}")
+            raise
+    
+    @staticmethod
+    def record_resume_epoch(job_id: str, epoch: int):
+        """记录重试任务断点续训的起始轮次"""
+        try:
+            supabase.table("jobs").update({
+                "resume_epoch": epoch,
+                "updated_at": datetime.utcnow().isoformat()
+            }).eq("id", job_id).execute()
+        except Exception as e:
+            print(f"Error recording resume epoch: {e}")
+            raise
+    
+    @staticmethod
+    def get_job_metrics(job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务的指标数组（epochs 与各指标一一对应）"""
+        try:
+            response = supabase.table("job_metrics").select("*").eq("job_id", job_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting job metrics: {e}")
+            raise
+
+
+class AsyncSupabaseService:
+    """
+    SupabaseService 的异步版本，供 API 的 async 路由使用：查询通过共享的异步客户端执行，
+    等待数据库时不占用线程。方法与同步版本一一对应，错误处理一致。
+    """
+
+    @staticmethod
+    async def create_job(job_data: Dict[str, Any]) -> Dict[str, Any]:
+        """创建新的训练任务记录"""
+        try:
+            if "user_id" not in job_data:
+                raise ValueError("user_id is required")
+
+            response = await _async_client().table("jobs").insert(job_data).execute()
+            publish_job_changes(response.data)
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error creating job: {e}")
+            raise
+
+    @staticmethod
+    async def create_jobs(jobs_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量创建任务记录（一次 INSERT）"""
+        if not jobs_data:
+            return []
+        try:
+            if any("user_id" not in job for job in jobs_data):
+                raise ValueError("user_id is required")
+
+            response = await _async_client().table("jobs").insert(jobs_data).execute()
+            publish_job_changes(response.data)
+            return response.data or []
+        except Exception as e:
+            print(f"Error creating jobs: {e}")
+            raise
+
+    @staticmethod
+    async def create_sweep(sweep_data: Dict[str, Any]) -> Dict[str, Any]:
+        """创建超参数搜索记录"""
+        try:
+            response = await _async_client().table("sweeps").insert(sweep_data).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error creating sweep: {e}")
+            raise
+
+    @staticmethod
+    async def get_sweep(sweep_id: str, user_id: str = None) -> Optional[Dict[str, Any]]:
+        """获取超参数搜索记录，支持用户隔离"""
+        try:
+            query = _async_client().table("sweeps").select("*").eq("id", sweep_id)
+            if user_id:
+                query = query.eq("user_id", user_id)
+            response = await query.execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting sweep: {e}")
+            return None
+
+    @staticmethod
+    async def list_sweep_jobs(sweep_id: str) -> List[Dict[str, Any]]:
+        """获取超参数搜索的所有子任务（含自动重试和手动重试产生的任务）"""
+        try:
+            response = await (
+                _async_client().table("jobs")
+                .select("id,status,parameters,final_accuracy,final_loss,retry_from,created_at,completed_at,failed_at")
+                .eq("sweep_id", sweep_id)
+                .execute()
+            )
+            return response.data
+        except Exception as e:
+            print(f"Error listing sweep jobs: {e}")
+            raise
+
+    @staticmethod
+    async def transition_job_status(
+        job_id: str,
+        status: str,
+        additional_data: Optional[Dict[str, Any]] = None,
+        from_statuses: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """条件状态转换（compare-and-set），返回本次转换是否成功"""
+        won = await AsyncSupabaseService.transition_jobs_status([job_id], status, additional_data, from_statuses)
+        return job_id in won
+
+    @staticmethod
+    async def transition_jobs_status(
+        job_ids: List[str],
+        status: str,
+        additional_data: Optional[Dict[str, Any]] = None,
+        from_statuses: Optional[Iterable[str]] = None,
+    ) -> Set[str]:
+        """批量条件状态转换（一次请求），返回转换成功的任务ID集合"""
+        if from_statuses is None:
+            from_statuses = JOB_STATUS_TRANSITIONS[status]
+        try:
+            response = await (
+                _async_client().table("jobs")
+                .update(_transition_update(status, additional_data))
+                .in_("id", list(job_ids))
+                .in_("status", list(from_statuses))
+                .execute()
+            )
+            publish_job_changes(response.data)
+            return {row["id"] for row in response.data or []}
+        except Exception as e:
+            print(f"Error transitioning job status: {e}")
+            raise
+
+    @staticmethod
+    async def get_job(job_id: str, user_id: str = None) -> Optional[Dict[str, Any]]:
+        """获取任务信息，支持用户隔离"""
+        try:
+            query = _async_client().table("jobs").select("*").eq("id", job_id)
+            if user_id:
+                query = query.eq("user_id", user_id).is_("deleted_at", "null")
+            response = await query.execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting job: {e}")
+            return None
+
+    @staticmethod
+    async def list_jobs(
+        user_id: str,
+        limit: int = 10,
+        columns: str = "*",
+        before: Optional[Tuple[str, str]] = None,
+        statuses: Optional[List[str]] = None,
+        model_name: Optional[str] = None,
+    ) -> list:
+        """获取指定用户的任务列表，按 (created_at, id) 倒序，before 为上一页最后一行的 (created_at, id)"""
+        try:
+            query = _async_client().table("jobs").select(columns).eq("user_id", user_id).is_("deleted_at", "null")
+            if statuses:
+                query = query.in_("status", statuses)
+            if model_name:
+                query = query.eq("model_name", model_name)
+            if before:
+                query = query.or_(_before_filter(*before))
+            response = await query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
+            return response.data
+        except Exception as e:
+            print(f"Error listing jobs: {e}")
+            return []
+
+    @staticmethod
+    async def list_changed_jobs(
+        user_id: str,
+        limit: int = 100,
+        columns: str = "*",
+        after: Optional[Tuple[str, str]] = None,
+        updated_since: Optional[str] = None,
+    ) -> list:
+        """
+        获取指定用户 updated_at 推进过的任务（包括已删除的任务），按 (updated_at, id) 正序（走 idx_jobs_user_updated 索引）。
+        after 为上次同步到的 (updated_at, id)，只返回其后的行；updated_since 返回 updated_at 不早于该时间的行。
+        """
+        try:
+            query = _async_client().table("jobs").select(columns).eq("user_id", user_id)
+            if after:
+                query = query.or_(_after_filter(*after))
+            elif updated_since:
+                query = query.gte("updated_at", updated_since)
+            response = await query.order("updated_at").order("id").limit(limit).execute()
+            return response.data
+        except Exception as e:
+            print(f"Error listing changed jobs: {e}")
+            raise
+
+    @staticmethod
+    async def get_jobs_version(user_id: str) -> Optional[Tuple[str, str]]:
+        """用户所有任务（包括已删除的）中最新的 (updated_at, id)，任何任务新建、变更或删除都会改变它；没有任务时返回 None"""
+        try:
+            response = await (
+                _async_client().table("jobs")
+                .select("id,updated_at")
+                .eq("user_id", user_id)
+                .order("updated_at", desc=True)
+                .order("id", desc=True)
+                .limit(1)
+                .execute()
+            )
+            if not response.data:
+                return None
+            return response.data[0]["updated_at"], response.data[0]["id"]
+        except Exception as e:
+            print(f"Error getting jobs version: {e}")
+            raise
+
+    @staticmethod
+    async def get_job_version(job_id: str, user_id: str) -> Optional[str]:
+        """只读取任务的 updated_at（条件请求判断客户端缓存是否仍然有效），任务不存在或已删除时返回 None"""
+        try:
+            response = await (
+                _async_client().table("jobs")
+                .select("updated_at")
+                .eq("id", job_id)
+                .eq("user_id", user_id)
+                .is_("deleted_at", "null")
+                .execute()
+            )
+            return response.data[0]["updated_at"] if response.data else None
+        except Exception as e:
+            print(f"Error getting job version: {e}")
+            raise
+
+    @staticmethod
+    async def delete_job(job_id: str, user_id: str, from_statuses: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """
+        软删除任务：记录 deleted_at 并更新 updated_at，增量同步以墓碑返回给客户端。
+        仅删除当前状态属于 from_statuses 的未删除任务，返回删除的任务（未删除时为 None）。
+        """
+        try:
+            now = datetime.utcnow().isoformat()
+            response = await (
+                _async_client().table("jobs")
+                .update({"deleted_at": now, "updated_at": now})
+                .eq("id", job_id)
+                .eq("user_id", user_id)
+                .in_("status", list(from_statuses))
+                .is_("deleted_at", "null")
+                .execute()
+            )
+            publish_job_changes(response.data)
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error deleting job: {e}")
+            raise
+
+    @staticmethod
+    async def find_cached_job(user_id: str, spec_hash: str) -> Optional[Dict[str, Any]]:
+        """查找该用户训练规格相同、最近完成的任务（结果缓存）"""
+        try:
+            response = await (
+                _async_client().table("jobs")
+                .select(CACHE_LOOKUP_COLUMNS)
+                .eq("user_id", user_id)
+                .eq("spec_hash", spec_hash)
+                .eq("status", "completed")
+                .is_("deleted_at", "null")
+                .order("completed_at", desc=True)
+                .limit(1)
+                .execute()
+            )
+            return response.data[0] if response.data else None
+        except Exception as e:
+            # 缓存查询失败时按未命中处理，正常提交训练
+            print(f"Error finding cached job: {e}")
+            return None
+
+    @staticmethod
+    async def record_cache_hit(job_id: str) -> int:
+        """原子递增任务的缓存命中次数，返回递增后的值"""
+        try:
+            response = await _async_client().rpc("increment_job_cache_hits", {"p_job_id": job_id}).execute()
+            return response.data or 0
+        except Exception as e:
+            print(f"Error recording cache hit: {e}")
+            return 0
+
+    @staticmethod
+    async def find_cached_jobs(user_id: str, spec_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量查找结果缓存（一次请求），返回 spec_hash -> 最近完成的任务。
+        find_cached_jobs 数据库函数按规格 DISTINCT ON，每个规格只返回一行（CACHE_LOOKUP_COLUMNS 列）。
+        """
+        if not spec_hashes:
+            return {}
+        try:
+            response = await _async_client().rpc(
+                "find_cached_jobs", {"p_user_id": user_id, "p_spec_hashes": list(set(spec_hashes))}
+            ).execute()
+            return {job["spec_hash"]: job for job in response.data or []}
+        except Exception as e:
+            # 缓存查询失败时按未命中处理，正常提交训练
+            print(f"Error finding cached jobs: {e}")
+            return {}
+
+    @staticmethod
+    async def mark_jobs_queued(job_ids: List[str], message_ids: List[str]) -> int:
+        """
+        一次请求写回多个任务的 SQS message ID 并移出发件箱（mark_jobs_queued 数据库函数），
+        仍为 pending 的任务同时推进到 queued。返回更新的任务数。
+        """
+        if not job_ids:
+            return 0
+        try:
+            response = await _async_client().rpc(
+                "mark_jobs_queued", {"p_job_ids": list(job_ids), "p_message_ids": list(message_ids)}
+            ).execute()
+            # 函数返回更新的任务（id、user_id、status、updated_at）
+            publish_job_changes(response.data)
+            return len(response.data or [])
+        except Exception as e:
+            print(f"Error marking jobs queued: {e}")
+            raise
+
+    @staticmethod
+    async def get_job_by_sqs_message_id(sqs_message_id: str) -> Optional[Dict[str, Any]]:
+        """通过 SQS message ID 获取任务信息"""
+        try:
+            response = await _async_client().table("jobs").select("*").eq("sqs_message_id", sqs_message_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting job by SQS message ID: {e}")
+            return None
+
+    @staticmethod
+    async def get_job_logs(job_id: str, offset: int = 0, max_chunks: int = 20) -> List[Dict[str, Any]]:
+        """获取从第 offset 行开始的日志块（按 seq 排序）"""
+        try:
+            response = await (
+                _async_client().table("job_logs")
+                .select("seq,line_offset,line_end,lines,lines_z")
+                .eq("job_id", job_id)
+                .gt("line_end", offset)
+                .order("seq")
+                .limit(max_chunks)
+                .execute()
+            )
+            return _decode_log_chunks(response.data or [])
+        except Exception as e:
+            print(f"Error getting job logs: {e}")
+            raise
+
+    @staticmethod
+    async def get_error_log(job_id: str) -> Optional[str]:
+        """读取并解压任务的完整错误信息，不存在时返回 None"""
+        try:
+            response = await _async_client().table("job_error_logs").select("encoding,data").eq("job_id", job_id).execute()
+            return _decode_error_log(response.data[0]) if response.data else None
+        except Exception as e:
+            print(f"Error getting error log: {e}")
+            raise
+
+    @staticmethod
+    async def get_job_metrics(job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务的指标数组（epochs 与各指标一一对应）"""
+        try:
+            response = await _async_client().table("job_metrics").select("*").eq("job_id", job_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Error getting job metrics: {e}")
+            raise
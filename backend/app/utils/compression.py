@@ -0,0 +1,34 @@
+# backend/app/utils/compression.py
+
+import base64
+import zlib
+
+# 压缩数据的编码方式（记录在表中，便于以后更换算法）
+ENCODING = "zlib+base64"
+
+
+def compress_text(text: str) -> str:
+    """zlib 压缩后 base64 编码，可直接存入 TEXT 列或 JSON"""
+    return base64.b64encode(zlib.compress(text.encode("utf-8"), 6)).decode("ascii")
+
+
+def decompress_text(data: str) -> str:
+    return zlib.decompress(base64.b64decode(data)).decode("utf-8")
+
+
+def summarize(text: str, max_chars: int, head_chars: int = 1000, note: str = "") -> str:
+    """
+    超过 max_chars 的文本只保留开头 head_chars 个字符和结尾部分，中间替换为省略说明；
+    错误的起因通常在开头，最后的异常与日志在结尾。
+    """
+    if len(text) <= max_chars:
+        return text
+    head_chars = min(head_chars, max_chars // 2)
+    # 省略说明的长度按最大可能的省略字符数估算
+    tail_chars = max(max_chars - head_chars - len(_marker(len(text), note)), 0)
+    omitted = len(text) - head_chars - tail_chars
+    return text[:head_chars] + _marker(omitted, note) + text[len(text) - tail_chars:]
+
+
+def _marker(omitted: int, note: str) -> str:
+    return f"\n\n... [省略 {omitted} 个字符{note}] ...\n\n"
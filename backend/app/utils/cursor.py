@@ -0,0 +1,40 @@
+# backend/app/utils/cursor.py
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Tuple
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """把分页位置（如最后一行的 created_at 与 id）编码为不透明的 URL 安全字符串"""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """解码 encode_cursor 生成的字符串，格式不正确时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid cursor: {token}")
+    return values
+
+
+def keyset_position(timestamp: Any, row_id: Any, token: str = "") -> Tuple[str, str]:
+    """
+    校验游标中的分页位置 (时间戳, 行ID)：时间戳须为 ISO 8601 字符串，ID 须为 UUID，否则抛出 ValueError。
+    位置会拼进 PostgREST 的 or 过滤条件，不能直接使用客户端传来的任意值。
+    """
+    if not isinstance(timestamp, str) or not isinstance(row_id, str):
+        raise ValueError(f"Invalid cursor: {token}")
+    try:
+        datetime.fromisoformat(timestamp)
+        row_id = str(uuid.UUID(row_id))
+    except ValueError as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+    return timestamp, row_id
@@ -0,0 +1,40 @@
+# backend/app/utils/downsample.py
+
+from typing import List, Optional, Sequence
+
+
+def lttb(xs: Sequence[float], ys: Sequence[Optional[float]], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets 降采样：返回保留点的下标（始终包含首尾点）。
+    每个桶中选出与上一个保留点、下一个桶均值构成三角形面积最大的点，保留曲线的形状特征。
+    ys 中的 None 会被跳过。
+    """
+    points = [i for i in range(len(xs)) if ys[i] is not None]
+    if threshold >= len(points) or threshold < 3:
+        return points if threshold >= len(points) else points[:1] + points[-1:]
+
+    selected = [points[0]]
+    # 首尾点之外的点平均分到 threshold - 2 个桶
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    a = points[0]
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # 下一个桶的平均点（最后一个桶以尾点为准）
+        next_start, next_end = end, min(int((bucket + 2) * bucket_size) + 1, len(points))
+        if bucket == threshold - 3:
+            next_start, next_end = len(points) - 1, len(points)
+        avg_x = sum(xs[p] for p in points[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[p] for p in points[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = points[start], -1.0
+        for p in points[start:end]:
+            area = abs((xs[a] - avg_x) * (ys[p] - ys[a]) - (xs[a] - xs[p]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = p, area
+        selected.append(best)
+        a = best
+
+    selected.append(points[-1])
+    return selected
@@ -0,0 +1,20 @@
+# backend/app/utils/etag.py
+
+import hashlib
+from typing import Any, Optional
+
+
+def weak_etag(*parts: Any) -> str:
+    """由版本信息（如 updated_at、id、查询参数）生成弱 ETag：内容语义相同即视为相同，不保证字节一致"""
+    digest = hashlib.sha1("|".join("" if part is None else str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较：忽略 W/ 前缀，支持逗号分隔的多个 ETag 与 *）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
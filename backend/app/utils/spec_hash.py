@@ -0,0 +1,22 @@
+# backend/app/utils/spec_hash.py
+
+import hashlib
+import json
+from typing import Any, Dict
+
+# 规范化格式变化时递增，使旧的哈希不再命中
+SPEC_HASH_VERSION = 1
+
+
+def spec_hash(model_name: str, dataset_url: str, parameters: Dict[str, Any]) -> str:
+    """
+    训练规格 (model_name, dataset_url, parameters) 的规范哈希：
+    键排序、紧凑分隔符的 JSON，参数书写顺序和空白不同的相同规格得到同一个哈希。
+    """
+    canonical = json.dumps(
+        {"v": SPEC_HASH_VERSION, "model_name": model_name.strip(), "dataset_url": dataset_url.strip(), "parameters": parameters},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,46 @@
+# backend/app/utils/sweep.py
+
+import itertools
+import math
+import random
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def expand_grid(base: Dict[str, Any], grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """网格搜索：grid 中每个参数的取值做笛卡尔积，与 base 合并为每个子任务的参数（按参数名排序，结果稳定）"""
+    names = sorted(grid)
+    return [dict(base, **dict(zip(names, values))) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _sample(rng: random.Random, name: str, dist: Dict[str, Any]) -> Any:
+    if "values" in dist:
+        return rng.choice(list(dist["values"]))
+
+    low, high = dist["min"], dist["max"]
+    if dist.get("log"):
+        if low <= 0:
+            raise ValueError(f"参数 {name} 使用对数分布时 min 必须大于 0")
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    if dist.get("type") == "int":
+        return min(max(int(round(value)), math.ceil(low)), math.floor(high))
+    return value
+
+
+def sample_random(
+    base: Dict[str, Any],
+    space: Dict[str, Dict[str, Any]],
+    trials: int,
+    seed: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    随机搜索：从 space 中采样 trials 组参数。每个参数的分布为
+    {"values": [...]}（离散取值）或 {"min": a, "max": b, "log": bool, "type": "int" | "float"}。
+    指定 seed 时结果可复现。
+    """
+    rng = random.Random(seed)
+    return [
+        dict(base, **{name: _sample(rng, name, space[name]) for name in sorted(space)})
+        for _ in range(trials)
+    ]
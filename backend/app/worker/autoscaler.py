@@ -0,0 +1,291 @@
+# backend/app/worker/autoscaler.py
+
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Optional
+
+import boto3
+
+
+@dataclass
+class ScalingPolicy:
+    """扩缩容策略"""
+    min_concurrency: int = 1
+    max_concurrency: int = 32
+    min_replicas: int = 1
+    max_replicas: int = 10
+    # 期望积压任务在多少秒内全部开始执行
+    target_wait_seconds: float = 120.0
+    # 没有历史耗时数据时假设的任务时长（秒）
+    default_job_seconds: float = 60.0
+    # 副本数缩容冷却时间（秒），避免抖动
+    scale_down_cooldown: float = 300.0
+
+
+@dataclass
+class ScalingInputs:
+    # 队列中等待接收的消息数（整个集群共享）
+    queue_depth: int
+    # 本副本占用的并发槽位数（打包派发时一个容器一个槽位）
+    in_flight: int
+    avg_job_seconds: float
+    # 实际运行的副本数
+    current_replicas: int
+    # 本副本已接收、在调度缓冲中等待槽位的消息数
+    buffered: int = 0
+
+
+@dataclass
+class ScalingDecision:
+    concurrency: int
+    replicas: int
+    desired_slots: int
+
+
+def _clamp(value: int, low: int, high: int) -> int:
+    return max(low, min(value, high))
+
+
+def compute_desired(inputs: ScalingInputs, policy: ScalingPolicy) -> ScalingDecision:
+    """
+    根据队列深度、占用的槽位数和近期任务耗时计算整个集群所需的并发槽位：
+    占用中的槽位保持不变，积压任务（队列中的消息与各副本缓冲中等待槽位的消息）
+    按 target_wait_seconds 内全部开始所需的槽位估算，再换算成副本数与每个副本的并发上限。
+
+    每个副本只知道自己的槽位与缓冲，按实际副本数推算集群总量（SQS 在各副本的长轮询之间
+    大致均匀地分发消息），所有副本由此得出相同的集群目标，而不是各自按单副本扩容。
+    """
+    replicas_now = max(inputs.current_replicas, 1)
+    backlog = inputs.queue_depth + inputs.buffered * replicas_now
+    backlog_slots = 0
+    if backlog > 0:
+        backlog_slots = math.ceil(backlog * inputs.avg_job_seconds / policy.target_wait_seconds)
+        # 槽位数不会超过积压任务数本身
+        backlog_slots = min(backlog_slots, backlog)
+
+    desired_slots = max(inputs.in_flight * replicas_now + backlog_slots, 1)
+    replicas = _clamp(
+        math.ceil(desired_slots / policy.max_concurrency), policy.min_replicas, policy.max_replicas
+    )
+    concurrency = _clamp(
+        math.ceil(desired_slots / replicas), policy.min_concurrency, policy.max_concurrency
+    )
+    return ScalingDecision(concurrency=concurrency, replicas=replicas, desired_slots=desired_slots)
+
+
+class EcsReplicaSignal:
+    """
+    副本数信号：默认只打印期望副本数（供 CloudWatch 日志指标 / 外部控制器使用），
+    设置 AUTOSCALE_APPLY_ECS=1 时直接调用 ECS update_service 调整 desiredCount。
+    """
+
+    def __init__(self, cluster: str, service: str, apply: bool = False, region: Optional[str] = None):
+        self.cluster = cluster
+        self.service = service
+        self.apply = apply
+        self.region = region
+        self._ecs = boto3.client("ecs", region_name=region) if apply else None
+
+    def current(self) -> Optional[int]:
+        """ECS 服务当前运行的副本数（需要 ecs:DescribeServices 权限），读取失败时返回 None"""
+        try:
+            if self._ecs is None:
+                self._ecs = boto3.client("ecs", region_name=self.region)
+            services = self._ecs.describe_services(cluster=self.cluster, services=[self.service])["services"]
+            return int(services[0]["runningCount"]) if services else None
+        except Exception as e:
+            print(f"[Autoscaler] 读取 ECS 副本数失败: {e}")
+            return None
+
+    def __call__(self, replicas: int):
+        print(json.dumps({
+            "event": "desired_replicas",
+            "cluster": self.cluster,
+            "service": self.service,
+            "desired_count": replicas,
+        }))
+        if self.apply:
+            self._ecs.update_service(cluster=self.cluster, service=self.service, desiredCount=replicas)
+
+
+class AutoscaleController:
+    """
+    队列深度驱动的自动扩缩容控制器：定期读取 SQS 近似队列深度、本副本占用的槽位数、
+    调度缓冲中的消息数、实际副本数与近期任务耗时，在线调整本进程的并发上限，并发出期望副本数信号。
+
+    不使用 SQS 的 ApproximateNumberOfMessagesNotVisible 作为运行中任务数：其中包含
+    各副本前瞻缓冲中尚未运行的消息，打包派发时一个槽位还对应多条消息，会高估需求。
+    """
+
+    def __init__(
+        self,
+        sqs_client,
+        queue_urls: List[str],
+        policy: ScalingPolicy,
+        limiter=None,
+        durations: Optional[Callable[[], List[float]]] = None,
+        replica_signal: Optional[Callable[[int], None]] = None,
+        current_replicas: int = 1,
+        interval: float = 30.0,
+        slots_in_use: Optional[Callable[[], int]] = None,
+        buffered: Optional[Callable[[], int]] = None,
+        replica_count: Optional[Callable[[], Optional[int]]] = None,
+    ):
+        self.sqs = sqs_client
+        self.queue_urls = queue_urls
+        self.policy = policy
+        self.limiter = limiter
+        self.durations = durations
+        self.replica_signal = replica_signal
+        # 占用的槽位数默认取自 limiter
+        self.slots_in_use = slots_in_use or (lambda: limiter.in_use if limiter else 0)
+        self.buffered = buffered
+        # 读取实际副本数（如 EcsReplicaSignal.current），读取失败时沿用上次的决策
+        self.replica_count = replica_count
+        self.replicas = current_replicas
+        self.interval = interval
+        self._last_replica_change = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> ScalingInputs:
+        queue_depth = 0
+        for url in self.queue_urls:
+            attrs = self.sqs.get_queue_attributes(
+                QueueUrl=url,
+                AttributeNames=["ApproximateNumberOfMessages"],
+            )["Attributes"]
+            queue_depth += int(attrs.get("ApproximateNumberOfMessages", 0))
+
+        if self.replica_count:
+            running = self.replica_count()
+            if running:
+                self.replicas = running
+
+        samples = self.durations() if self.durations else []
+        avg = sum(samples) / len(samples) if samples else self.policy.default_job_seconds
+        return ScalingInputs(
+            queue_depth=queue_depth,
+            in_flight=self.slots_in_use(),
+            avg_job_seconds=avg,
+            current_replicas=self.replicas,
+            buffered=self.buffered() if self.buffered else 0,
+        )
+
+    def step(self, now: Optional[float] = None) -> ScalingDecision:
+        """采样、计算并应用一次扩缩容决策"""
+        if now is None:
+            now = time.time()
+        inputs = self.sample()
+        decision = compute_desired(inputs, self.policy)
+
+        # 扩容立即生效，缩容需要经过冷却时间
+        if decision.replicas < self.replicas and now - self._last_replica_change < self.policy.scale_down_cooldown:
+            decision.replicas = self.replicas
+            decision.concurrency = _clamp(
+                math.ceil(decision.desired_slots / decision.replicas),
+                self.policy.min_concurrency,
+                self.policy.max_concurrency,
+            )
+
+        if self.limiter and decision.concurrency != self.limiter.limit:
+            print(f"[Autoscaler] 并发上限 {self.limiter.limit} -> {decision.concurrency}")
+            self.limiter.set_limit(decision.concurrency)
+
+        if decision.replicas != self.replicas:
+            self._last_replica_change = now
+            self.replicas = decision.replicas
+        if self.replica_signal:
+            self.replica_signal(decision.replicas)
+
+        print(f"[Autoscaler] 输入: {asdict(inputs)}, 决策: {asdict(decision)}")
+        return decision
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="autoscaler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                print(f"[Autoscaler] 扩缩容决策失败: {e}")
+            self._stop.wait(self.interval)
+
+
+def policy_from_env() -> ScalingPolicy:
+    """从环境变量读取扩缩容策略"""
+    return ScalingPolicy(
+        min_concurrency=int(os.getenv("AUTOSCALE_MIN_CONCURRENCY", "1")),
+        max_concurrency=int(os.getenv("AUTOSCALE_MAX_CONCURRENCY", "32")),
+        min_replicas=int(os.getenv("AUTOSCALE_MIN_REPLICAS", "1")),
+        max_replicas=int(os.getenv("AUTOSCALE_MAX_REPLICAS", "10")),
+        target_wait_seconds=float(os.getenv("AUTOSCALE_TARGET_WAIT", "120")),
+        default_job_seconds=float(os.getenv("AUTOSCALE_DEFAULT_JOB_SECONDS", "60")),
+        scale_down_cooldown=float(os.getenv("AUTOSCALE_SCALE_DOWN_COOLDOWN", "300")),
+    )
+
+
+def simulate(ticks: int = 20, arrivals_per_tick: int = 15, job_seconds: float = 45.0):
+    """
+    本地模拟：用进程内 LocalSQS 替身代替真实队列，每个 tick 投递一批任务，
+    并按当前并发消费，观察控制器的并发与副本决策。
+    python -m app.worker.autoscaler
+    """
+    from app.services.local_sqs import LocalSQS
+    from app.worker.engine import ConcurrencyLimiter
+
+    queue_url = "local://training-jobs"
+    sqs = LocalSQS(visibility_timeout=3600)
+    policy = policy_from_env()
+    limiter = ConcurrencyLimiter(policy.min_concurrency)
+    running: List[dict] = []
+    controller = AutoscaleController(
+        sqs, [queue_url], policy,
+        limiter=limiter,
+        durations=lambda: [job_seconds],
+        replica_signal=lambda replicas: None,
+        # 模拟的副本之间均匀分担运行中的任务
+        slots_in_use=lambda: math.ceil(len(running) / controller.replicas),
+    )
+
+    for tick in range(ticks):
+        # 前半段持续投递，后半段停止投递观察缩容
+        if tick < ticks // 2:
+            for _ in range(arrivals_per_tick):
+                sqs.send_message(QueueUrl=queue_url, MessageBody="{}")
+
+        # 每个 tick 完成约 interval / job_seconds 比例的运行中任务
+        finished = running[: math.ceil(len(running) * controller.interval / job_seconds)]
+        if finished:
+            sqs.delete_message_batch(
+                QueueUrl=queue_url,
+                Entries=[{"Id": str(i), "ReceiptHandle": m["ReceiptHandle"]} for i, m in enumerate(finished)],
+            )
+            running = running[len(finished):]
+
+        capacity = limiter.limit * controller.replicas - len(running)
+        while capacity > 0:
+            resp = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=min(capacity, 10))
+            batch = resp.get("Messages", [])
+            if not batch:
+                break
+            running.extend(batch)
+            capacity -= len(batch)
+
+        print(f"--- tick {tick}: running={len(running)}")
+        controller.step(now=tick * controller.interval)
+
+
+if __name__ == "__main__":
+    simulate()
@@ -0,0 +1,333 @@
+# backend/app/worker/engine.py
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from app.worker.scheduler import FairScheduler, DEFAULT_LANE, message_lane, message_user_id
+
+# SQS 单次 receive_message 最多返回 10 条消息
+SQS_MAX_BATCH = 10
+
+# 引擎在接收到的消息上附加的字段：来源队列与优先级通道（非 SQS 原生字段）
+QUEUE_URL_KEY = "QueueUrl"
+LANE_KEY = "Lane"
+
+
+def message_queue_url(msg: Dict[str, Any], default: Optional[str] = None) -> Optional[str]:
+    """消息来自哪个队列（回执句柄只能用于来源队列）"""
+    return msg.get(QUEUE_URL_KEY, default)
+
+
+class ConcurrencyLimiter:
+    """并发槽位限制器，每个正在执行的任务占用一个槽位"""
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("concurrency limit must be >= 1")
+        self._limit = limit
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_use(self) -> int:
+        with self._cond:
+            return self._in_use
+
+    def set_limit(self, limit: int):
+        """动态调整并发上限；调低时不影响已占用的槽位，只是暂停新的占用"""
+        if limit < 1:
+            raise ValueError("concurrency limit must be >= 1")
+        with self._cond:
+            self._limit = limit
+            self._cond.notify_all()
+
+    def free_slots(self) -> int:
+        """当前空闲槽位数"""
+        with self._cond:
+            return max(self._limit - self._in_use, 0)
+
+    def wait_for_slot(self, timeout: Optional[float] = None) -> bool:
+        """阻塞直到至少有一个空闲槽位，超时返回 False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._in_use < self._limit, timeout=timeout)
+
+    def acquire(self) -> bool:
+        """尝试占用一个槽位（不阻塞）"""
+        with self._cond:
+            if self._in_use >= self._limit:
+                return False
+            self._in_use += 1
+            return True
+
+    def occupy(self):
+        """占用一个槽位，不检查上限（已在运行的任务重新计入，例如打包派发的调用）"""
+        with self._cond:
+            self._in_use += 1
+
+    def release(self):
+        """释放一个槽位"""
+        with self._cond:
+            self._in_use = max(self._in_use - 1, 0)
+            self._cond.notify_all()
+
+
+class JobSlot:
+    """
+    单个任务占用的槽位。处理函数返回后槽位默认被释放；
+    如果任务转入后台跟踪（例如 Modal 异步调用），调用 hold() 后由跟踪方负责 release()。
+
+    并发上限按 Modal 容器计数：多个任务共用一个容器时（打包派发），其余任务 yield_capacity()
+    归还并发额度，但仍计入用户的运行数（on_release 回调）直到 release()。
+    """
+
+    def __init__(self, limiter: ConcurrencyLimiter, on_release: Optional[Callable[[], None]] = None):
+        self._limiter = limiter
+        self._on_release = on_release
+        self._held = False
+        self._released = False
+        self._has_capacity = True
+        self._lock = threading.Lock()
+
+    @property
+    def held(self) -> bool:
+        return self._held
+
+    def hold(self):
+        self._held = True
+
+    def yield_capacity(self):
+        """归还并发额度，任务仍视为运行中（幂等）"""
+        with self._lock:
+            if self._released or not self._has_capacity:
+                return
+            self._has_capacity = False
+        self._limiter.release()
+
+    def reclaim_capacity(self):
+        """重新占用并发额度（可能暂时超过上限，之后的接收会等待）"""
+        with self._lock:
+            if self._released or self._has_capacity:
+                return
+            self._has_capacity = True
+        self._limiter.occupy()
+
+    def release(self):
+        """释放槽位（幂等）"""
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+            has_capacity, self._has_capacity = self._has_capacity, False
+        if self._on_release:
+            self._on_release()
+        if has_capacity:
+            self._limiter.release()
+
+
+class WorkerEngine:
+    """
+    并发 Worker 引擎：长轮询 SQS，一次最多拉取 10 条消息，
+    分发到有界的线程池中执行，训练运行期间继续接收新消息。
+    只按空闲槽位数（加少量前瞻缓冲）拉取消息（背压），不会拉取远超可执行数量的消息。
+
+    支持多个优先级通道（每个通道一个 SQS 队列）：接收到的消息先进入 FairScheduler，
+    由调度器按通道权重、用户公平性和每用户并发上限决定派发顺序。
+
+    handler(msg, slot) 负责处理单条消息；槽位代表一个运行中的训练任务，
+    可以在 handler 返回后继续被占用，直到后台跟踪方释放。
+    """
+
+    def __init__(
+        self,
+        sqs_client,
+        queues: Union[str, Dict[str, str]],
+        handler: Callable[[Dict[str, Any], JobSlot], None],
+        concurrency: int = 4,
+        wait_time_seconds: int = 10,
+        dispatch_threads: Optional[int] = None,
+        heartbeat=None,
+        scheduler: Optional[FairScheduler] = None,
+        lookahead: int = SQS_MAX_BATCH,
+    ):
+        self.sqs = sqs_client
+        # 通道名 -> 队列 URL；传入单个 URL 时视为只有默认通道
+        self.lanes = {DEFAULT_LANE: queues} if isinstance(queues, str) else dict(queues)
+        self.handler = handler
+        self.wait_time_seconds = wait_time_seconds
+        self.limiter = ConcurrencyLimiter(concurrency)
+        # 可选的可见性心跳：消息一经接收就开始续期，避免在调度缓冲中等待时过期
+        self.heartbeat = heartbeat
+        self.scheduler = scheduler or FairScheduler(
+            {lane: 1 for lane in self.lanes}, per_user_limit=concurrency
+        )
+        # 超出空闲槽位之外允许缓冲的消息数，用于在部分用户达到上限时仍能找到其他用户的任务
+        self.lookahead = lookahead
+        # 分发线程数与并发上限解耦：分发很快，不需要每个运行中的任务占一个线程
+        self._executor = ThreadPoolExecutor(
+            max_workers=dispatch_threads or concurrency, thread_name_prefix="dispatch"
+        )
+        self._stop = threading.Event()
+        # 已分发但尚未开始执行的消息，排空时可以取消并释放
+        self._pending: Dict[Future, Tuple[Dict[str, Any], JobSlot]] = {}
+        self._pending_lock = threading.Lock()
+        # 空闲时轮流在各通道上长轮询
+        self._long_poll_turn = 0
+
+    @property
+    def queue_url(self) -> str:
+        """默认通道的队列 URL"""
+        return self.lanes.get(DEFAULT_LANE) or next(iter(self.lanes.values()))
+
+    def stop(self):
+        """
+        通知主循环退出并进入排空：不再接收新消息，
+        尚未开始执行的消息会被立即释放回队列（正在执行的任务不受影响）
+        """
+        self._stop.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def release_messages(self, msgs: List[Dict[str, Any]]):
+        """把消息可见性设为 0，立即交还队列供其他 Worker 接收"""
+        by_queue: Dict[str, List[Dict[str, Any]]] = {}
+        for msg in msgs:
+            if self.heartbeat:
+                self.heartbeat.untrack(msg)
+            by_queue.setdefault(message_queue_url(msg, self.queue_url), []).append(msg)
+
+        for queue_url, queue_msgs in by_queue.items():
+            for i in range(0, len(queue_msgs), SQS_MAX_BATCH):
+                batch = queue_msgs[i:i + SQS_MAX_BATCH]
+                entries = [
+                    {"Id": str(idx), "ReceiptHandle": msg["ReceiptHandle"], "VisibilityTimeout": 0}
+                    for idx, msg in enumerate(batch)
+                ]
+                try:
+                    self.sqs.change_message_visibility_batch(QueueUrl=queue_url, Entries=entries)
+                except Exception as e:
+                    # 释放失败时消息会在可见性超时后自然重新投递
+                    print(f"[Worker] 释放 {len(batch)} 条消息失败: {e}")
+        if msgs:
+            print(f"[Worker] 已释放 {len(msgs)} 条消息回队列")
+
+    def run(self):
+        """主循环：派发调度器中可运行的消息 -> 按剩余容量拉取消息"""
+        print(f"[Worker] 引擎启动, 并发上限: {self.limiter.limit}, 通道: {list(self.lanes)}")
+        try:
+            while not self._stop.is_set():
+                self._dispatch_ready()
+
+                # 背压：容量 = 空闲槽位 + 前瞻缓冲 - 已缓冲消息
+                room = self.limiter.free_slots() + self.lookahead - self.scheduler.size()
+                if self.limiter.free_slots() <= 0 or room <= 0:
+                    # 没有空闲槽位，或缓冲中的消息都在等待（用户已达上限）
+                    self.limiter.wait_for_slot(timeout=1)
+                    self._stop.wait(0.1)
+                    continue
+
+                received = self._receive_round(min(room, SQS_MAX_BATCH))
+                if self._stop.is_set():
+                    # 长轮询期间收到停止信号：刚收到的消息不再处理
+                    self.release_messages(received)
+                    break
+        finally:
+            self.release_messages(self.scheduler.drain() + self._cancel_pending())
+            self._executor.shutdown(wait=True)
+            print("[Worker] 引擎已停止")
+
+    def _receive_round(self, max_messages: int) -> List[Dict[str, Any]]:
+        """
+        先对所有通道做一次非阻塞接收；全部为空且缓冲区也为空时，
+        轮流选择一个通道做长轮询，避免空转。
+        """
+        received = []
+        for lane, url in self.lanes.items():
+            if len(received) >= max_messages:
+                break
+            received += self._receive(lane, url, max_messages - len(received), wait=0)
+
+        if not received and self.scheduler.size() == 0:
+            lanes = list(self.lanes.items())
+            lane, url = lanes[self._long_poll_turn % len(lanes)]
+            self._long_poll_turn += 1
+            received = self._receive(lane, url, max_messages, wait=self.wait_time_seconds)
+        return received
+
+    def _receive(self, lane: str, queue_url: str, max_messages: int, wait: int) -> List[Dict[str, Any]]:
+        try:
+            resp = self.sqs.receive_message(
+                QueueUrl=queue_url,
+                MaxNumberOfMessages=max_messages,
+                WaitTimeSeconds=wait,
+                MessageAttributeNames=["All"],
+                AttributeNames=["ApproximateReceiveCount"],
+            )
+        except Exception as e:
+            print(f"[Worker] 拉取 SQS 消息失败 ({lane}): {e}")
+            self._stop.wait(1)
+            return []
+
+        messages = resp.get("Messages", [])
+        for msg in messages:
+            msg[QUEUE_URL_KEY] = queue_url
+            msg[LANE_KEY] = message_lane(msg, default=lane)
+            if self.heartbeat:
+                self.heartbeat.track(msg)
+            if not self._stop.is_set():
+                self.scheduler.add(msg, msg[LANE_KEY])
+        return messages
+
+    def _dispatch_ready(self):
+        """按调度器给出的顺序派发消息，直到没有空闲槽位或没有可派发的消息"""
+        while self.limiter.free_slots() > 0:
+            msg = self.scheduler.next()
+            if msg is None:
+                return
+            self._dispatch(msg)
+
+    def _cancel_pending(self) -> List[Dict[str, Any]]:
+        """取消尚未开始执行的分发，返回对应的消息"""
+        unstarted = []
+        with self._pending_lock:
+            pending = list(self._pending.items())
+        for future, (msg, slot) in pending:
+            if future.cancel():
+                slot.release()
+                unstarted.append(msg)
+        return unstarted
+
+    def _dispatch(self, msg: Dict[str, Any]):
+        # 只有在存在空闲槽位时才会从调度器取出消息，这里理论上总能拿到槽位
+        while not self.limiter.acquire():
+            self.limiter.wait_for_slot()
+
+        user_id = message_user_id(msg)
+        slot = JobSlot(self.limiter, on_release=lambda: self.scheduler.finished(user_id))
+        future = self._executor.submit(self._run_handler, msg, slot)
+        with self._pending_lock:
+            self._pending[future] = (msg, slot)
+        future.add_done_callback(self._forget)
+
+    def _forget(self, future: Future):
+        with self._pending_lock:
+            self._pending.pop(future, None)
+
+    def _run_handler(self, msg: Dict[str, Any], slot: JobSlot):
+        try:
+            self.handler(msg, slot)
+        except Exception as e:
+            # 单个任务的异常不能影响引擎主循环
+            print(f"[Worker] 处理消息 {msg.get('MessageId')} 时出现未捕获异常: {e}")
+            # 停止续期，让消息按可见性超时重新投递
+            if self.heartbeat and not slot.held:
+                self.heartbeat.untrack(msg)
+        finally:
+            if not slot.held:
+                slot.release()
@@ -0,0 +1,179 @@
+# backend/app/worker/flusher.py
+
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.supabase_service import SupabaseService, JOB_STATUS_TRANSITIONS
+
+# delete_message_batch 单次最多 10 条
+SQS_MAX_BATCH = 10
+
+
+@dataclass
+class _PendingWrite:
+    """某个任务在本个刷新周期内合并后的状态写入"""
+    status: str
+    from_statuses: Tuple[str, ...]
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+class AckFlushStage:
+    """
+    确认/刷新阶段：把任务状态写入与 SQS 消息删除缓冲起来，按固定间隔批量提交。
+
+    - 同一任务在一个周期内的多次写入合并为一次（例如记录 modal_call_id 后紧接着完成）；
+    - 目标状态与字段完全相同的任务合并为一次 UPDATE ... WHERE id IN (...)；
+    - 消息删除合并为 delete_message_batch（每批 10 条），且在对应任务的状态写入成功后才删除，
+      避免状态未落库消息却已被删除；
+    - stop() 时保证最后一次刷新。
+    """
+
+    def __init__(self, sqs_client, queue_url: str, flush_interval: float = 1.0, heartbeat=None):
+        self.sqs = sqs_client
+        self.queue_url = queue_url
+        self.flush_interval = flush_interval
+        self.heartbeat = heartbeat
+        self._writes: Dict[str, _PendingWrite] = {}
+        self._acks: List[Tuple[Dict[str, Any], Optional[str]]] = []
+        self._lock = threading.Lock()
+        # 串行化刷新，避免后台线程与 stop() 并发提交
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 指标
+        self.status_writes_staged = 0
+        self.status_update_calls = 0
+        self.messages_acked = 0
+        self.delete_batch_calls = 0
+
+    def stage_transition(
+        self,
+        job_id: str,
+        status: str,
+        additional_data: Optional[Dict[str, Any]] = None,
+        from_statuses: Optional[Tuple[str, ...]] = None,
+    ):
+        """缓冲一次条件状态转换，与同一任务已缓冲的写入合并"""
+        if from_statuses is None:
+            from_statuses = JOB_STATUS_TRANSITIONS[status]
+        with self._lock:
+            self.status_writes_staged += 1
+            pending = self._writes.get(job_id)
+            if pending is None:
+                self._writes[job_id] = _PendingWrite(status, tuple(from_statuses), dict(additional_data or {}))
+            else:
+                # 合并：保留最早的来源状态条件（数据库中的实际状态），采用最新的目标状态
+                pending.status = status
+                pending.data.update(additional_data or {})
+
+    def ack(self, msg: Dict[str, Any], job_id: Optional[str] = None):
+        """缓冲一条消息删除；如果指定 job_id，则在该任务的状态写入成功后才删除"""
+        if self.heartbeat:
+            self.heartbeat.untrack(msg)
+        with self._lock:
+            self._acks.append((msg, job_id))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台刷新，并保证缓冲区被完整提交"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "status_writes_staged": self.status_writes_staged,
+            "status_update_calls": self.status_update_calls,
+            "messages_acked": self.messages_acked,
+            "delete_batch_calls": self.delete_batch_calls,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                writes, self._writes = self._writes, {}
+                acks, self._acks = self._acks, []
+
+            failed_jobs = self._flush_writes(writes)
+            ready = [msg for msg, job_id in acks if job_id not in failed_jobs]
+            deferred = [(msg, job_id) for msg, job_id in acks if job_id in failed_jobs]
+            self._flush_acks(ready)
+
+            if deferred:
+                with self._lock:
+                    self._acks = deferred + self._acks
+
+    def _flush_writes(self, writes: Dict[str, _PendingWrite]) -> set:
+        """提交状态写入，返回写入失败（已放回缓冲区等待重试）的任务ID"""
+        groups: Dict[Tuple[str, Tuple[str, ...], str], List[str]] = {}
+        for job_id, pending in writes.items():
+            key = (pending.status, pending.from_statuses, json.dumps(pending.data, sort_keys=True, default=str))
+            groups.setdefault(key, []).append(job_id)
+
+        failed = set()
+        for (status, from_statuses, _), job_ids in groups.items():
+            data = writes[job_ids[0]].data
+            self.status_update_calls += 1
+            try:
+                won = SupabaseService.transition_jobs_status(job_ids, status, data, from_statuses)
+            except Exception as e:
+                print(f"[Flusher] 批量更新 {len(job_ids)} 个任务为 {status} 失败, 下个周期重试: {e}")
+                failed.update(job_ids)
+                with self._lock:
+                    for job_id in job_ids:
+                        # 期间又有新的写入时以新写入为准，旧写入只补齐缺失字段
+                        newer = self._writes.get(job_id)
+                        if newer is None:
+                            self._writes[job_id] = writes[job_id]
+                        else:
+                            merged = dict(writes[job_id].data)
+                            merged.update(newer.data)
+                            newer.data = merged
+                            newer.from_statuses = writes[job_id].from_statuses
+                continue
+
+            for job_id in job_ids:
+                if job_id in won:
+                    print(f"Updated job {job_id} status to {status}")
+                else:
+                    print(f"Job {job_id} is no longer in {list(from_statuses)}, {status} not recorded")
+        return failed
+
+    def _flush_acks(self, msgs: List[Dict[str, Any]]):
+        # 回执句柄只能在来源队列上使用，按队列分组
+        by_queue: Dict[str, List[Dict[str, Any]]] = {}
+        for msg in msgs:
+            by_queue.setdefault(msg.get("QueueUrl", self.queue_url), []).append(msg)
+
+        for queue_url, queue_msgs in by_queue.items():
+            for i in range(0, len(queue_msgs), SQS_MAX_BATCH):
+                self._delete_batch(queue_url, queue_msgs[i:i + SQS_MAX_BATCH])
+
+    def _delete_batch(self, queue_url: str, batch: List[Dict[str, Any]]):
+        entries = [
+            {"Id": str(idx), "ReceiptHandle": msg["ReceiptHandle"]}
+            for idx, msg in enumerate(batch)
+        ]
+        self.delete_batch_calls += 1
+        try:
+            resp = self.sqs.delete_message_batch(QueueUrl=queue_url, Entries=entries)
+        except Exception as e:
+            # 删除失败时消息会在可见性超时后重新投递，由状态机保证不会重复训练
+            print(f"[Flusher] 批量删除 {len(batch)} 条消息失败: {e}")
+            return
+
+        self.messages_acked += len(resp.get("Successful", []))
+        for failed in resp.get("Failed", []):
+            msg = batch[int(failed["Id"])]
+            print(f"Failed to delete message {msg['MessageId']}: {failed.get('Code')} {failed.get('Message')}")
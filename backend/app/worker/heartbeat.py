@@ -0,0 +1,148 @@
+# backend/app/worker/heartbeat.py
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# change_message_visibility_batch 单次最多 10 条
+SQS_MAX_BATCH = 10
+
+
+@dataclass
+class _Lease:
+    message_id: str
+    receipt_handle: str
+    queue_url: str
+    expires_at: float
+
+
+class VisibilityHeartbeat:
+    """
+    SQS 可见性心跳：任务运行期间定期延长消息的可见性超时，
+    防止运行时间超过队列可见性超时的训练被重新投递、重复训练。
+
+    所有即将到期的消息合并为 change_message_visibility_batch 调用（每批 10 条）。
+    任务结束时 untrack() 停止续期；Worker 进程退出后心跳随之停止，消息按原超时重新可见。
+    """
+
+    def __init__(
+        self,
+        sqs_client,
+        queue_url: str,
+        initial_visibility: int = 30,
+        extension: int = 300,
+        margin: Optional[float] = None,
+        tick: float = 5.0,
+    ):
+        self.sqs = sqs_client
+        self.queue_url = queue_url
+        self.initial_visibility = initial_visibility
+        self.extension = extension
+        # 剩余可见时间少于 margin 时续期，默认取初始超时的一半
+        self.margin = margin if margin is not None else max(initial_visibility / 2, tick * 2)
+        self.tick = tick
+        self._leases: Dict[str, _Lease] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 指标
+        self.extensions_issued = 0
+        self.extension_failures = 0
+        self.batch_calls = 0
+
+    def track(self, msg: Dict[str, Any], received_at: Optional[float] = None):
+        """开始为一条消息续期"""
+        if received_at is None:
+            received_at = time.time()
+        with self._lock:
+            self._leases[msg["MessageId"]] = _Lease(
+                message_id=msg["MessageId"],
+                receipt_handle=msg["ReceiptHandle"],
+                queue_url=msg.get("QueueUrl", self.queue_url),
+                expires_at=received_at + self.initial_visibility,
+            )
+
+    def untrack(self, msg: Dict[str, Any]):
+        """停止为一条消息续期（任务结束、消息已删除或已释放）"""
+        with self._lock:
+            self._leases.pop(msg["MessageId"], None)
+
+    def tracked_count(self) -> int:
+        with self._lock:
+            return len(self._leases)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked": self.tracked_count(),
+            "extensions_issued": self.extensions_issued,
+            "extension_failures": self.extension_failures,
+            "batch_calls": self.batch_calls,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.beat()
+            self._stop.wait(self.tick)
+
+    def beat(self, now: Optional[float] = None):
+        """为所有即将到期的消息批量延长可见性"""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            due = [l for l in self._leases.values() if l.expires_at - now <= self.margin]
+        if not due:
+            return
+
+        # 回执句柄只能在来源队列上使用，按队列分组
+        by_queue: Dict[str, List[_Lease]] = {}
+        for lease in due:
+            by_queue.setdefault(lease.queue_url, []).append(lease)
+        for queue_url, leases in by_queue.items():
+            for i in range(0, len(leases), SQS_MAX_BATCH):
+                self._extend_batch(queue_url, leases[i:i + SQS_MAX_BATCH], now)
+
+        print(f"[Heartbeat] 本轮续期 {len(due)} 条到期消息, 指标: {self.stats()}")
+
+    def _extend_batch(self, queue_url: str, leases: List[_Lease], now: float):
+        entries = [
+            {
+                "Id": str(idx),
+                "ReceiptHandle": lease.receipt_handle,
+                "VisibilityTimeout": self.extension,
+            }
+            for idx, lease in enumerate(leases)
+        ]
+        self.batch_calls += 1
+        try:
+            resp = self.sqs.change_message_visibility_batch(QueueUrl=queue_url, Entries=entries)
+        except Exception as e:
+            # 整批失败时下一次 tick 会重试
+            self.extension_failures += len(leases)
+            print(f"[Heartbeat] 批量续期请求失败: {e}")
+            return
+
+        with self._lock:
+            for ok in resp.get("Successful", []):
+                lease = leases[int(ok["Id"])]
+                if lease.message_id in self._leases:
+                    lease.expires_at = now + self.extension
+                self.extensions_issued += 1
+
+            for failed in resp.get("Failed", []):
+                lease = leases[int(failed["Id"])]
+                self.extension_failures += 1
+                print(f"[Heartbeat] 消息 {lease.message_id} 续期失败: {failed.get('Code')} {failed.get('Message')}")
+                # 回执句柄已失效（消息已删除或已被其他消费者接收），不再续期
+                if failed.get("Code") in ("ReceiptHandleIsInvalid", "AWS.SimpleQueueService.MessageNotInflight"):
+                    self._leases.pop(lease.message_id, None)
@@ -0,0 +1,96 @@
+# backend/app/worker/logpump.py
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.services.supabase_service import SupabaseService
+
+
+class LogPump:
+    """
+    日志泵：后台线程从训练日志 Queue 批量取出日志块、每轮指标和续训事件，
+    分别追加写入 job_logs 表、job_metrics 表的指标数组，并记录任务的 resume_epoch。
+
+    - 所有 Worker 共同消费同一个 Queue，日志块与指标自带 job_id，与由哪个 Worker 监管训练无关；
+    - 写入失败的日志块保留到下个周期重试，积压超过 max_pending 块时丢弃最早的块；
+    - stop() 时再排空一次 Queue。
+    """
+
+    def __init__(self, queue, interval: float = 1.0, batch_size: int = 100, max_pending: int = 5000):
+        self.queue = queue
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending: List[Dict[str, Any]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 指标
+        self.chunks_received = 0
+        self.chunks_written = 0
+        self.chunks_dropped = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="logpump", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.pump_once()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "chunks_received": self.chunks_received,
+            "chunks_written": self.chunks_written,
+            "chunks_dropped": self.chunks_dropped,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.pump_once()
+
+    def pump_once(self):
+        """排空 Queue 中当前的日志块并写入"""
+        while True:
+            try:
+                chunks = self.queue.get_many(self.batch_size, block=False)
+            except Exception as e:
+                print(f"[LogPump] 读取日志 Queue 失败: {e}")
+                chunks = []
+            self.chunks_received += len(chunks)
+            self._pending.extend(chunks)
+
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                print(f"[LogPump] 日志积压过多, 丢弃最早的 {overflow} 块")
+                del self._pending[:overflow]
+                self.chunks_dropped += overflow
+
+            if self._pending:
+                try:
+                    self._write(self._pending)
+                except Exception as e:
+                    print(f"[LogPump] 写入 {len(self._pending)} 块日志失败, 下个周期重试: {e}")
+                    return
+                self.chunks_written += len(self._pending)
+                self._pending = []
+
+            if len(chunks) < self.batch_size:
+                return
+
+    def _write(self, items: List[Dict[str, Any]]):
+        # 日志块按 (job_id, seq) 去重、指标按 epoch 去重，部分写入后整体重试是安全的
+        SupabaseService.append_job_logs([item for item in items if item.get("kind", "log") == "log"])
+
+        metrics: Dict[str, List[Dict[str, Any]]] = {}
+        for item in items:
+            if item.get("kind") == "metrics":
+                metrics.setdefault(item["job_id"], []).append(item)
+        for job_id, points in metrics.items():
+            SupabaseService.append_job_metrics(job_id, points)
+
+        for item in items:
+            if item.get("kind") == "resume":
+                SupabaseService.record_resume_epoch(item["job_id"], item["epoch"])
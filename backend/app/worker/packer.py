@@ -0,0 +1,123 @@
+# backend/app/worker/packer.py
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.worker.engine import JobSlot
+
+
+@dataclass
+class PackedJob:
+    """一个等待打包派发的任务（已转换为 running，尚未派发到 Modal）"""
+    job_id: str
+    message: Dict[str, Any]
+    body: Dict[str, Any]
+    slot: Optional[JobSlot] = None
+    added_at: float = field(default_factory=time.time)
+
+
+class JobPacker:
+    """
+    任务打包：把兼容的短任务（同一 key，例如同一模型）攒成一批，通过一次 Modal 调用
+    在同一个容器内依次运行，分摊容器冷启动的开销。
+
+    - 一批攒满 max_batch 个任务时立即派发；
+    - 否则最早加入的任务等待 max_wait 秒后，把该批已有的任务一起派发；
+    - stop() 时派发所有剩余任务。
+
+    任务在等待期间归还并发额度（仍计入用户的运行数），避免等待凑批的任务占满槽位、
+    接收循环无法再拉取同批的任务；派发时由派发回调为整批重新占用一个槽位。
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[List[PackedJob]], None],
+        max_batch: int = 4,
+        max_wait: float = 5.0,
+        heartbeat=None,
+    ):
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        self.dispatch = dispatch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.heartbeat = heartbeat
+        self._groups: Dict[str, List[PackedJob]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 指标
+        self.jobs_packed = 0
+        self.batches_dispatched = 0
+        self.full_batches = 0
+
+    def add(self, key: str, job: PackedJob):
+        """加入一个任务；所在批次攒满时在调用方线程中立即派发"""
+        if job.slot:
+            job.slot.hold()
+            job.slot.yield_capacity()
+        batch = None
+        with self._lock:
+            group = self._groups.setdefault(key, [])
+            group.append(job)
+            self.jobs_packed += 1
+            if len(group) >= self.max_batch:
+                batch = self._groups.pop(key)
+                self.full_batches += 1
+        if batch:
+            self._dispatch(batch)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(group) for group in self._groups.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "jobs_packed": self.jobs_packed,
+            "batches_dispatched": self.batches_dispatched,
+            "full_batches": self.full_batches,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="packer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台线程并派发所有剩余的任务"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.flush_due(force=True)
+
+    def _run(self):
+        tick = min(self.max_wait / 2, 0.5) if self.max_wait > 0 else 0.1
+        while not self._stop.wait(tick):
+            self.flush_due()
+
+    def flush_due(self, force: bool = False):
+        """派发最早的任务已等待 max_wait 秒的批次（force 时派发全部）"""
+        now = time.time()
+        with self._lock:
+            due = [
+                key for key, group in self._groups.items()
+                if force or now - group[0].added_at >= self.max_wait
+            ]
+            batches = [self._groups.pop(key) for key in due]
+        for batch in batches:
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[PackedJob]):
+        self.batches_dispatched += 1
+        try:
+            self.dispatch(batch)
+        except Exception as e:
+            # 派发回调应自行处理失败；这里兜底释放槽位并停止续期，让消息按可见性超时重新投递
+            print(f"[Packer] 派发 {len(batch)} 个打包任务时出现未捕获异常: {e}")
+            for job in batch:
+                if self.heartbeat:
+                    self.heartbeat.untrack(job.message)
+                if job.slot:
+                    job.slot.release()
@@ -0,0 +1,148 @@
+# backend/app/worker/reaper.py
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from modal.exception import OutputExpiredError
+
+from app.worker.engine import JobSlot
+
+
+@dataclass
+class TrackedCall:
+    """一个已派发到 Modal、等待结果的训练调用"""
+    job_id: Optional[str]
+    call: Any  # modal.FunctionCall
+    message: Dict[str, Any]
+    body: Dict[str, Any]
+    slot: Optional[JobSlot] = None
+    dispatched_at: float = field(default_factory=time.time)
+
+    @property
+    def call_id(self) -> str:
+        return self.call.object_id
+
+    @property
+    def key(self) -> str:
+        # 打包派发的多个任务共用一个调用，按 (调用, 任务) 区分
+        return f"{self.call_id}/{self.job_id}"
+
+
+class CompletionReaper:
+    """
+    完成收割器：后台线程定期以非阻塞方式 (get(timeout=0)) 轮询所有运行中的
+    Modal FunctionCall，收集结果后回调 on_success / on_failure 并释放槽位。
+    一个 Worker 可以借此同时监管数百个运行中的训练任务。
+    多个任务共用一个调用（打包派发）时每轮只轮询一次，结果交给每个任务各自的回调。
+    """
+
+    def __init__(
+        self,
+        on_success: Callable[[TrackedCall, Any], None],
+        on_failure: Callable[[TrackedCall, BaseException], None],
+        poll_interval: float = 5.0,
+    ):
+        self.on_success = on_success
+        self.on_failure = on_failure
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, TrackedCall] = {}
+        # 最近结束的调用耗时（秒），供自动扩缩容估算任务时长
+        self._durations = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, tracked: TrackedCall) -> bool:
+        """
+        登记一个运行中的调用；槽位交由收割器在调用结束后释放。
+        已在监管同一 (调用, 任务) 时不登记并返回 False，槽位和消息仍由调用方处理。
+        """
+        with self._lock:
+            if tracked.key in self._calls:
+                return False
+            self._calls[tracked.key] = tracked
+        if tracked.slot:
+            tracked.slot.hold()
+        return True
+
+    def get(self, key: str) -> Optional[TrackedCall]:
+        with self._lock:
+            return self._calls.get(key)
+
+    def find_job(self, job_id: str) -> Optional[TrackedCall]:
+        """按任务ID查找正在监管的调用"""
+        with self._lock:
+            return next((tracked for tracked in self._calls.values() if tracked.job_id == job_id), None)
+
+    def in_flight(self) -> List[TrackedCall]:
+        with self._lock:
+            return list(self._calls.values())
+
+    def recent_durations(self) -> List[float]:
+        with self._lock:
+            return list(self._durations)
+
+    def wait_idle(self, timeout: float) -> bool:
+        """等待所有运行中的调用结束，超时返回 False"""
+        deadline = time.time() + timeout
+        while self.in_flight():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(1.0, remaining))
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="reaper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.poll_interval)
+
+    def poll_once(self):
+        """轮询一次所有运行中的调用"""
+        by_call: Dict[str, List[TrackedCall]] = {}
+        for tracked in self.in_flight():
+            by_call.setdefault(tracked.call_id, []).append(tracked)
+
+        for group in by_call.values():
+            try:
+                result = group[0].call.get(timeout=0)
+            except OutputExpiredError as e:
+                # 结果已过期，无法再获取
+                outcome = {"error": e}
+            except TimeoutError:
+                # 仍在运行
+                continue
+            except Exception as e:
+                outcome = {"error": e}
+            else:
+                outcome = {"result": result}
+            for tracked in group:
+                self._finish(tracked, **outcome)
+
+    def _finish(self, tracked: TrackedCall, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._calls.pop(tracked.key, None)
+            self._durations.append(time.time() - tracked.dispatched_at)
+        try:
+            if error is not None:
+                self.on_failure(tracked, error)
+            else:
+                self.on_success(tracked, result)
+        except Exception as e:
+            # 回调异常不能中断收割线程
+            print(f"[Reaper] 处理调用 {tracked.call_id} 结果时出错: {e}")
+        finally:
+            if tracked.slot:
+                tracked.slot.release()
@@ -0,0 +1,76 @@
+# backend/app/worker/retry.py
+
+import os
+import random
+import uuid
+from dataclasses import dataclass
+
+import botocore.exceptions
+import modal.exception
+
+from app.services.modal_service import TransientTrainingError
+
+# 失败分类：transient 为基础设施的临时故障（自动重试），deterministic 为参数/数据/代码导致的确定性失败
+TRANSIENT = "transient"
+DETERMINISTIC = "deterministic"
+
+# SQS DelaySeconds 上限为 15 分钟
+SQS_MAX_DELAY_SECONDS = 900
+
+
+class WorkerInterruptedError(RuntimeError):
+    """Worker 在记录 Modal 调用前退出，无法确认训练是否已派发"""
+
+
+# 视为临时故障的异常类型
+TRANSIENT_ERRORS = (
+    modal.exception.ConnectionError,
+    modal.exception.InternalFailure,
+    # 包括 OutputExpiredError：调用结果过期只说明结果丢失，不代表训练本身有问题
+    modal.exception.TimeoutError,
+    botocore.exceptions.ConnectionError,
+    botocore.exceptions.HTTPClientError,
+    ConnectionError,
+    TimeoutError,
+    TransientTrainingError,
+    WorkerInterruptedError,
+)
+
+
+def classify_failure(error: BaseException) -> str:
+    """判断失败是否值得自动重试"""
+    # 超过函数 timeout 的训练重试仍会超时
+    if isinstance(error, modal.exception.FunctionTimeoutError):
+        return DETERMINISTIC
+    if isinstance(error, TRANSIENT_ERRORS):
+        return TRANSIENT
+    return DETERMINISTIC
+
+
+@dataclass
+class RetryPolicy:
+    """自动重试策略"""
+    # 同一任务链路最多自动重试的次数，超过后进入 dead_letter
+    max_attempts: int = 3
+    # 第 n 次重试的延迟为 base_delay * 2^n 秒（带抖动），不超过 max_delay
+    base_delay: float = 30.0
+    max_delay: float = SQS_MAX_DELAY_SECONDS
+
+    def backoff_delay(self, attempt: int) -> int:
+        """第 attempt 次自动重试（从 0 开始）的投递延迟，取 [delay/2, delay] 之间的随机值避免同时重试"""
+        delay = min(self.base_delay * (2 ** attempt), self.max_delay, SQS_MAX_DELAY_SECONDS)
+        return int(random.uniform(delay / 2, delay))
+
+
+def retry_job_id(job_id: str) -> str:
+    """自动重试任务的ID由原任务ID确定性生成，重复处理同一失败不会创建多个重试任务"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"jobs/{job_id}/auto-retry"))
+
+
+def policy_from_env() -> RetryPolicy:
+    """从环境变量读取自动重试策略"""
+    return RetryPolicy(
+        max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", "3")),
+        base_delay=float(os.getenv("RETRY_BASE_DELAY", "30")),
+        max_delay=float(os.getenv("RETRY_MAX_DELAY", str(SQS_MAX_DELAY_SECONDS))),
+    )
@@ -0,0 +1,157 @@
+# backend/app/worker/scheduler.py
+
+import json
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# 默认优先级通道：interactive 为交互式提交，bulk 为批量提交
+DEFAULT_LANE = "interactive"
+
+
+def parse_lane_weights(spec: str) -> Dict[str, int]:
+    """解析通道权重配置，例如 "interactive=4,bulk=1" """
+    weights = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def message_user_id(msg: Dict[str, Any]) -> str:
+    """从消息体中读取提交任务的用户ID"""
+    try:
+        return json.loads(msg["Body"]).get("user_id") or "anonymous"
+    except (ValueError, KeyError, AttributeError):
+        return "anonymous"
+
+
+def message_lane(msg: Dict[str, Any], default: str = DEFAULT_LANE) -> str:
+    """消息所属的优先级通道：优先取消息体中的 priority，否则取来源队列对应的通道"""
+    try:
+        return json.loads(msg["Body"]).get("priority") or default
+    except (ValueError, KeyError, AttributeError):
+        return default
+
+
+class _Lane:
+    def __init__(self, name: str, weight: int):
+        self.name = name
+        self.weight = weight
+        # 平滑加权轮询的当前权重
+        self.current = 0
+        self.users: Dict[str, Deque[Dict[str, Any]]] = {}
+
+    def size(self) -> int:
+        return sum(len(q) for q in self.users.values())
+
+
+class FairScheduler:
+    """
+    Worker 端调度器：缓存已接收但尚未派发的消息，决定下一条派发的消息。
+
+    - 通道之间按权重做平滑加权轮询（interactive 默认优先于 bulk，但 bulk 不会饿死）；
+    - 通道内按用户做加权公平排队：每个用户维护虚拟时间，每派发一个任务前进 1/weight，
+      总是选择虚拟时间最小的用户，单个用户提交大量任务不会挤占其他用户；
+    - 每个用户在本 Worker 上同时运行的任务数不超过 per_user_limit。
+    """
+
+    def __init__(
+        self,
+        lane_weights: Dict[str, int],
+        per_user_limit: int = 4,
+        user_weights: Optional[Dict[str, float]] = None,
+    ):
+        self._lanes = {name: _Lane(name, weight) for name, weight in lane_weights.items()}
+        self.per_user_limit = per_user_limit
+        self.user_weights = user_weights or {}
+        self._running: Dict[str, int] = {}
+        self._vtime: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def size(self) -> int:
+        with self._lock:
+            return sum(lane.size() for lane in self._lanes.values())
+
+    def running(self, user_id: str) -> int:
+        with self._lock:
+            return self._running.get(user_id, 0)
+
+    def add(self, msg: Dict[str, Any], lane: str = DEFAULT_LANE):
+        user_id = message_user_id(msg)
+        with self._lock:
+            target = self._lanes.get(lane) or next(iter(self._lanes.values()))
+            if user_id not in target.users:
+                target.users[user_id] = deque()
+            target.users[user_id].append(msg)
+
+            # 只为活跃用户保留虚拟时间；新出现的用户从当前最小虚拟时间开始，不能积累“空闲额度”
+            if user_id not in self._vtime:
+                self._vtime[user_id] = min(self._vtime.values(), default=0.0)
+
+    def next(self) -> Optional[Dict[str, Any]]:
+        """取出下一条应当派发的消息；没有可派发的消息（或都受用户上限限制）时返回 None"""
+        with self._lock:
+            candidates = {}
+            for lane in self._lanes.values():
+                user_id = self._pick_user(lane)
+                if user_id is not None:
+                    candidates[lane.name] = user_id
+            if not candidates:
+                return None
+
+            # 平滑加权轮询选择通道
+            eligible = [self._lanes[name] for name in candidates]
+            total = sum(lane.weight for lane in eligible)
+            for lane in eligible:
+                lane.current += lane.weight
+            chosen = max(eligible, key=lambda lane: lane.current)
+            chosen.current -= total
+
+            user_id = candidates[chosen.name]
+            queue = chosen.users[user_id]
+            msg = queue.popleft()
+            if not queue:
+                del chosen.users[user_id]
+
+            self._running[user_id] = self._running.get(user_id, 0) + 1
+            self._vtime[user_id] += 1.0 / self.user_weights.get(user_id, 1.0)
+            return msg
+
+    def finished(self, user_id: str):
+        """某个用户的任务结束，释放其运行计数"""
+        with self._lock:
+            count = self._running.get(user_id, 0) - 1
+            if count > 0:
+                self._running[user_id] = count
+            else:
+                self._running.pop(user_id, None)
+                if not self._has_backlog(user_id):
+                    self._vtime.pop(user_id, None)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """取出所有尚未派发的消息（用于排空时释放回队列）"""
+        with self._lock:
+            msgs = []
+            for lane in self._lanes.values():
+                for queue in lane.users.values():
+                    msgs.extend(queue)
+                lane.users.clear()
+            for user_id in list(self._vtime):
+                if user_id not in self._running:
+                    del self._vtime[user_id]
+            return msgs
+
+    def _pick_user(self, lane: _Lane) -> Optional[str]:
+        best = None
+        for user_id in lane.users:
+            if self._running.get(user_id, 0) >= self.per_user_limit:
+                continue
+            if best is None or self._vtime[user_id] < self._vtime[best]:
+                best = user_id
+        return best
+
+    def _has_backlog(self, user_id: str) -> bool:
+        return any(user_id in lane.users for lane in self._lanes.values())
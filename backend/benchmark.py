@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+端到端压测脚本：API -> SQS -> Worker -> Modal 全链路使用进程内替身（LOCAL_BACKENDS），
+不需要 AWS / Supabase / Modal。通过 app.main:app 提交 N 个任务，
+统计提交延迟 p50/p99、排队等待、启动耗时与吞吐（jobs/sec）。
+
+python benchmark.py --jobs 200 --concurrency 8 --duration 2 --failure-rate 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TERMINAL_STATUSES = ("completed", "failed", "dead_letter")
+
+
+def percentile(values, pct):
+    """最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def configure_env(args):
+    """在导入应用模块之前设置环境变量（各模块在导入时读取配置）"""
+    os.environ["LOCAL_BACKENDS"] = "true"
+    os.environ["WORKER_CONCURRENCY"] = str(args.concurrency)
+    os.environ["LOCAL_TRAIN_DURATION"] = str(args.duration)
+    os.environ["LOCAL_TRAIN_FAILURE_RATE"] = str(args.failure_rate)
+    os.environ["LOCAL_SQS_LATENCY"] = str(args.sqs_latency)
+    os.environ["LOCAL_DB_LATENCY"] = str(args.db_latency)
+    os.environ["LOCAL_SPAWN_LATENCY"] = str(args.spawn_latency)
+    os.environ["LOCAL_COLD_START"] = str(args.cold_start)
+    if args.pack_batch > 1:
+        os.environ["PACKING_ENABLED"] = "true"
+        os.environ["PACK_MAX_BATCH"] = str(args.pack_batch)
+        os.environ["PACK_MAX_WAIT"] = str(args.pack_wait)
+    # 默认不让单用户上限成为瓶颈
+    os.environ.setdefault("PER_USER_CONCURRENCY", str(args.concurrency))
+    os.environ.setdefault("REAPER_POLL_INTERVAL", "0.1")
+    os.environ.setdefault("FLUSH_INTERVAL", "0.2")
+    # 认证依赖在压测中被覆盖，这里只需满足 ClerkService 初始化检查
+    os.environ.setdefault("CLERK_API_KEY", "local")
+    os.environ.setdefault("CLERK_ISSUER", "local")
+    os.environ.setdefault("CLERK_JWKS_URL", "http://localhost/.well-known/jwks.json")
+
+
+def run_benchmark(args):
+    from fastapi import Header
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.dependencies.auth import get_current_user_id
+    from app.services.local_backends import get_local_modal, get_local_supabase
+    from app.services.outbox import dispatcher as outbox_dispatcher
+    import worker
+
+    # 用 Authorization 头直接充当用户ID，跳过 Clerk 验证
+    def bench_user_id(authorization: str = Header("bench-user-0")) -> str:
+        return authorization
+
+    app.dependency_overrides[get_current_user_id] = bench_user_id
+    db = get_local_supabase()
+    local_modal = get_local_modal()
+
+    engine = worker.build_engine()
+    worker_thread = threading.Thread(target=worker.run_worker, args=(engine,), name="worker")
+    worker_thread.start()
+    # TestClient 不经过应用 lifespan，直接启动发件箱 dispatcher
+    outbox_dispatcher.start()
+
+    clients = threading.local()
+
+    def submit(i):
+        if not hasattr(clients, "client"):
+            clients.client = TestClient(app)
+        started = time.time()
+        resp = clients.client.post(
+            "/jobs",
+            json={
+                "model_name": "bench-model",
+                "dataset_url": f"s3://bench/dataset-{i}",
+                "parameters": {"epochs": 1},
+                "priority": "bulk" if i % 4 == 3 else "interactive",
+            },
+            headers={"Authorization": f"bench-user-{i % args.users}"},
+        )
+        resp.raise_for_status()
+        return resp.json()["message_id"], started, time.time() - started
+
+    bench_started = time.time()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        submissions = list(pool.map(submit, range(args.jobs)))
+
+    deadline = time.time() + args.timeout
+    job_ids = [job_id for job_id, _, _ in submissions]
+    while time.time() < deadline:
+        pending = [j for j in job_ids if db.status_log.get(j, [("", 0)])[-1][0] not in TERMINAL_STATUSES]
+        if not pending:
+            break
+        time.sleep(0.1)
+
+    outbox_dispatcher.stop()
+    engine.stop()
+    worker_thread.join()
+    return submissions, bench_started, db, local_modal
+
+
+def report(submissions, bench_started, db, local_modal):
+    submit_latencies, queue_waits, time_to_start, end_to_end = [], [], [], []
+    outcomes = {}
+    last_finished = bench_started
+    calls = local_modal.calls()
+
+    for job_id, submitted_at, latency in submissions:
+        submit_latencies.append(latency)
+        log = db.status_log.get(job_id, [])
+        times = {}
+        for status, at in log:
+            times.setdefault(status, at)
+
+        final = log[-1][0] if log else "missing"
+        outcomes[final] = outcomes.get(final, 0) + 1
+        if "running" in times:
+            enqueued_at = times.get("queued", times.get("pending", submitted_at))
+            queue_waits.append(max(times["running"] - enqueued_at, 0.0))
+        row = db.table("jobs").select("modal_call_id").eq("id", job_id).execute().data
+        call = calls.get(row[0]["modal_call_id"]) if row and row[0].get("modal_call_id") else None
+        if call:
+            time_to_start.append(call.started_at - submitted_at)
+        if final in TERMINAL_STATUSES:
+            end_to_end.append(log[-1][1] - submitted_at)
+            last_finished = max(last_finished, log[-1][1])
+
+    elapsed = last_finished - bench_started
+    finished = sum(outcomes.get(status, 0) for status in TERMINAL_STATUSES)
+
+    def fmt(values):
+        return f"p50={percentile(values, 50) * 1000:8.1f}ms  p99={percentile(values, 99) * 1000:8.1f}ms"
+
+    print("=" * 60)
+    print(f"任务数:       {len(submissions)}  结果: {outcomes}")
+    print(f"提交延迟:     {fmt(submit_latencies)}")
+    print(f"排队等待:     {fmt(queue_waits)}")
+    print(f"启动耗时:     {fmt(time_to_start)}")
+    print(f"端到端耗时:   {fmt(end_to_end)}")
+    print(f"吞吐:         {finished / elapsed if elapsed > 0 else 0.0:.2f} jobs/sec ({finished} 个任务, {elapsed:.1f}s)")
+    print(f"Modal 调用:   {len(calls)}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API -> SQS -> Worker -> Modal 本地端到端压测")
+    parser.add_argument("--jobs", type=int, default=200, help="提交的任务数")
+    parser.add_argument("--concurrency", type=int, default=8, help="Worker 并发上限 (WORKER_CONCURRENCY)")
+    parser.add_argument("--clients", type=int, default=16, help="并发提交的客户端数")
+    parser.add_argument("--users", type=int, default=4, help="模拟的用户数")
+    parser.add_argument("--duration", type=float, default=2.0, help="模拟训练时长（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="模拟训练失败率")
+    parser.add_argument("--sqs-latency", type=float, default=0.0, help="每次 SQS 调用的模拟延迟（秒）")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="每次数据库请求的模拟延迟（秒）")
+    parser.add_argument("--spawn-latency", type=float, default=0.0, help="每次派发 Modal 调用的模拟延迟（秒）")
+    parser.add_argument("--cold-start", type=float, default=0.0, help="每次 Modal 调用的模拟冷启动耗时（秒）")
+    parser.add_argument("--pack-batch", type=int, default=0, help="打包派发的最大批大小（PACK_MAX_BATCH，<=1 表示不打包）")
+    parser.add_argument("--pack-wait", type=float, default=1.0, help="打包凑批的最长等待时间（PACK_MAX_WAIT，秒）")
+    parser.add_argument("--timeout", type=float, default=600.0, help="等待全部任务结束的最长时间（秒）")
+    parser.add_argument("--verbose", action="store_true", help="输出 API 与 Worker 日志")
+    args = parser.parse_args()
+
+    configure_env(args)
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        result = run_benchmark(args)
+    report(*result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+-- Migration: 006_add_modal_call_id_column.sql
+-- Description: 为jobs表添加modal_call_id列，用于记录异步派发的Modal FunctionCall ID
+-- Date: 2024-01-XX
+
+-- 添加modal_call_id列到jobs表
+ALTER TABLE jobs 
+ADD COLUMN modal_call_id TEXT;
+
+-- 添加索引以提高查询性能
+CREATE INDEX idx_jobs_modal_call_id ON jobs(modal_call_id);
+
+-- 添加注释
+COMMENT ON COLUMN jobs.modal_call_id IS 'Modal FunctionCall ID，worker通过它收集训练结果';
@@ -0,0 +1,14 @@
+-- Migration: 007_add_priority_column.sql
+-- Description: 为jobs表添加priority列，用于区分交互式与批量任务的优先级通道
+-- Date: 2024-01-XX
+
+-- 添加priority列到jobs表
+ALTER TABLE jobs 
+ADD COLUMN priority TEXT NOT NULL DEFAULT 'interactive';
+
+-- 限制取值范围
+ALTER TABLE jobs 
+ADD CONSTRAINT jobs_priority_check CHECK (priority IN ('interactive', 'bulk'));
+
+-- 添加注释
+COMMENT ON COLUMN jobs.priority IS '优先级通道：interactive 交互式任务，bulk 批量任务（独立队列，按权重调度）';
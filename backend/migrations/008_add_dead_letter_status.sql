@@ -0,0 +1,16 @@
+-- Migration: 008_add_dead_letter_status.sql
+-- Description: 允许jobs表使用dead_letter状态，用于停放自动重试次数用尽的任务
+-- Date: 2024-01-XX
+
+-- 重建状态约束，加入dead_letter
+ALTER TABLE jobs 
+DROP CONSTRAINT IF EXISTS jobs_status_check;
+
+ALTER TABLE jobs 
+ADD CONSTRAINT jobs_status_check CHECK (status IN ('pending', 'queued', 'running', 'completed', 'failed', 'dead_letter'));
+
+-- 添加部分索引，便于查询待人工处理的任务
+CREATE INDEX idx_jobs_dead_letter ON jobs(failed_at DESC) WHERE status = 'dead_letter';
+
+-- 添加注释
+COMMENT ON COLUMN jobs.status IS '任务状态：pending / queued / running / completed / failed / dead_letter（临时故障自动重试次数用尽）';
@@ -0,0 +1,20 @@
+-- Migration: 009_create_job_logs_table.sql
+-- Description: 创建job_logs表，按块追加存储训练过程中实时推送的日志
+-- Date: 2024-01-XX
+
+-- 创建job_logs表（只追加，(job_id, seq) 唯一）
+CREATE TABLE job_logs (
+    job_id UUID NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    line_offset INTEGER NOT NULL,
+    line_end INTEGER NOT NULL,
+    lines TEXT[] NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (job_id, seq)
+);
+
+-- 添加索引，按行号读取日志
+CREATE INDEX idx_job_logs_job_id_line_end ON job_logs(job_id, line_end);
+
+-- 添加注释
+COMMENT ON TABLE job_logs IS '训练日志块：每块包含从line_offset开始到line_end（不含）的日志行';
@@ -0,0 +1,73 @@
+-- Migration: 010_create_job_metrics_table.sql
+-- Description: 创建job_metrics表（每个任务一行，按数组存储每轮指标），并为jobs表添加最终指标列
+-- Date: 2024-01-XX
+
+-- 创建job_metrics表，epochs 与各指标数组按下标一一对应
+CREATE TABLE job_metrics (
+    job_id UUID PRIMARY KEY REFERENCES jobs(id) ON DELETE CASCADE,
+    epochs INTEGER[] NOT NULL DEFAULT '{}',
+    train_loss REAL[] NOT NULL DEFAULT '{}',
+    val_loss REAL[] NOT NULL DEFAULT '{}',
+    accuracy REAL[] NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+-- 原子合并指标：按 epoch 合并到数组中并保持升序，已记录的轮次保持不变，重复推送是幂等的；
+-- 多个 Worker 共同消费日志 Queue，同一任务的批次可能乱序到达，较早的轮次晚到时同样会插入
+CREATE OR REPLACE FUNCTION append_job_metrics(
+    p_job_id UUID,
+    p_epochs INTEGER[],
+    p_train_loss REAL[],
+    p_val_loss REAL[],
+    p_accuracy REAL[]
+) RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    current_epochs INTEGER[];
+    added INTEGER;
+BEGIN
+    INSERT INTO job_metrics (job_id) VALUES (p_job_id) ON CONFLICT (job_id) DO NOTHING;
+
+    SELECT epochs INTO current_epochs
+    FROM job_metrics WHERE job_id = p_job_id FOR UPDATE;
+
+    SELECT count(DISTINCT e) INTO added FROM unnest(p_epochs) AS e WHERE NOT (e = ANY (current_epochs));
+    IF added = 0 THEN
+        RETURN 0;
+    END IF;
+
+    WITH points AS (
+        SELECT p.epoch, p.train_loss, p.val_loss, p.accuracy, 0 AS source
+        FROM job_metrics m,
+             unnest(m.epochs, m.train_loss, m.val_loss, m.accuracy) AS p(epoch, train_loss, val_loss, accuracy)
+        WHERE m.job_id = p_job_id
+        UNION ALL
+        SELECT p.epoch, p.train_loss, p.val_loss, p.accuracy, 1 AS source
+        FROM unnest(p_epochs, p_train_loss, p_val_loss, p_accuracy) AS p(epoch, train_loss, val_loss, accuracy)
+    ), merged AS (
+        -- 同一轮次只保留一个点，已记录的优先
+        SELECT DISTINCT ON (epoch) epoch, train_loss, val_loss, accuracy
+        FROM points
+        ORDER BY epoch, source
+    )
+    UPDATE job_metrics SET
+        epochs = (SELECT array_agg(epoch ORDER BY epoch) FROM merged),
+        train_loss = (SELECT array_agg(train_loss ORDER BY epoch) FROM merged),
+        val_loss = (SELECT array_agg(val_loss ORDER BY epoch) FROM merged),
+        accuracy = (SELECT array_agg(accuracy ORDER BY epoch) FROM merged),
+        updated_at = now()
+    WHERE job_id = p_job_id;
+    RETURN added;
+END;
+$$;
+
+-- 添加最终指标列到jobs表
+ALTER TABLE jobs 
+ADD COLUMN final_accuracy REAL,
+ADD COLUMN final_loss REAL;
+
+-- 添加注释
+COMMENT ON TABLE job_metrics IS '每轮训练指标：epochs与train_loss/val_loss/accuracy数组按下标一一对应';
+COMMENT ON COLUMN jobs.final_accuracy IS '训练结束时的准确率';
+COMMENT ON COLUMN jobs.final_loss IS '训练结束时的验证损失';
@@ -0,0 +1,10 @@
+-- Migration: 011_add_dataset_cache_column.sql
+-- Description: 为jobs表添加dataset_cache列，用于记录训练时数据集缓存的命中情况
+-- Date: 2024-01-XX
+
+-- 添加dataset_cache列到jobs表
+ALTER TABLE jobs 
+ADD COLUMN dataset_cache JSONB;
+
+-- 添加注释
+COMMENT ON COLUMN jobs.dataset_cache IS '数据集缓存指标：hit（是否命中）、bytes、fetch_seconds、evicted（本次淘汰的数据集数）';
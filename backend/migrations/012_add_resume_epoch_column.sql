@@ -0,0 +1,10 @@
+-- Migration: 012_add_resume_epoch_column.sql
+-- Description: 为jobs表添加resume_epoch列，用于记录重试任务从父任务检查点继续训练的起始轮次
+-- Date: 2024-01-XX
+
+-- 添加resume_epoch列到jobs表
+ALTER TABLE jobs 
+ADD COLUMN resume_epoch INTEGER;
+
+-- 添加注释
+COMMENT ON COLUMN jobs.resume_epoch IS '断点续训的起始轮次（0 表示从头训练，NULL 表示不是续训任务或尚未开始）';
@@ -0,0 +1,30 @@
+-- Migration: 013_create_sweeps_table.sql
+-- Description: 创建sweeps表记录超参数搜索，为jobs表添加sweep_id列关联搜索的子任务
+-- Date: 2024-01-XX
+
+-- 创建sweeps表
+CREATE TABLE sweeps (
+    id UUID PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    model_name TEXT NOT NULL,
+    dataset_url TEXT NOT NULL,
+    spec JSONB NOT NULL,
+    objective TEXT NOT NULL DEFAULT 'final_accuracy',
+    total_jobs INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    CONSTRAINT sweeps_objective_check CHECK (objective IN ('final_accuracy', 'final_loss'))
+);
+
+-- 添加索引，按用户查询
+CREATE INDEX idx_sweeps_user_created ON sweeps(user_id, created_at DESC);
+
+-- 添加sweep_id列到jobs表
+ALTER TABLE jobs 
+ADD COLUMN sweep_id UUID REFERENCES sweeps(id) ON DELETE SET NULL;
+
+-- 添加部分索引，汇总搜索的子任务
+CREATE INDEX idx_jobs_sweep_id ON jobs(sweep_id) WHERE sweep_id IS NOT NULL;
+
+-- 添加注释
+COMMENT ON TABLE sweeps IS '超参数搜索：spec记录公共参数与grid/random搜索定义，objective为排行榜的排序指标';
+COMMENT ON COLUMN jobs.sweep_id IS '所属的超参数搜索ID，非搜索任务为NULL';
@@ -0,0 +1,23 @@
+-- Migration: 014_add_result_cache_columns.sql
+-- Description: 为jobs表添加spec_hash和cache_hits列，用于相同训练规格的结果缓存
+-- Date: 2024-01-XX
+
+-- 添加训练规格哈希与缓存命中次数列到jobs表
+ALTER TABLE jobs 
+ADD COLUMN spec_hash TEXT,
+ADD COLUMN cache_hits INTEGER NOT NULL DEFAULT 0;
+
+-- 添加部分索引，只索引已完成的任务，按用户查找最近完成的相同规格任务
+CREATE INDEX idx_jobs_spec_hash_completed ON jobs(user_id, spec_hash, completed_at DESC) WHERE status = 'completed';
+
+-- 原子递增缓存命中次数，返回递增后的值
+CREATE OR REPLACE FUNCTION increment_job_cache_hits(p_job_id UUID)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    UPDATE jobs SET cache_hits = cache_hits + 1 WHERE id = p_job_id RETURNING cache_hits;
+$$;
+
+-- 添加注释
+COMMENT ON COLUMN jobs.spec_hash IS '训练规格 (model_name, dataset_url, parameters) 的规范哈希，由API在创建任务时计算；迁移前的任务为NULL，不参与缓存';
+COMMENT ON COLUMN jobs.cache_hits IS '相同规格的提交直接复用该任务结果的次数';
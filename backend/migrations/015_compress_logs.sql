@@ -0,0 +1,24 @@
+-- Migration: 015_compress_logs.sql
+-- Description: 创建job_error_logs表压缩存储完整错误信息，job_logs改为存储压缩后的日志行
+-- Date: 2024-01-XX
+
+-- 创建job_error_logs表（完整错误信息，jobs.error_log只保留首尾摘要）
+CREATE TABLE job_error_logs (
+    job_id UUID PRIMARY KEY REFERENCES jobs(id) ON DELETE CASCADE,
+    encoding TEXT NOT NULL DEFAULT 'zlib+base64',
+    data TEXT NOT NULL,
+    original_chars INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+-- job_logs新写入的日志块存储压缩后的日志行（JSON数组经zlib压缩再base64编码），迁移前的日志块保留lines
+ALTER TABLE job_logs 
+ADD COLUMN lines_z TEXT;
+
+ALTER TABLE job_logs 
+ALTER COLUMN lines DROP NOT NULL;
+
+-- 添加注释
+COMMENT ON TABLE job_error_logs IS '任务的完整错误信息（异常栈、日志摘要等），按encoding压缩存储';
+COMMENT ON COLUMN job_logs.lines_z IS '压缩后的日志行：JSON数组经zlib压缩后base64编码';
+COMMENT ON COLUMN jobs.error_log IS '错误信息的首尾摘要（有长度上限），完整内容见job_error_logs';
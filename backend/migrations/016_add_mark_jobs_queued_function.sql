@@ -0,0 +1,21 @@
+-- Migration: 016_add_mark_jobs_queued_function.sql
+-- Description: 添加mark_jobs_queued函数，批量提交任务后一次请求写回各任务的sqs_message_id
+-- Date: 2024-01-XX
+
+-- 批量记录任务的SQS消息ID（p_job_ids与p_message_ids一一对应），
+-- 仍为pending的任务同时推进到queued（worker已开始处理的任务只记录消息ID）。返回更新的任务数
+CREATE OR REPLACE FUNCTION mark_jobs_queued(p_job_ids UUID[], p_message_ids TEXT[])
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE jobs
+        SET sqs_message_id = m.message_id,
+            status = CASE WHEN jobs.status = 'pending' THEN 'queued' ELSE jobs.status END,
+            updated_at = now()
+        FROM unnest(p_job_ids, p_message_ids) AS m(job_id, message_id)
+        WHERE jobs.id = m.job_id
+        RETURNING jobs.id
+    )
+    SELECT count(*)::INTEGER FROM updated;
+$$;
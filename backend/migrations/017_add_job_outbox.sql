@@ -0,0 +1,57 @@
+-- Migration: 017_add_job_outbox.sql
+-- Description: 为jobs表添加发件箱（outbox）列：提交任务只写一次任务行，由后台dispatcher批量推送到SQS
+-- Date: 2024-01-XX
+
+-- 待推送的SQS消息体（非NULL即在发件箱中）、推送尝试次数与dispatcher的认领租约
+ALTER TABLE jobs 
+ADD COLUMN outbox_payload JSONB,
+ADD COLUMN outbox_attempts INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN outbox_claimed_until TIMESTAMP WITH TIME ZONE;
+
+-- 添加部分索引，只索引发件箱中的任务
+CREATE INDEX idx_jobs_outbox ON jobs(created_at) WHERE outbox_payload IS NOT NULL;
+
+-- 认领一批待推送的任务：跳过其他dispatcher已锁定或租约未到期的任务，
+-- 认领后租约内不会被再次认领（dispatcher崩溃时租约到期后由其他dispatcher接手）
+CREATE OR REPLACE FUNCTION claim_outbox_jobs(p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF jobs
+LANGUAGE sql
+AS $$
+    UPDATE jobs
+    SET outbox_claimed_until = now() + make_interval(secs => p_lease_seconds),
+        outbox_attempts = outbox_attempts + 1
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE outbox_payload IS NOT NULL
+          AND status = 'pending'
+          AND (outbox_claimed_until IS NULL OR outbox_claimed_until < now())
+        ORDER BY created_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$;
+
+-- 记录SQS消息ID的同时把任务移出发件箱
+CREATE OR REPLACE FUNCTION mark_jobs_queued(p_job_ids UUID[], p_message_ids TEXT[])
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE jobs
+        SET sqs_message_id = m.message_id,
+            status = CASE WHEN jobs.status = 'pending' THEN 'queued' ELSE jobs.status END,
+            outbox_payload = NULL,
+            outbox_claimed_until = NULL,
+            updated_at = now()
+        FROM unnest(p_job_ids, p_message_ids) AS m(job_id, message_id)
+        WHERE jobs.id = m.job_id
+        RETURNING jobs.id
+    )
+    SELECT count(*)::INTEGER FROM updated;
+$$;
+
+-- 添加注释
+COMMENT ON COLUMN jobs.outbox_payload IS '待推送到SQS的消息体，推送成功后清空；非NULL表示任务仍在发件箱中';
+COMMENT ON COLUMN jobs.outbox_attempts IS 'dispatcher认领该任务推送的次数';
+COMMENT ON COLUMN jobs.outbox_claimed_until IS 'dispatcher认领租约的到期时间，到期前其他dispatcher不会再次认领';
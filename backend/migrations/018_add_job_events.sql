@@ -0,0 +1,37 @@
+-- Migration: 018_add_job_events.sql
+-- Description: 任务状态变更事件：mark_jobs_queued返回更新的任务行以便发布事件，允许后端通过Supabase Realtime私有频道广播任务事件
+-- Date: 2024-01-XX
+
+-- mark_jobs_queued改为返回更新的任务（ID、用户、状态、更新时间），由调用方发布状态变更事件
+-- 返回类型改变，需要先删除旧函数
+DROP FUNCTION IF EXISTS mark_jobs_queued(UUID[], TEXT[]);
+
+CREATE FUNCTION mark_jobs_queued(p_job_ids UUID[], p_message_ids TEXT[])
+RETURNS TABLE(id UUID, user_id VARCHAR, status VARCHAR, updated_at TIMESTAMP WITH TIME ZONE)
+LANGUAGE sql
+AS $$
+    UPDATE jobs
+    SET sqs_message_id = m.message_id,
+        status = CASE WHEN jobs.status = 'pending' THEN 'queued' ELSE jobs.status END,
+        outbox_payload = NULL,
+        outbox_claimed_until = NULL,
+        updated_at = now()
+    FROM unnest(p_job_ids, p_message_ids) AS m(job_id, message_id)
+    WHERE jobs.id = m.job_id
+    RETURNING jobs.id, jobs.user_id::VARCHAR, jobs.status::VARCHAR, jobs.updated_at::TIMESTAMP WITH TIME ZONE;
+$$;
+
+-- 任务事件通过私有广播频道job-events在API与worker之间传递（事件中包含各用户的任务，前端不直接订阅）
+-- 只允许service_role（后端使用SUPABASE_SERVICE_ROLE_KEY）收发，持有公开anon key的客户端无法读取或伪造事件；
+-- 事件只经API按用户过滤后通过GET /jobs/stream发给客户端
+CREATE POLICY "backend can receive job events"
+ON realtime.messages
+FOR SELECT
+TO service_role
+USING (realtime.topic() = 'job-events' AND extension = 'broadcast');
+
+CREATE POLICY "backend can send job events"
+ON realtime.messages
+FOR INSERT
+TO service_role
+WITH CHECK (realtime.topic() = 'job-events' AND extension = 'broadcast');
@@ -0,0 +1,13 @@
+-- Migration: 019_add_job_sync_columns.sql
+-- Description: 任务增量同步（GET /jobs?changed_since=）：软删除列deleted_at（以墓碑返回给客户端）与按用户、更新时间的索引
+-- Date: 2024-01-XX
+
+-- 软删除：删除的任务保留在表中，增量同步时返回其ID供客户端移除
+ALTER TABLE jobs 
+ADD COLUMN deleted_at TIMESTAMP WITH TIME ZONE;
+
+-- 按 (updated_at, id) 顺序读取用户变更过的任务，以及读取用户任务的最新版本
+CREATE INDEX idx_jobs_user_updated ON jobs(user_id, updated_at, id);
+
+-- 添加注释
+COMMENT ON COLUMN jobs.deleted_at IS '任务被用户删除的时间，非NULL的任务不在列表中返回，增量同步时作为墓碑返回';
@@ -0,0 +1,33 @@
+-- Migration: 020_bump_updated_at_on_all_job_writes.sql
+-- Description: increment_job_cache_hits与claim_outbox_jobs同时更新updated_at，使任务行的任何变更都推进updated_at（ETag与增量同步以其作为版本）
+-- Date: 2024-01-XX
+
+-- 原子递增缓存命中次数，返回递增后的值
+CREATE OR REPLACE FUNCTION increment_job_cache_hits(p_job_id UUID)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    UPDATE jobs SET cache_hits = cache_hits + 1, updated_at = now() WHERE id = p_job_id RETURNING cache_hits;
+$$;
+
+-- 认领一批待推送的任务：跳过其他dispatcher已锁定或租约未到期的任务，
+-- 认领后租约内不会被再次认领（dispatcher崩溃时租约到期后由其他dispatcher接手）
+CREATE OR REPLACE FUNCTION claim_outbox_jobs(p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF jobs
+LANGUAGE sql
+AS $$
+    UPDATE jobs
+    SET outbox_claimed_until = now() + make_interval(secs => p_lease_seconds),
+        outbox_attempts = outbox_attempts + 1,
+        updated_at = now()
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE outbox_payload IS NOT NULL
+          AND status = 'pending'
+          AND (outbox_claimed_until IS NULL OR outbox_claimed_until < now())
+        ORDER BY created_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$;
@@ -0,0 +1,22 @@
+-- Migration: 021_add_find_cached_jobs_function.sql
+-- Description: 添加find_cached_jobs函数，批量查找结果缓存时每个训练规格只返回最近完成的一个任务；缓存索引排除已删除的任务
+-- Date: 2024-01-XX
+
+-- 结果缓存索引只包含未删除的已完成任务，与缓存查询的条件一致
+DROP INDEX IF EXISTS idx_jobs_spec_hash_completed;
+CREATE INDEX idx_jobs_spec_hash_completed ON jobs(user_id, spec_hash, completed_at DESC) WHERE status = 'completed' AND deleted_at IS NULL;
+
+-- 每个训练规格最近完成的任务（DISTINCT ON），返回行数不超过规格数
+CREATE OR REPLACE FUNCTION find_cached_jobs(p_user_id VARCHAR, p_spec_hashes TEXT[])
+RETURNS TABLE(id UUID, spec_hash TEXT, completed_at TIMESTAMP WITH TIME ZONE)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT DISTINCT ON (jobs.spec_hash) jobs.id, jobs.spec_hash, jobs.completed_at
+    FROM jobs
+    WHERE jobs.user_id = p_user_id
+      AND jobs.spec_hash = ANY(p_spec_hashes)
+      AND jobs.status = 'completed'
+      AND jobs.deleted_at IS NULL
+    ORDER BY jobs.spec_hash, jobs.completed_at DESC;
+$$;
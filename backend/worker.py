@@ -2,71 +2,88 @@
 
 import os
 import json
-import time
+import signal
+import threading
+import traceback
 import boto3
 from datetime import datetime
-from botocore.exceptions import ClientError
+from typing import Dict, List, Optional
 
-from app.services.sqs_service import SQS_QUEUE_URL
-from app.services.modal_service import app, train
+from app.services.sqs_service import SQS_QUEUE_URL, PRIORITY_QUEUE_URLS, enqueue_job
+from app.services.local_backends import LOCAL_BACKENDS, get_local_sqs
+from app.services.modal_service import (
+    TrainingError,
+    TransientTrainingError,
+    spawn_training,
+    spawn_training_batch,
+    get_function_call,
+    get_log_queue,
+)
 from app.services.supabase_service import SupabaseService
+from app.services.job_events import flush_job_events
+from app.utils.compression import summarize
+from app.worker.engine import WorkerEngine, JobSlot
+from app.worker.reaper import CompletionReaper, TrackedCall
+from app.worker.heartbeat import VisibilityHeartbeat
+from app.worker.flusher import AckFlushStage
+from app.worker.logpump import LogPump
+from app.worker.packer import JobPacker, PackedJob
+from app.worker.autoscaler import AutoscaleController, EcsReplicaSignal, policy_from_env
+from app.worker.scheduler import FairScheduler, parse_lane_weights
+from app.worker.retry import (
+    TRANSIENT,
+    WorkerInterruptedError,
+    classify_failure,
+    retry_job_id,
+    policy_from_env as retry_policy_from_env,
+)
 
-# 初始化 SQS 客户端
-sqs = boto3.client("sqs", region_name=os.getenv("AWS_DEFAULT_REGION"))
+# 初始化 SQS 客户端（LOCAL_BACKENDS 时与 API 共用进程内替身）
+sqs = get_local_sqs() if LOCAL_BACKENDS else boto3.client("sqs", region_name=os.getenv("AWS_DEFAULT_REGION"))
 
-def poll_and_process():
-    while True:
-        resp = sqs.receive_message(
-            QueueUrl=SQS_QUEUE_URL,
-            MaxNumberOfMessages=1,
-            WaitTimeSeconds=10
-        )
-        messages = resp.get("Messages", [])
-        if not messages:
-            continue
-
-        for msg in messages:
-            body = json.loads(msg["Body"])
-            receipt_handle = msg["ReceiptHandle"]
-            sqs_message_id = msg["MessageId"]
-
-            # 打印收到的所有参数
-            print(f"[Worker] 收到 SQS 消息: {json.dumps(body, ensure_ascii=False, indent=2)}")
-
-            # 更新任务状态为运行中
-            job_id = body.get("job_id")
-            if job_id:
-                SupabaseService.update_job_status(
-                    job_id, 
-                    "running", 
-                    {"sqs_message_id": sqs_message_id}
-                )
-                print(f"Updated job {job_id} status to running (SQS: {sqs_message_id})")
-            
-            try:
-                # 触发 Modal 训练
-                print(f"Enqueue Modal train for job {msg['MessageId']}")
-                with app.run():
-                    result = train.remote(  # 直接调用函数，不需要 app.train
-                        model_name=body["model_name"],
-                        dataset_url=body["dataset_url"],
-                        parameters=body["parameters"]
-                    )
-                    print(f"Modal training result: {result}")
-                    
-                    # 更新任务状态为完成并记录完成时间
-                    if job_id:
-                        SupabaseService.mark_job_completed(job_id)
-                        print(f"Updated job {job_id} status to completed with timestamp")
-            except Exception as e:
-                print(f"Error during training: {str(e)}")
-                # 收集详细的错误信息
-                import traceback
-                error_details = f"""
-错误类型: {type(e).__name__}
-错误信息: {str(e)}
+# 单个 Worker 容器同时运行的最大训练任务数
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+# 优先级通道权重，以及每个用户在单个 Worker 上同时运行的最大任务数
+LANE_WEIGHTS = parse_lane_weights(os.getenv("LANE_WEIGHTS", "interactive=4,bulk=1"))
+PER_USER_CONCURRENCY = int(os.getenv("PER_USER_CONCURRENCY", "2"))
+# 轮询 Modal 调用结果的间隔（秒）
+REAPER_POLL_INTERVAL = float(os.getenv("REAPER_POLL_INTERVAL", "5"))
+# 队列本身配置的可见性超时（秒），以及心跳每次续期的时长（秒）
+SQS_VISIBILITY_TIMEOUT = int(os.getenv("SQS_VISIBILITY_TIMEOUT", "30"))
+VISIBILITY_EXTENSION = int(os.getenv("VISIBILITY_EXTENSION", "300"))
+# 状态写入与消息删除的批量提交间隔（秒）
+FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL", "1"))
+# 训练日志从日志 Queue 写入 job_logs 的间隔（秒）
+LOG_PUMP_INTERVAL = float(os.getenv("LOG_PUMP_INTERVAL", "1"))
+# 收到 SIGTERM 后等待运行中任务结束的最长时间（秒），需小于 ECS stopTimeout
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "90"))
+# 队列深度驱动的自动扩缩容（在线调整并发上限，并发出 ECS 期望副本数信号）
+AUTOSCALE_ENABLED = os.getenv("AUTOSCALE_ENABLED", "false").lower() == "true"
+AUTOSCALE_INTERVAL = float(os.getenv("AUTOSCALE_INTERVAL", "30"))
+ECS_CLUSTER = os.getenv("ECS_CLUSTER", "lerobot-cluster")
+ECS_WORKER_SERVICE = os.getenv("ECS_WORKER_SERVICE", "lerobot-worker-service")
+AUTOSCALE_APPLY_ECS = os.getenv("AUTOSCALE_APPLY_ECS", "false").lower() == "true"
+# 临时故障的自动重试策略（RETRY_MAX_ATTEMPTS / RETRY_BASE_DELAY / RETRY_MAX_DELAY）
+RETRY_POLICY = retry_policy_from_env()
+# 任务行上 error_log 摘要的最大字符数（完整错误信息压缩后存入 job_error_logs）
+ERROR_LOG_MAX_CHARS = int(os.getenv("ERROR_LOG_MAX_CHARS", "4000"))
+# 任务打包：轮数不超过 PACK_MAX_EPOCHS 的同模型任务最多 PACK_MAX_BATCH 个一起在一个 Modal 容器内运行，
+# 最早的任务最多等待 PACK_MAX_WAIT 秒凑批（需部署 train_batch 函数）
+PACKING_ENABLED = os.getenv("PACKING_ENABLED", "false").lower() == "true"
+PACK_MAX_BATCH = int(os.getenv("PACK_MAX_BATCH", "4"))
+PACK_MAX_WAIT = float(os.getenv("PACK_MAX_WAIT", "5"))
+PACK_MAX_EPOCHS = int(os.getenv("PACK_MAX_EPOCHS", "5"))
+
+def build_error_details(error: BaseException, body: dict, sqs_message_id: str) -> str:
+    """收集详细的错误信息"""
+    stack = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+    return f"""
+错误类型: {type(error).__name__}
+失败分类: {classify_failure(error)}
+自动重试次数: {body.get('attempt', 0)}
+错误信息: {str(error)}
 异常栈:
-{traceback.format_exc()}
+{stack}
 任务参数:
 - 模型名称: {body.get('model_name', 'N/A')}
 - 数据集地址: {body.get('dataset_url', 'N/A')}
@@ -74,23 +91,417 @@ def poll_and_process():
 - SQS消息ID: {sqs_message_id}
 时间: {datetime.utcnow().isoformat()}
 """
-                
-                # 更新任务状态为失败并记录失败时间和错误日志
-                if job_id:
-                    SupabaseService.mark_job_failed(job_id, error_details)
-                    print(f"Updated job {job_id} status to failed with timestamp and error log")
 
-            # TODO: 把 run.object_id 和初始状态写入 Supabase
+def schedule_retry(job_id: str, body: dict, attempt: int) -> str:
+    """
+    为临时故障创建自动重试任务：沿用 retry_from / retry_count 记录重试来源，
+    按指数退避设置 DelaySeconds 投递。重试任务ID由原任务ID确定性生成，重复调用不会重复创建。
+    """
+    retry_id = retry_job_id(job_id)
+    existing = SupabaseService.get_job(retry_id)
+    if existing and existing["status"] != "pending":
+        print(f"Retry job {retry_id} for {job_id} already scheduled")
+        return retry_id
+
+    if not existing:
+        job = SupabaseService.get_job(job_id)
+        if not job:
+            raise RuntimeError(f"Job {job_id} not found")
+        SupabaseService.create_job({
+            "id": retry_id,
+            "user_id": job["user_id"],
+            "model_name": job["model_name"],
+            "dataset_url": job["dataset_url"],
+            "parameters": job["parameters"],
+            "priority": job.get("priority", "interactive"),
+            "spec_hash": job.get("spec_hash"),
+            "status": "pending",
+            "created_at": datetime.utcnow().isoformat(),
+            "updated_at": datetime.utcnow().isoformat(),
+            "retry_from": job_id,
+            "retry_count": (job.get("retry_count") or 0) + 1,
+            "sweep_id": job.get("sweep_id"),
+        })
+
+    delay = RETRY_POLICY.backoff_delay(attempt)
+    # 重试任务从原任务最近的检查点继续训练
+    payload = dict(body, job_id=retry_id, attempt=attempt + 1, resume_from=job_id)
+    msg_id = enqueue_job(payload, delay_seconds=delay)
+    SupabaseService.transition_job_status(retry_id, "queued", {"sqs_message_id": msg_id})
+    print(f"Scheduled automatic retry {retry_id} for job {job_id} in {delay}s (attempt {attempt + 1})")
+    return retry_id
 
-            # 删除 SQS 消息
+def store_error_log(job_id: str, error_details: str) -> str:
+    """压缩保存完整错误信息，返回写在任务行上的首尾摘要"""
+    try:
+        SupabaseService.save_error_log(job_id, error_details)
+        note = f", 完整内容见 /jobs/{job_id}/error-log?full=true"
+    except Exception as e:
+        # 保存失败时仍写入摘要，不影响状态更新
+        print(f"Failed to store full error log for job {job_id}: {e}")
+        note = ""
+    return summarize(error_details, ERROR_LOG_MAX_CHARS, note=note)
+
+def fail_job(job_id, error: BaseException, body: dict, sqs_message_id: str):
+    """
+    记录任务失败：确定性失败直接标记为 failed；临时故障自动创建重试任务，
+    自动重试次数用尽后停放到 dead_letter 等待人工处理。
+    """
+    print(f"Error during training: {str(error)}")
+    error_details = build_error_details(error, body, sqs_message_id)
+    if not job_id:
+        return
+
+    attempt = body.get("attempt", 0)
+    status = "failed"
+    if classify_failure(error) == TRANSIENT:
+        if attempt >= RETRY_POLICY.max_attempts:
+            status = "dead_letter"
+            error_details += f"\n已自动重试 {attempt} 次仍失败, 任务进入 dead_letter\n"
+        else:
             try:
-                sqs.delete_message(QueueUrl=SQS_QUEUE_URL, ReceiptHandle=receipt_handle)
-                print(f"Deleted message {msg['MessageId']}")
-            except ClientError as e:
-                print(f"Failed to delete message: {e}")
+                retry_id = schedule_retry(job_id, body, attempt)
+                error_details += f"\n已自动创建重试任务: {retry_id}\n"
+            except Exception as e:
+                print(f"Failed to schedule retry for job {job_id}: {e}")
+
+    # 更新任务状态并记录失败时间和错误日志摘要（由 flusher 合并提交）
+    flusher.stage_transition(job_id, status, {"error_log": store_error_log(job_id, error_details)})
+
+def handle_success(tracked: TrackedCall, result):
+    """Modal 训练成功结束（打包调用中取出本任务的结果，单个任务失败按失败处理）"""
+    if isinstance(result, dict) and result.get("batch"):
+        result = result["results"].get(tracked.job_id)
+        if result is None or result.get("status") == "failed":
+            error_type = TransientTrainingError if result and result.get("transient") else TrainingError
+            handle_failure(tracked, error_type((result or {}).get("error", "Job result missing from packed training call")))
+            return
+    print(f"Modal training result: {result}")
+
+    # 更新任务状态为完成并记录完成时间、最终指标与数据集缓存命中情况（由 flusher 合并提交）
+    if tracked.job_id:
+        final_metrics = {}
+        if isinstance(result, dict):
+            final_metrics = {
+                key: result[key]
+                for key in ("final_accuracy", "final_loss", "dataset_cache", "resume_epoch")
+                if result.get(key) is not None
+            }
+        flusher.stage_transition(tracked.job_id, "completed", final_metrics)
+
+    flusher.ack(tracked.message, tracked.job_id)
+
+def handle_failure(tracked: TrackedCall, error: BaseException):
+    """Modal 训练失败（包括调用结果过期）"""
+    fail_job(tracked.job_id, error, tracked.body, tracked.message["MessageId"])
+    flusher.ack(tracked.message, tracked.job_id)
+
+reaper = CompletionReaper(handle_success, handle_failure, poll_interval=REAPER_POLL_INTERVAL)
+heartbeat = VisibilityHeartbeat(
+    sqs,
+    SQS_QUEUE_URL,
+    initial_visibility=SQS_VISIBILITY_TIMEOUT,
+    extension=VISIBILITY_EXTENSION,
+)
+flusher = AckFlushStage(sqs, SQS_QUEUE_URL, flush_interval=FLUSH_INTERVAL, heartbeat=heartbeat)
+log_pump = LogPump(get_log_queue(), interval=LOG_PUMP_INTERVAL)
+
+def is_packable(body: dict) -> bool:
+    """只打包轮数较少的短任务：冷启动在它们的总耗时中占比最大"""
+    if not PACKING_ENABLED or not body.get("job_id"):
+        return False
+    try:
+        return int(body["parameters"].get("epochs", 10)) <= PACK_MAX_EPOCHS
+    except (TypeError, ValueError, AttributeError):
+        return False
+
+# 已由本 Worker 转换为 running、尚未交给 reaper 监管的任务（派发中或在打包器中等待）：任务ID -> 消息
+_dispatching: Dict[str, dict] = {}
+_dispatching_lock = threading.Lock()
+
+def begin_dispatch(job_id: str, msg: dict):
+    with _dispatching_lock:
+        _dispatching[job_id] = msg
+
+def end_dispatch(job_id: Optional[str]):
+    with _dispatching_lock:
+        _dispatching.pop(job_id, None)
+
+def supervised_message(job_id: str) -> Optional[dict]:
+    """本 Worker 正在派发或监管的任务对应的消息"""
+    with _dispatching_lock:
+        msg = _dispatching.get(job_id)
+    if msg is None:
+        tracked = reaper.find_job(job_id)
+        msg = tracked.message if tracked else None
+    return msg
+
+def record_modal_call(job_ids: List[str], call_id: str):
+    """
+    在交给 reaper 之前同步写入 modal_call_id：重复投递的消息据此接管或丢弃，
+    不会把仍在训练的任务当作未派发而判定失败。写入失败时交给 flusher 重试。
+    """
+    try:
+        SupabaseService.transition_jobs_status(job_ids, "running", {"modal_call_id": call_id}, from_statuses=("running",))
+    except Exception as e:
+        print(f"Failed to record Modal call {call_id}, staging for retry: {e}")
+        for job_id in job_ids:
+            flusher.stage_transition(job_id, "running", {"modal_call_id": call_id}, from_statuses=("running",))
+
+def message_receive_count(msg: dict) -> int:
+    return int(msg.get("Attributes", {}).get("ApproximateReceiveCount", 1))
+
+def dispatch_packed(jobs: List[PackedJob]):
+    """打包任务派发结束（交给 reaper 或判定失败）后结束派发登记"""
+    try:
+        dispatch_packed_call(jobs)
+    finally:
+        for job in jobs:
+            end_dispatch(job.job_id)
+
+def dispatch_packed_call(jobs: List[PackedJob]):
+    """
+    把一批打包的任务派发为一次 Modal 调用，结果由 reaper 按任务分别收集。
+    并发槽位对应 Modal 容器：整批只由第一个任务重新占用一个槽位，其余任务只计入用户的运行数，
+    各自的槽位都在调用结束时释放。
+    """
+    if jobs[0].slot:
+        jobs[0].slot.reclaim_capacity()
+    try:
+        call = spawn_training_batch([
+            {
+                "job_id": job.job_id,
+                "model_name": job.body["model_name"],
+                "dataset_url": job.body["dataset_url"],
+                "parameters": job.body["parameters"],
+                "resume_from": job.body.get("resume_from"),
+            }
+            for job in jobs
+        ])
+    except Exception as e:
+        for job in jobs:
+            fail_job(job.job_id, e, job.body, job.message["MessageId"])
+            flusher.ack(job.message, job.job_id)
+            if job.slot:
+                job.slot.release()
+        return
+
+    print(f"Packed {len(jobs)} jobs into Modal call {call.object_id}: {[job.job_id for job in jobs]}")
+    # 同一批任务写入相同的 modal_call_id（一次更新）
+    record_modal_call([job.job_id for job in jobs], call.object_id)
+    for job in jobs:
+        reaper.track(TrackedCall(job_id=job.job_id, call=call, message=job.message, body=job.body, slot=job.slot))
+
+packer = JobPacker(dispatch_packed, max_batch=PACK_MAX_BATCH, max_wait=PACK_MAX_WAIT, heartbeat=heartbeat)
+
+def drop_supervised_duplicate(job_id: str, msg: dict, existing: Optional[dict]):
+    """
+    本 Worker 已在派发或监管该任务时收到的重复投递：不再接管，槽位由引擎在处理函数返回后释放。
+    同一条消息再次可见时改用最新的回执句柄（心跳已按新句柄续期），仍由原调用结束时删除；
+    其他消息（如 outbox 重发）直接删除。
+    """
+    if existing is not None and existing["MessageId"] == msg["MessageId"]:
+        existing["ReceiptHandle"] = msg["ReceiptHandle"]
+        print(f"Job {job_id} redelivered while supervised, refreshed receipt handle")
+        return
+    print(f"Job {job_id} already supervised by this worker, dropping duplicate delivery {msg['MessageId']}")
+    flusher.ack(msg)
+
+def handle_advanced_job(msg, body: dict, job_id: str, slot: JobSlot):
+    """
+    处理状态已被推进的任务消息。运行中的任务只有在原 Worker 停止续期（排空交接或进程退出）后
+    消息才会重新可见，此时根据任务记录上的 modal_call_id 接管训练，而不是重新派发。
+    本 Worker 自己正在派发或监管的任务只丢弃重复的消息。
+    """
+    existing = supervised_message(job_id)
+    if existing is not None:
+        drop_supervised_duplicate(job_id, msg, existing)
+        return
+
+    job = SupabaseService.get_job(job_id)
+    if job and job["status"] == "running":
+        call_id = job.get("modal_call_id")
+        if call_id:
+            tracked = TrackedCall(job_id=job_id, call=get_function_call(call_id), message=msg, body=body, slot=slot)
+            if reaper.track(tracked):
+                print(f"Adopting running job {job_id} (Modal: {call_id})")
+                return
+            existing = reaper.get(tracked.key)
+            drop_supervised_duplicate(job_id, msg, existing.message if existing else None)
+            return
+
+        if message_receive_count(msg) <= 1:
+            # 首次投递的另一条消息（如 outbox 重发）：把任务转换为 running 的是其他消息，
+            # 持有它的 Worker 仍在派发；它若退出，那条消息重新投递时再判定
+            print(f"Job {job_id} is being dispatched elsewhere, dropping duplicate delivery {msg['MessageId']}")
+            flusher.ack(msg)
+            return
+
+        # 消息重新投递（原 Worker 停止续期）而任务仍未记录 Modal 调用：原 Worker 在派发前后退出，无法确认训练是否已派发
+        fail_job(job_id, WorkerInterruptedError("Worker exited before the Modal call was recorded"), body, msg["MessageId"])
+        flusher.ack(msg, job_id)
+        return
+
+    print(f"Job {job_id} already advanced past queued, skipping duplicate delivery {msg['MessageId']}")
+    flusher.ack(msg)
+
+def process_message(msg, slot: JobSlot):
+    """处理单条 SQS 消息：异步派发 Modal 训练，结果由 reaper 收集"""
+    body = json.loads(msg["Body"])
+    sqs_message_id = msg["MessageId"]
+
+    # 打印收到的所有参数
+    print(f"[Worker] 收到 SQS 消息: {json.dumps(body, ensure_ascii=False, indent=2)}")
+
+    job_id = body.get("job_id")
+
+    # 条件转换为运行中：任务已被推进（重复投递）时不再重复训练
+    if job_id and not SupabaseService.transition_job_status(
+        job_id, "running", {"sqs_message_id": sqs_message_id}
+    ):
+        handle_advanced_job(msg, body, job_id, slot)
+        return
+    if job_id:
+        begin_dispatch(job_id, msg)
+
+    # 短任务交给打包器，与同模型的其他短任务一起派发（派发后由 dispatch_packed 结束登记）
+    if is_packable(body):
+        packer.add(body["model_name"], PackedJob(job_id=job_id, message=msg, body=body, slot=slot))
+        return
+
+    try:
+        dispatch_single(msg, body, job_id, slot)
+    finally:
+        end_dispatch(job_id)
+
+def dispatch_single(msg, body: dict, job_id: Optional[str], slot: JobSlot):
+    """单独派发一个任务"""
+    sqs_message_id = msg["MessageId"]
+    try:
+        # 异步触发 Modal 训练（不等待训练结束）
+        print(f"Spawn Modal train for job {sqs_message_id}")
+        call = spawn_training(
+            model_name=body["model_name"],
+            dataset_url=body["dataset_url"],
+            parameters=body["parameters"],
+            job_id=job_id,
+            resume_from=body.get("resume_from")
+        )
+    except Exception as e:
+        fail_job(job_id, e, body, sqs_message_id)
+        flusher.ack(msg, job_id)
+        return
+
+    # 记录 Modal 调用 ID（任务仍处于 running 时）
+    if job_id:
+        record_modal_call([job_id], call.object_id)
+        print(f"Job {job_id} running (SQS: {sqs_message_id}, Modal: {call.object_id})")
+
+    reaper.track(TrackedCall(job_id=job_id, call=call, message=msg, body=body, slot=slot))
+
+def drain(engine: WorkerEngine):
+    """
+    排空：等待运行中的训练在期限内结束；仍未结束的任务把消息交还队列，
+    训练继续在 Modal 上运行，由接收到消息的新 Worker 根据 modal_call_id 接管。
+    """
+    # 先派发打包器中等待凑批的任务（它们已转换为 running）
+    packer.stop()
+    print(f"[Worker] 开始排空, 运行中任务: {len(reaper.in_flight())}, 期限: {DRAIN_TIMEOUT}s")
+    reaper.wait_idle(DRAIN_TIMEOUT)
+    reaper.stop()
+
+    remaining = reaper.in_flight()
+    # 先提交缓冲的 modal_call_id 写入，保证接管方能读到
+    flusher.flush()
+    engine.release_messages([tracked.message for tracked in remaining])
+    for tracked in remaining:
+        print(f"[Worker] 交接运行中任务 {tracked.job_id} (Modal: {tracked.call_id})")
+
+def build_lanes() -> dict:
+    """优先级通道 -> 队列 URL；未单独配置批量队列时两个通道共用一个队列，只接收一次"""
+    lanes = {}
+    for lane, url in PRIORITY_QUEUE_URLS.items():
+        if url and url not in lanes.values():
+            lanes[lane] = url
+    return lanes
+
+def build_engine() -> WorkerEngine:
+    """创建接收/调度引擎"""
+    lanes = build_lanes()
+    # 调度通道覆盖所有优先级（即使共用一个队列，也按消息中的 priority 分通道调度）
+    scheduler = FairScheduler(
+        {lane: LANE_WEIGHTS.get(lane, 1) for lane in PRIORITY_QUEUE_URLS},
+        per_user_limit=PER_USER_CONCURRENCY,
+    )
+    engine = WorkerEngine(
+        sqs,
+        lanes,
+        process_message,
+        concurrency=WORKER_CONCURRENCY,
+        dispatch_threads=min(WORKER_CONCURRENCY, 8),
+        heartbeat=heartbeat,
+        scheduler=scheduler,
+    )
+    return engine
+
+def run_worker(engine: WorkerEngine):
+    """启动后台阶段并运行引擎，直到 engine.stop() 后排空退出"""
+    autoscaler = None
+    if AUTOSCALE_ENABLED:
+        replica_signal = EcsReplicaSignal(
+            ECS_CLUSTER,
+            ECS_WORKER_SERVICE,
+            apply=AUTOSCALE_APPLY_ECS,
+            region=os.getenv("AWS_DEFAULT_REGION"),
+        )
+        autoscaler = AutoscaleController(
+            sqs,
+            list(engine.lanes.values()),
+            policy_from_env(),
+            limiter=engine.limiter,
+            durations=reaper.recent_durations,
+            replica_signal=replica_signal,
+            interval=AUTOSCALE_INTERVAL,
+            buffered=engine.scheduler.size,
+            replica_count=replica_signal.current,
+        )
+
+    heartbeat.start()
+    flusher.start()
+    log_pump.start()
+    packer.start()
+    reaper.start()
+    if autoscaler:
+        autoscaler.start()
+    try:
+        engine.run()
+    finally:
+        if autoscaler:
+            autoscaler.stop()
+        drain(engine)
+        # 保证退出前提交所有缓冲的状态写入、日志和消息删除
+        log_pump.stop()
+        flusher.stop()
+        # 状态写入发布的任务事件在后台发送，退出前等待发送完
+        flush_job_events()
+        heartbeat.stop()
+        print(f"[Worker] 心跳指标: {heartbeat.stats()}")
+        print(f"[Worker] 刷新指标: {flusher.stats()}")
+        print(f"[Worker] 日志指标: {log_pump.stats()}")
+        if PACKING_ENABLED:
+            print(f"[Worker] 打包指标: {packer.stats()}")
+
+def poll_and_process():
+    """长轮询各优先级队列，公平调度并发派发训练（训练期间持续接收新消息）"""
+    engine = build_engine()
+
+    def handle_signal(signum, _frame):
+        print(f"[Worker] 收到信号 {signal.Signals(signum).name}, 停止接收新消息")
+        engine.stop()
 
-        # 根据需求控制轮询频率
-        time.sleep(1)
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    run_worker(engine)
 
 if __name__ == "__main__":
     print("Worker started, polling SQS...")
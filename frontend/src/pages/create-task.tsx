@@ -64,7 +64,9 @@ export default function CreateTaskPage() {
       });
       const data = await res.json();
       if (res.ok) {
-        setResult(`Task created successfully, ID: ${data.message_id}`);
+        setResult(data.cached
+          ? `Identical task already completed, reusing its result, ID: ${data.message_id}`
+          : `Task created successfully, ID: ${data.message_id}`);
       } else {
         setError(data.detail || "Task creation failed");
       }
@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react"
+import { useEffect, useRef, useState } from "react"
 import { useRouter } from 'next/router';
 import { useUser, useAuth } from '@clerk/nextjs';
 import ConfirmDialog from '../components/ui/ConfirmDialog';
@@ -14,6 +14,7 @@ type Job = {
   failed_at?: string
   retry_from?: string
   retry_count?: number
+  deleted_at?: string | null
 }
 
 export default function DashboardPage() {
@@ -21,6 +22,13 @@ export default function DashboardPage() {
   const { getToken } = useAuth();
   const router = useRouter();
   const [jobs, setJobs] = useState<Job[]>([])
+  // 点击 Load more 加载的更早的任务；轮询只刷新第一页
+  const [olderJobs, setOlderJobs] = useState<Job[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const olderLoaded = useRef(false)
+  // GET /jobs 返回的增量同步位置，兜底轮询时只拉取此后变更的任务
+  const syncToken = useRef<string | null>(null)
   const [error, setError] = useState("")
   const [retryJobId, setRetryJobId] = useState<string | null>(null);
   const [isRetryDialogOpen, setIsRetryDialogOpen] = useState(false);
@@ -45,6 +53,11 @@ export default function DashboardPage() {
                        Array.isArray(data) ? data : [];
       
       setJobs(jobsArray)
+      syncToken.current = data.sync_token ?? null
+      // 已经加载了更早的任务时保留其游标
+      if (!olderLoaded.current) {
+        setNextCursor(data.next_cursor ?? null)
+      }
     } catch (err: unknown) {
       const errorMessage = err instanceof Error ? err.message : 'Unknown error occurred';
       setError("Failed to fetch tasks: " + errorMessage)
@@ -52,12 +65,129 @@ export default function DashboardPage() {
     }
   }
 
+  const loadMoreJobs = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    try {
+      const token = await getToken();
+      const res = await fetch(`http://myrobotbalancer-401487233.us-east-2.elb.amazonaws.com/jobs?cursor=${encodeURIComponent(nextCursor)}`, {
+        headers: {
+          "Authorization": `Bearer ${token}`
+        }
+      })
+      const data = await res.json()
+      const jobsArray: Job[] = Array.isArray(data.jobs) ? data.jobs : []
+      olderLoaded.current = true
+      setOlderJobs(prev => [...prev, ...jobsArray])
+      setNextCursor(data.next_cursor ?? null)
+    } catch (err: unknown) {
+      const errorMessage = err instanceof Error ? err.message : 'Unknown error occurred';
+      setError("Failed to load more tasks: " + errorMessage)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  // 第一页与更早的任务合并显示，新任务把第一页的任务挤到后面时按 id 去重
+  const firstPageIds = new Set(jobs.map(job => job.id))
+  const allJobs = [...jobs, ...olderJobs.filter(job => !firstPageIds.has(job.id))]
+
+  // 把任务变更合并到列表：已删除的移除，已显示的按 id 更新，
+  // 未显示且比第一页最早的任务更新的是新建任务，按创建时间插入第一页
+  const applyJobChange = (delta: Partial<Job> & { id: string }) => {
+    if (delta.deleted_at) {
+      setJobs(prev => prev.filter(job => job.id !== delta.id))
+      setOlderJobs(prev => prev.filter(job => job.id !== delta.id))
+      return
+    }
+    const merge = (list: Job[]) => list.map(job => job.id === delta.id ? { ...job, ...delta } : job)
+    setJobs(prev => {
+      if (prev.some(job => job.id === delta.id)) return merge(prev)
+      if (!delta.created_at || (prev.length > 0 && delta.created_at < prev[prev.length - 1].created_at)) return prev
+      return [delta as Job, ...prev].sort((a, b) => b.created_at.localeCompare(a.created_at))
+    })
+    setOlderJobs(prev => merge(prev))
+  }
+
+  // 增量同步：只拉取 sync_token 之后新建、变更或删除的任务；同步位置失效时重新拉取列表
+  const syncJobs = async () => {
+    if (!syncToken.current) return fetchJobs()
+    try {
+      const token = await getToken();
+      let hasMore = true
+      while (hasMore) {
+        const res = await fetch(`http://myrobotbalancer-401487233.us-east-2.elb.amazonaws.com/jobs?changed_since=${encodeURIComponent(syncToken.current)}`, {
+          headers: {
+            "Authorization": `Bearer ${token}`
+          }
+        })
+        if (!res.ok) return fetchJobs()
+        const data = await res.json()
+        for (const job of data.jobs ?? []) applyJobChange(job)
+        for (const id of data.deleted ?? []) applyJobChange({ id, deleted_at: "deleted" })
+        syncToken.current = data.next_token
+        hasMore = data.has_more
+      }
+    } catch (err: unknown) {
+      const errorMessage = err instanceof Error ? err.message : 'Unknown error occurred';
+      setError("Failed to sync tasks: " + errorMessage)
+    }
+  }
+
+  // 订阅 GET /jobs/stream（Server-Sent Events），断线后带上 Last-Event-ID 重连补发错过的事件
+  const streamJobs = async (signal: AbortSignal) => {
+    let lastEventId: string | null = null
+    while (!signal.aborted) {
+      try {
+        const token = await getToken();
+        const headers: Record<string, string> = { "Authorization": `Bearer ${token}` }
+        if (lastEventId) headers["Last-Event-ID"] = lastEventId
+        const res = await fetch("http://myrobotbalancer-401487233.us-east-2.elb.amazonaws.com/jobs/stream", { headers, signal })
+        if (!res.ok || !res.body) throw new Error(`Stream failed: ${res.status}`)
+
+        const reader = res.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ""
+        while (true) {
+          const { done, value } = await reader.read()
+          if (done) break
+          buffer += decoder.decode(value, { stream: true })
+          let end
+          while ((end = buffer.indexOf("\n\n")) >= 0) {
+            const block = buffer.slice(0, end)
+            buffer = buffer.slice(end + 2)
+            let event = "message"
+            let data = ""
+            for (const line of block.split("\n")) {
+              if (line.startsWith("id: ")) lastEventId = line.slice(4)
+              else if (line.startsWith("event: ")) event = line.slice(7)
+              else if (line.startsWith("data: ")) data += line.slice(6)
+            }
+            if (event === "job") applyJobChange(JSON.parse(data))
+            // 服务端无法补发错过的事件，重新拉取列表
+            else if (event === "reset") fetchJobs()
+          }
+        }
+      } catch {
+        if (signal.aborted) return
+      }
+      // 连接断开后等待一段时间重连
+      await new Promise(resolve => setTimeout(resolve, 3000))
+    }
+  }
+
   useEffect(() => {
     // 只有在用户已登录且加载完成时才获取任务
     if (isSignedIn && isLoaded) {
       fetchJobs()
-      const interval = setInterval(fetchJobs, 5000)
-      return () => clearInterval(interval)
+      const controller = new AbortController()
+      streamJobs(controller.signal)
+      // 事件流负责实时更新，低频增量同步作为兜底
+      const interval = setInterval(syncJobs, 60000)
+      return () => {
+        controller.abort()
+        clearInterval(interval)
+      }
     }
   }, [isSignedIn, isLoaded])
 
@@ -156,7 +286,7 @@ export default function DashboardPage() {
           </tr>
         </thead>
         <tbody>
-          {jobs && jobs.length > 0 ? jobs.map(job => (
+          {allJobs.length > 0 ? allJobs.map(job => (
             <tr key={job.id} className="border-t border-gray-100 hover:bg-gray-50">
               <td className="p-2">{job.model_name}</td>
               <td className="p-2 text-blue-600">{job.dataset_url}</td>
@@ -167,6 +297,8 @@ export default function DashboardPage() {
                       ? "bg-green-100 text-green-800"
                       : job.status === "failed"
                       ? "bg-red-100 text-red-800"
+                      : job.status === "dead_letter"
+                      ? "bg-purple-100 text-purple-800"
                       : job.status === "running"
                       ? "bg-yellow-100 text-yellow-800"
                       : "bg-gray-100 text-gray-800"
@@ -208,7 +340,7 @@ export default function DashboardPage() {
               </td>
               <td className="p-2">
                 <div className="flex space-x-2">
-                  {(job.status === "failed" || job.status === "completed") && (
+                  {(job.status === "failed" || job.status === "dead_letter" || job.status === "completed") && (
                     <button
                       onClick={() => handleRetryClick(job.id)}
                       disabled={retryLoading}
@@ -217,7 +349,7 @@ export default function DashboardPage() {
                       {retryLoading && retryJobId === job.id ? "Retrying..." : "Retry"}
                     </button>
                   )}
-                  {job.status === "failed" && (
+                  {(job.status === "failed" || job.status === "dead_letter") && (
                     <button
                       onClick={() => handleViewErrorLog(job.id)}
                       className="px-3 py-1 bg-red-500 text-white text-xs rounded hover:bg-red-600 focus:outline-none focus:ring-2 focus:ring-red-500 focus:ring-offset-2 transition-colors"
@@ -237,6 +369,18 @@ export default function DashboardPage() {
           )}
         </tbody>
       </table>
+
+      {nextCursor && (
+        <div className="mt-4 text-center">
+          <button
+            onClick={loadMoreJobs}
+            disabled={loadingMore}
+            className="px-4 py-2 border rounded hover:bg-gray-100 disabled:opacity-50"
+          >
+            {loadingMore ? "Loading..." : "Load more"}
+          </button>
+        </div>
+      )}
       
       <ConfirmDialog
         isOpen={isRetryDialogOpen}